@@ -4,13 +4,28 @@ from PIL import Image
 import sqlite3
 from datetime import datetime, timedelta
 import hashlib
+import bisect
 import json
+from collections import OrderedDict, deque
 from dataclasses import dataclass
-from typing import List, Optional, Dict
+from typing import Callable, List, Optional, Dict
 import plotly.express as px
 import plotly.graph_objects as go
 import secrets
 import string
+import os
+import pickle
+import threading
+import time
+import re
+import sys
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+try:
+    import fcntl
+except ImportError:  # Windows: every worker process refreshes its own analytics snapshot
+    fcntl = None
 
 # ==================== CONFIG ====================
 st.set_page_config(
@@ -29,17 +44,1277 @@ __linkedin__ = "https://linkedin.com/in/alisher-beisembekov"
 __github__ = "https://github.com/damn_glitch"
 
 # ==================== DATABASE ====================
+DB_PATH = os.environ.get("KIC_DB_PATH", "innovate_hub_ultimate.db")
+# When set, every statement any connection runs is appended to this file (JSON lines);
+# check_query_plans.py uses it to EXPLAIN each query the app actually issues
+QUERY_LOG_PATH = os.environ.get("KIC_QUERY_LOG")
+# Size of the result cache shared by every process serving DB_PATH (SharedCache); 0 turns it off
+SHARED_CACHE_MB = int(os.environ.get("KIC_SHARED_CACHE_MB", "256"))
+# Seconds the startup CacheWarmer may spend prefetching (see warmup_steps); 0 turns it off
+WARMUP_BUDGET = float(os.environ.get("KIC_WARMUP_SECONDS", "10"))
+# Milliseconds a facet count pass may run before it is interrupted (see Database.facets)
+FACET_BUDGET_MS = float(os.environ.get("KIC_FACET_BUDGET_MS", "250"))
+# Seconds before a facet pass that ran past FACET_BUDGET_MS is tried again
+FACET_RETRY_SECONDS = float(os.environ.get("KIC_FACET_RETRY_SECONDS", "30"))
+
+# PRAGMA sets applied to every connection. "default" keeps sqlite3's rollback journal,
+# "production" switches to WAL so readers no longer block behind committing writers.
+STORAGE_PROFILES = {
+    "default": {},
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -65536,  # 64 MB
+        "mmap_size": 268435456,  # 256 MB
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+        "journal_size_limit": 67108864,
+        "checkpoint_interval": 30.0,
+        "checkpoint_max_wal_bytes": 67108864
+    },
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -32768,
+        "mmap_size": 0,
+        "temp_store": "MEMORY",
+        "busy_timeout": 10000,
+        "journal_size_limit": 33554432,
+        "checkpoint_interval": 10.0,
+        "checkpoint_max_wal_bytes": 33554432
+    }
+}
+DEFAULT_STORAGE_PROFILE = os.environ.get("KIC_DB_PROFILE", "production")
+# Profile keys that configure the checkpointer rather than being PRAGMAs
+CHECKPOINT_SETTINGS = ("checkpoint_interval", "checkpoint_max_wal_bytes")
+
+# Secondary indexes for the hot access paths: (name, table, columns)
+INDEXES = [
+    # Nav unread badge and conversation lists
+    ("idx_messages_receiver_unread", "messages", "receiver_id, is_read"),
+    ("idx_messages_sender_receiver", "messages", "sender_id, receiver_id, created_at"),
+    ("idx_notifications_user_unread", "notifications", "user_id, is_read"),
+    # KICManager.get_kic_transactions and the KIC Hub aggregates
+    ("idx_kic_transactions_user_created", "kic_transactions", "user_id, created_at"),
+    # (requester_id = ? OR addressee_id = ?) AND status = ... on profile and dashboard
+    ("idx_connections_requester_status", "connections", "requester_id, status"),
+    ("idx_connections_addressee_status", "connections", "addressee_id, status"),
+    # LabAccessManager.verify_lab_access / get_user_lab_access
+    ("idx_lab_access_lab_username", "lab_access", "lab_id, username"),
+    ("idx_lab_access_user", "lab_access", "user_id, is_active"),
+    # Project listings by status/urgency, ordered by views, deadline or budget
+    ("idx_projects_status_views", "projects", "status, views, posted"),
+    ("idx_projects_status_urgency_deadline", "projects", "status, urgency, deadline"),
+    ("idx_projects_status_budget", "projects", "status, kic_budget_max"),
+    ("idx_projects_organization", "projects", "organization"),
+    # Per-user lookups
+    ("idx_users_user_type", "users", "user_type"),
+    ("idx_talents_user", "talents", "user_id"),
+    ("idx_talents_location", "talents", "location"),
+    ("idx_user_projects_user", "user_projects", "user_id, joined_date"),
+    ("idx_project_applications_user", "project_applications", "user_id, applied_date"),
+    ("idx_activities_created", "activities", "created_at"),
+    ("idx_activities_user_created", "activities", "user_id, created_at"),
+    ("idx_labs_university", "labs", "university_id")
+]
+
+# KPI counters kept in platform_counters by triggers: table -> {counter: per-row contribution}.
+# {row} is NEW/OLD inside the triggers and the table itself in Database.rebuild_counters, so
+# the triggers and the from-scratch rebuild always agree. `watch` lists the columns whose
+# UPDATE can change a contribution; other updates (views, kic_balance, ...) fire nothing.
+KPI_COUNTERS = {
+    "users": {
+        "watch": "user_type",
+        "counters": {"talents": "{row}.user_type = 'talent'"}
+    },
+    "companies": {"watch": None, "counters": {"companies": "1"}},
+    "universities": {"watch": None, "counters": {"universities": "1"}},
+    "projects": {
+        "watch": "status, kic_budget_max, applications",
+        "counters": {
+            "active_projects": "{row}.status = 'Active'",
+            "active_kic_budget": "CASE WHEN {row}.status = 'Active' THEN {row}.kic_budget_max END",
+            "active_applications_sum": "CASE WHEN {row}.status = 'Active' THEN {row}.applications END",
+            "active_applications_rows": "{row}.status = 'Active' AND {row}.applications IS NOT NULL"
+        }
+    },
+    "labs": {
+        "watch": "rating, total_bookings",
+        "counters": {
+            "labs": "1",
+            "lab_rating_sum": "{row}.rating",
+            "lab_rating_rows": "{row}.rating IS NOT NULL",
+            "lab_bookings": "{row}.total_bookings"
+        }
+    }
+}
+# COUNT(DISTINCT column) counters, maintained through per-value row counts in counter_groups
+KPI_DISTINCT_COUNTERS = {
+    "lab_specialties": ("labs", "specialty"),
+    "project_organizations": ("projects", "organization")
+}
+# Tables the KPI triggers write when a base table changes, for cache invalidation
+TRIGGER_WRITES = {table: {"platform_counters"} for table in KPI_COUNTERS}
+for _table, _ in KPI_DISTINCT_COUNTERS.values():
+    TRIGGER_WRITES[_table] = {"platform_counters", "counter_groups"}
+
+# Per-user badge counters kept in user_counters by triggers:
+# counter -> (table, owner column, condition on {row}, columns whose UPDATE can change it)
+USER_COUNTERS = {
+    "unread_messages": ("messages", "receiver_id", "{row}.is_read = FALSE", "receiver_id, is_read"),
+    "unread_notifications": ("notifications", "user_id", "{row}.is_read = FALSE", "user_id, is_read"),
+    "pending_connections": ("connections", "addressee_id", "{row}.status = 'pending'", "addressee_id, status")
+}
+for _table, _, _, _ in USER_COUNTERS.values():
+    TRIGGER_WRITES.setdefault(_table, set()).add("user_counters")
+
+# FTS5 full-text indexes kept in step with their base table by triggers: index -> the base
+# table, {indexed column: expression over {row}} (NEW/OLD in the triggers, the table itself in
+# Database.rebuild_search_index), the base columns whose UPDATE re-indexes a row, bm25 column
+# weights, and `related` tables an expression reads: table -> (watched columns, key in the base table)
+SEARCH_INDEXES = {
+    "talent_search": {
+        "table": "talents",
+        "columns": {
+            "name": "(SELECT name FROM users WHERE id = {row}.user_id)",
+            "title": "{row}.title",
+            "skills": "{row}.skills",
+            "specializations": "{row}.specializations",
+            "bio": "{row}.bio"
+        },
+        "watch": "user_id, title, skills, specializations, bio",
+        "weights": (10.0, 5.0, 4.0, 3.0, 1.0),
+        "related": {"users": ("name", "user_id")}
+    },
+    "project_search": {
+        "table": "projects",
+        "columns": {
+            "title": "{row}.title",
+            "organization": "{row}.organization",
+            "tags": "{row}.tags",
+            "description": "{row}.description",
+            "requirements": "{row}.requirements"
+        },
+        "watch": "title, organization, tags, description, requirements",
+        "weights": (10.0, 6.0, 4.0, 2.0, 1.0),
+        "related": {}
+    },
+    "lab_search": {
+        "table": "labs",
+        "columns": {
+            "name": "{row}.name",
+            "equipment": "{row}.equipment",
+            "specialty": "{row}.specialty",
+            "amenities": "{row}.amenities",
+            "description": "{row}.description"
+        },
+        "watch": "name, equipment, specialty, amenities, description",
+        "weights": (8.0, 6.0, 5.0, 3.0, 1.0),
+        "related": {}
+    }
+}
+for _index, _spec in SEARCH_INDEXES.items():
+    for _table in [_spec["table"], *_spec["related"]]:
+        TRIGGER_WRITES.setdefault(_table, set()).add(_index)
+
+# Inverted indexes over comma-joined columns: one (kind, item, entity id) row per trimmed item,
+# kept current by triggers. items table -> (base table, id column, {kind: base column}); the base
+# column name doubles as the filter parameter. Filters intersect the id sets of the selected
+# items and the filter lists count entities per item.
+ITEM_INDEXES = {
+    "lab_items": ("labs", "lab_id", {"equipment": "equipment", "amenity": "amenities"}),
+    "talent_items": ("talents", "talent_id",
+                     {"skill": "skills", "specialization": "specializations", "language": "languages"}),
+    "project_items": ("projects", "project_id", {"tag": "tags"})
+}
+for _items, (_table, _, _) in ITEM_INDEXES.items():
+    TRIGGER_WRITES.setdefault(_table, set()).add(_items)
+
+# Tables whose rows each belong to users, so a write to them changes only those users' data
+USER_SCOPED_TABLES = {"messages", "notifications", "connections", "kic_transactions", "user_projects",
+                      "project_applications", "lab_access", "user_counters"}
+# Users a named write touches, published on the InvalidationBus: positions of user ids in its
+# params, or a query taking the same params that returns them. A write to a USER_SCOPED_TABLES
+# table without an entry here counts as touching every user.
+USER_WRITES = {
+    "users.debit_kic": (1,),
+    "users.credit_kic": (1,),
+    "users.update_profile": (7,),
+    "users.update_password": (1,),
+    "talents.update_profile": (7,),
+    "connections.request": (0, 1),
+    "connections.accept": "SELECT requester_id, addressee_id FROM connections WHERE id = ?",
+    "connections.decline": "SELECT requester_id, addressee_id FROM connections WHERE id = ?",
+    "messages.send": (0, 1),
+    "messages.mark_thread_read": (0, 1),
+    "notifications.mark_all_read": (0,),
+    "kic.record_sent": (0,),
+    "kic.record_received": (0,),
+    "applications.create": (1,),
+    "lab_access.grant": (1,)
+}
+
+
+_query_log_lock = threading.Lock()
+
+
+def _log_statement(sql: str):
+    with _query_log_lock, open(QUERY_LOG_PATH, "a", encoding="utf-8") as log:
+        log.write(json.dumps(sql) + "\n")
+
+
+class RegistryConnection(sqlite3.Connection):
+    """sqlite3 connection that mirrors its statement cache so hits and misses can be counted.
+
+    sqlite3 keeps the last `cached_statements` prepared statements per connection in an
+    LRU keyed by SQL text but does not expose it; `prepared` tracks the same keys for the
+    statements run through Database.fetch_* and Database.execute.
+    """
+
+    def __init__(self, *args, cached_statements: int = 128, **kwargs):
+        super().__init__(*args, cached_statements=cached_statements, **kwargs)
+        self.cache_capacity = cached_statements
+        self.prepared = OrderedDict()
+
+    def note_statement(self, sql: str) -> bool:
+        """Record a statement about to run; True if it was already prepared on this connection"""
+        if sql in self.prepared:
+            self.prepared.move_to_end(sql)
+            return True
+        self.prepared[sql] = None
+        if len(self.prepared) > self.cache_capacity:
+            self.prepared.popitem(last=False)
+        return False
+
+
+class PoolTimeout(sqlite3.OperationalError):
+    """No read connection became free within the pool wait timeout"""
+
+
+class ConnectionPool:
+    """Read connections bound to the thread that uses them, plus one shared writer connection.
+
+    A thread keeps its read connection until it calls release() (the end of a rerun or of
+    a page-loader task), the thread exits or the connection sits unused for `idle_timeout`
+    seconds; then it goes back to the idle list, and idle connections older than that are
+    closed. At most `size` read connections are open.
+    """
+
+    def __init__(self, db_path: str, size: int = 8, idle_timeout: float = 300.0, wait_timeout: float = 10.0,
+                 pragmas: Optional[Dict] = None):
+        self.db_path = db_path
+        self.pragmas = {k: v for k, v in (pragmas or {}).items() if k not in CHECKPOINT_SETTINGS}
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.wait_timeout = wait_timeout
+        self._cond = threading.Condition()
+        self._idle = []  # [(connection, last_used)]
+        self._owned = {}  # thread ident -> [connection, thread, last_used]
+        self._open = 0
+        self._next_reap = time.monotonic() + idle_timeout
+        self._stats = {"acquired": 0, "reused": 0, "created": 0, "waits": 0, "wait_seconds": 0.0,
+                       "max_wait_seconds": 0.0, "timeouts": 0, "reaped": 0}
+        self.writer = self.connect()
+        self.write_lock = threading.RLock()
+
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, factory=RegistryConnection,
+                               cached_statements=STATEMENT_CACHE_SIZE)
+        conn.row_factory = sqlite3.Row
+        for pragma, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {pragma} = {value}").fetchall()
+        if QUERY_LOG_PATH:
+            conn.set_trace_callback(_log_statement)
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        """Return the calling thread's read connection, checking one out if needed"""
+        ident = threading.get_ident()
+        now = time.monotonic()
+        with self._cond:
+            slot = self._owned.get(ident)
+            if slot:
+                slot[2] = now
+                self._stats["reused"] += 1
+                if now >= self._next_reap:
+                    self._reclaim_locked(now)
+                return slot[0]
+
+            conn = None
+            waited = False
+            while True:
+                self._reclaim_locked(time.monotonic())
+                if self._idle:
+                    conn = self._idle.pop()[0]
+                    break
+                if self._open < self.size:
+                    self._open += 1
+                    break
+                remaining = self.wait_timeout - (time.monotonic() - now)
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeout(f"No read connection free after {self.wait_timeout:.1f}s "
+                                      f"(pool size {self.size})")
+                waited = True
+                # Owner threads do not signal when they exit, so poll for reclaimable connections
+                self._cond.wait(min(remaining, 0.05))
+
+            self._stats["acquired"] += 1
+            if waited:
+                wait = time.monotonic() - now
+                self._stats["waits"] += 1
+                self._stats["wait_seconds"] += wait
+                self._stats["max_wait_seconds"] = max(self._stats["max_wait_seconds"], wait)
+
+        if conn is None:
+            try:
+                conn = self.connect()
+            except sqlite3.Error:
+                with self._cond:
+                    self._open -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._stats["created"] += 1
+
+        with self._cond:
+            self._owned[ident] = [conn, threading.current_thread(), time.monotonic()]
+        return conn
+
+    def release(self):
+        """Hand the calling thread's read connection back to the idle list"""
+        with self._cond:
+            slot = self._owned.pop(threading.get_ident(), None)
+            if slot:
+                self._idle.append((slot[0], time.monotonic()))
+                self._cond.notify()
+
+    def _reclaim_locked(self, now: float):
+        for ident, (conn, thread, last_used) in list(self._owned.items()):
+            if not thread.is_alive() or now - last_used > self.idle_timeout:
+                del self._owned[ident]
+                self._idle.append((conn, last_used))
+                self._cond.notify()
+
+        keep = []
+        for conn, last_used in self._idle:
+            if now - last_used > self.idle_timeout:
+                conn.close()
+                self._open -= 1
+                self._stats["reaped"] += 1
+            else:
+                keep.append((conn, last_used))
+        self._idle = keep
+        self._next_reap = now + min(self.idle_timeout, 30.0)
+
+    def reap(self):
+        """Return connections of finished threads and close idle ones now"""
+        with self._cond:
+            self._reclaim_locked(time.monotonic())
+
+    def stats(self) -> Dict:
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                "size": self.size,
+                "open": self._open,
+                "in_use": len(self._owned),
+                "idle": len(self._idle),
+                "avg_wait_ms": round(1000 * stats["wait_seconds"] / stats["waits"], 2) if stats["waits"] else 0.0
+            })
+        return stats
+
+    def close(self):
+        with self._cond:
+            for conn, _ in self._idle:
+                conn.close()
+            for conn, _, _ in self._owned.values():
+                conn.close()
+            self._idle, self._owned, self._open = [], {}, 0
+        self.writer.close()
+
+
+class WalCheckpointer:
+    """Background thread that keeps the WAL file bounded.
+
+    Every `interval` seconds it runs a PASSIVE checkpoint, which never blocks readers or
+    the writer. When the WAL file has grown past `max_wal_bytes` anyway (long readers
+    pinning old frames), it escalates to TRUNCATE so the file shrinks back to zero.
+    """
+
+    def __init__(self, pool: ConnectionPool, interval: float = 30.0, max_wal_bytes: int = 67108864):
+        self.pool = pool
+        self.interval = interval
+        self.max_wal_bytes = max_wal_bytes
+        self.wal_path = pool.db_path + "-wal"
+        self._stop = threading.Event()
+        self._stats = {"runs": 0, "truncations": 0, "busy": 0, "frames_checkpointed": 0,
+                       "wal_bytes": 0, "max_wal_bytes_seen": 0, "errors": 0}
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="wal-checkpointer", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        conn = self.pool.connect()
+        try:
+            while not self._stop.wait(self.interval):
+                self.checkpoint(conn)
+        finally:
+            conn.close()
+
+    def checkpoint(self, conn: sqlite3.Connection):
+        try:
+            wal_bytes = os.path.getsize(self.wal_path) if os.path.exists(self.wal_path) else 0
+            mode = "TRUNCATE" if wal_bytes > self.max_wal_bytes else "PASSIVE"
+            busy, _, checkpointed = conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+        except (sqlite3.Error, OSError):
+            with self._lock:
+                self._stats["errors"] += 1
+            return
+        with self._lock:
+            self._stats["runs"] += 1
+            self._stats["busy"] += busy
+            self._stats["frames_checkpointed"] += max(checkpointed, 0)
+            self._stats["truncations"] += mode == "TRUNCATE" and not busy
+            self._stats["wal_bytes"] = wal_bytes
+            self._stats["max_wal_bytes_seen"] = max(self._stats["max_wal_bytes_seen"], wal_bytes)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self._stats)
+
+
+class AnalyticsSnapshot:
+    """Read-only copy of the database that heavy analytics queries run against.
+
+    Every `interval` seconds a background thread copies the live database into a staging
+    file with the sqlite3 backup API, `step_pages` pages per step so no read transaction is
+    held for the whole copy, then renames it over `path`. Readers open the snapshot with
+    immutable=1 and switch to the new file on their next query. A snapshot older than
+    `max_staleness` is never served; Database.fetch_analytics falls back to the live
+    database instead.
+
+    With several worker processes on one database only the one holding the `<path>.lock`
+    file lock copies; the others pick up each new file it renames into place.
+    """
+
+    def __init__(self, pool: ConnectionPool, interval: float = 60.0, max_staleness: float = 300.0,
+                 step_pages: int = 1024):
+        self.pool = pool
+        self.path = pool.db_path + "-analytics"
+        self.interval = interval
+        self.max_staleness = max_staleness
+        self.step_pages = step_pages
+        self.generation = 0
+        self.refreshed_at: Optional[float] = None  # time.time() the copy started
+        self._local = threading.local()
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._stats = {"refreshes": 0, "adopted": 0, "errors": 0, "pages": 0, "steps": 0,
+                       "last_refresh_ms": 0.0, "served": 0, "fallbacks": 0}
+        self._lock = threading.Lock()
+        self._lock_file = None
+        self._thread = threading.Thread(target=self._run, name="analytics-snapshot", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _run(self):
+        while True:
+            self.refresh()
+            if self._stop.wait(self.interval):
+                return
+
+    def _is_refresher(self) -> bool:
+        """Whether this process copies the snapshot: it holds the lock file, taken once and kept until exit"""
+        if fcntl is None or self._lock_file is not None:
+            return True
+        lock_file = open(self.path + ".lock", "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def _adopt(self) -> bool:
+        """Switch to the snapshot another worker last renamed into place; False if there is none yet"""
+        try:
+            # The rename keeps the staging file's mtime, the end of that copy
+            written_at = os.stat(self.path).st_mtime
+        except OSError:
+            return False
+        with self._lock:
+            if self.refreshed_at is None or written_at > self.refreshed_at:
+                self.generation += 1
+                self.refreshed_at = written_at
+                self._stats["adopted"] += 1
+        return True
+
+    def refresh(self) -> bool:
+        """Copy the live database into a new snapshot file, or adopt the refreshing worker's; False on failure"""
+        # Per process: another worker renaming a shared staging file could move it mid-copy
+        staging = f"{self.path}.{os.getpid()}.tmp"
+        steps = []
+        with self._refresh_lock:
+            try:
+                if not self._is_refresher():
+                    return self._adopt()
+            except OSError:
+                with self._lock:
+                    self._stats["errors"] += 1
+                return False
+            started, start = time.time(), time.perf_counter()
+            try:
+                source = self.pool.connect()
+                target = sqlite3.connect(staging)
+                try:
+                    source.backup(target, pages=self.step_pages,
+                                  progress=lambda status, remaining, total: steps.append(total))
+                finally:
+                    target.close()
+                    source.close()
+                os.replace(staging, self.path)
+            except (sqlite3.Error, OSError):
+                with self._lock:
+                    self._stats["errors"] += 1
+                return False
+            with self._lock:
+                self.generation += 1
+                self.refreshed_at = started
+                self._stats["refreshes"] += 1
+                self._stats["steps"] += len(steps)
+                self._stats["pages"] = steps[-1] if steps else 0
+                self._stats["last_refresh_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return True
+
+    def age(self) -> Optional[float]:
+        """Seconds since the current snapshot was taken; None before the first one"""
+        return time.time() - self.refreshed_at if self.refreshed_at is not None else None
+
+    def is_fresh(self) -> bool:
+        age = self.age()
+        return age is not None and age <= self.max_staleness
+
+    def connection(self) -> sqlite3.Connection:
+        """The calling thread's read-only connection to the current snapshot file"""
+        local = self._local
+        if getattr(local, "generation", None) != self.generation:
+            if getattr(local, "conn", None) is not None:
+                local.conn.close()
+            # The file at path is replaced, never modified, so it is safe to skip locking
+            local.conn = sqlite3.connect(f"file:{self.path}?mode=ro&immutable=1", uri=True,
+                                         factory=RegistryConnection, cached_statements=STATEMENT_CACHE_SIZE)
+            local.conn.row_factory = sqlite3.Row
+            if QUERY_LOG_PATH:
+                local.conn.set_trace_callback(_log_statement)
+            local.generation = self.generation
+        return local.conn
+
+    def record(self, served: bool):
+        with self._lock:
+            self._stats["served" if served else "fallbacks"] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        age = self.age()
+        stats.update({"generation": self.generation, "interval": self.interval,
+                      "max_staleness": self.max_staleness,
+                      "age_seconds": round(age, 1) if age is not None else None})
+        return stats
+
+
+class CounterReconciler:
+    """Background thread that corrects drift in the trigger-maintained user_counters.
+
+    The triggers keep every badge exact for writes made through SQLite with the current
+    schema; rows restored from a backup or edited while the triggers were missing are
+    not seen by them. Every `interval` seconds `reconcile` recounts from the base tables
+    and rewrites only the counters that differ.
+    """
+
+    def __init__(self, reconcile: Callable[[], Dict], interval: float = 300.0):
+        self.reconcile = reconcile
+        self.interval = interval
+        self._stop = threading.Event()
+        self._stats = {"runs": 0, "corrections": 0, "last_corrections": 0, "last_run_ms": 0.0, "errors": 0}
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="counter-reconciler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def run_once(self) -> Dict:
+        start = time.perf_counter()
+        try:
+            drift = self.reconcile()
+        except sqlite3.Error:
+            with self._lock:
+                self._stats["errors"] += 1
+            return {}
+        with self._lock:
+            self._stats["runs"] += 1
+            self._stats["corrections"] += len(drift)
+            self._stats["last_corrections"] = len(drift)
+            self._stats["last_run_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        return drift
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self._stats)
+
+
+class CacheWarmer:
+    """Background thread that fills the caches and the page cache right after startup.
+
+    Runs `steps`, (label, callable returning how many rows or items it loaded), in order
+    until all are done or `budget` seconds have passed; the remaining steps are reported as
+    skipped. Steps are ordered hottest first so a short budget still warms what the first
+    visitors need. Pages read through the OS page cache (and the mmap region in the
+    production profile), which every connection shares, so scanning an index here also
+    speeds up the session threads' connections.
+    """
+
+    def __init__(self, steps: List[tuple], budget: float = 10.0):
+        self.steps = steps
+        self.budget = budget
+        self.done = threading.Event()
+        self._report = []
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="cache-warmer", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        deadline = time.monotonic() + self.budget
+        try:
+            for label, warm in self.steps:
+                if time.monotonic() >= deadline:
+                    self._record(label, "skipped")
+                    continue
+                start = time.perf_counter()
+                try:
+                    items = warm()
+                except sqlite3.Error as e:
+                    self._record(label, "failed", time.perf_counter() - start, error=str(e))
+                else:
+                    self._record(label, "warmed", time.perf_counter() - start, items)
+        finally:
+            stats = self.stats()
+            print(f"Warmup: {stats['warmed']} steps in {stats['elapsed_ms']} ms, {stats['skipped']} skipped, "
+                  f"{stats['failed']} failed (budget {self.budget:.0f}s)")
+            self.done.set()
+
+    def _record(self, label: str, status: str, elapsed: float = 0.0, items: Optional[int] = None, error=None):
+        with self._lock:
+            self._report.append({"step": label, "status": status, "ms": round(elapsed * 1000, 1),
+                                 "items": items, "error": error})
+
+    def report(self) -> List[Dict]:
+        """One entry per step so far: step, status (warmed/skipped/failed), ms, items"""
+        with self._lock:
+            return [dict(entry) for entry in self._report]
+
+    def stats(self) -> Dict:
+        report = self.report()
+        stats = {status: sum(1 for entry in report if entry["status"] == status)
+                 for status in ("warmed", "skipped", "failed")}
+        stats["elapsed_ms"] = round(sum(entry["ms"] for entry in report), 1)
+        stats["running"] = not self.done.is_set()
+        return stats
+
+
+class InvalidationBus:
+    """Process-wide feed of committed writes, as monotonically increasing versions.
+
+    Every publish takes the next sequence number and stamps it on each table written and
+    each user whose rows changed; a version is the sequence number of the last write that
+    could have changed it. Caches subscribe to be told which tables changed; pages and
+    Database.fetch_for_user compare versions instead, which is a couple of dict lookups.
+    Versions only ever grow, so a result remembered with an older version is simply stale.
+    """
+
+    def __init__(self):
+        self._seq = 0
+        self._tables = {}  # table -> seq of its last write
+        self._users = {}  # user id -> seq of the last write to one of their rows
+        self._all_users = 0  # seq of the last user-scoped write nobody could attribute
+        self._everything = 0  # seq of the last publish_all() (seeding, reset)
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._stats = {"publishes": 0, "table_bumps": 0, "user_bumps": 0, "all_user_bumps": 0}
+
+    def subscribe(self, callback: Callable[[set], None]):
+        """Call callback(tables) after every publish"""
+        self._subscribers.append(callback)
+
+    def publish(self, tables, users=()) -> int:
+        """Announce a commit that wrote `tables` and the rows of `users` (None in users: any user)"""
+        tables = set(tables)
+        with self._lock:
+            self._seq += 1
+            for table in tables:
+                self._tables[table] = self._seq
+            for user_id in users:
+                if user_id is None:
+                    self._all_users = self._seq
+                else:
+                    self._users[user_id] = self._seq
+            self._stats["publishes"] += 1
+            self._stats["table_bumps"] += len(tables)
+            self._stats["user_bumps"] += len(users)
+            self._stats["all_user_bumps"] += None in users
+            seq = self._seq
+        for callback in self._subscribers:
+            callback(tables)
+        return seq
+
+    def publish_all(self) -> int:
+        """Every table and user changed, e.g. after the database was reseeded"""
+        with self._lock:
+            self._seq += 1
+            self._everything = self._seq
+            return self._seq
+
+    # Reads take no lock: each is a single dict lookup on ints that only grow
+    def table_version(self, table: str) -> int:
+        return max(self._tables.get(table, 0), self._everything)
+
+    def versions(self, tables) -> tuple:
+        return tuple(self.table_version(table) for table in sorted(tables))
+
+    def user_version(self, user_id: int) -> int:
+        return max(self._users.get(user_id, 0), self._all_users, self._everything)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({"version": self._seq, "tables": len(self._tables), "users": len(self._users)})
+        return stats
+
+
+class ResultCache:
+    """Shared results tagged with the tables they read, with LRU eviction.
+
+    Entries are bounded by count and, when `max_bytes` is set, by their estimated size;
+    with a `ttl` they also expire. Database invalidates a table's entries once a write to
+    it has committed, finding them through a per-table key index. Each table also has a
+    version that invalidation bumps; a result loaded while one of its tables changed is
+    returned but not stored, so a slow reader cannot cache pre-commit data.
+    """
+
+    def __init__(self, ttl: Optional[float] = 300.0, max_entries: int = 256, max_bytes: Optional[int] = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (value, tables, expires_at, size)
+        self._by_table = {}  # table -> keys of the entries that read it
+        self._versions = {}  # table -> invalidation count
+        self._epoch = 0  # bumped by clear()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def get_or_load(self, key, tables, load: Callable[[], object],
+                    ttl_for: Optional[Callable[[object], Optional[float]]] = None):
+        """Cached value of `key`, calling `load` on a miss.
+
+        `ttl_for` maps a loaded value to its own time to live; None from it keeps the cache's ttl.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and (entry[2] is None or entry[2] > now):
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry[0]
+            if entry:
+                self._remove(key)
+                self._stats["expirations"] += 1
+            self._stats["misses"] += 1
+            versions = [self._epoch] + [self._versions.get(table, 0) for table in tables]
+
+        value = load()
+        size = estimate_size(value) if self.max_bytes else 0
+
+        with self._lock:
+            if versions == [self._epoch] + [self._versions.get(table, 0) for table in tables] \
+                    and key not in self._entries and (not self.max_bytes or size <= self.max_bytes):
+                ttl = ttl_for(value) if ttl_for else None
+                ttl = self.ttl if ttl is None else ttl
+                expires_at = time.monotonic() + ttl if ttl is not None else None
+                self._entries[key] = (value, frozenset(tables), expires_at, size)
+                self._bytes += size
+                for table in tables:
+                    self._by_table.setdefault(table, set()).add(key)
+                while len(self._entries) > self.max_entries or (self.max_bytes and self._bytes > self.max_bytes):
+                    self._remove(next(iter(self._entries)))
+                    self._stats["evictions"] += 1
+        return value
+
+    def _remove(self, key):
+        _, tables, _, size = self._entries.pop(key)
+        self._bytes -= size
+        for table in tables:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[table]
+
+    def invalidate(self, tables):
+        """Drop every entry that read one of `tables`"""
+        with self._lock:
+            for table in set(tables):
+                self._versions[table] = self._versions.get(table, 0) + 1
+                for key in list(self._by_table.get(table, ())):
+                    self._remove(key)
+                    self._stats["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._stats["invalidations"] += len(self._entries)
+            self._entries.clear()
+            self._by_table.clear()
+            self._bytes = 0
+            self._epoch += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
+
+
+@lru_cache(maxsize=256)
+def _row_template(columns: tuple) -> sqlite3.Cursor:
+    """A cursor whose description is `columns`, for rebuilding sqlite3.Row objects"""
+    names = ", ".join('NULL AS "{}"'.format(column.replace('"', '""')) for column in columns)
+    return sqlite3.connect(":memory:", check_same_thread=False).execute(f"SELECT {names}")
+
+
+def encode_rows(rows: List[sqlite3.Row]) -> bytes:
+    columns = tuple(rows[0].keys()) if rows else ()
+    return pickle.dumps((columns, [tuple(row) for row in rows]), protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def decode_rows(blob: bytes) -> List[sqlite3.Row]:
+    columns, values = pickle.loads(blob)
+    if not values:
+        return []
+    template = _row_template(columns)
+    return [sqlite3.Row(template, row) for row in values]
+
+
+class SharedCache:
+    """Query results shared by every process serving the same database, in a SQLite file next to it.
+
+    Each Streamlit worker behind a load balancer keeps its own in-process caches; this tier
+    lets a result computed by one worker serve all of them, and carries every worker's
+    committed writes to the others. cache_versions holds the version of each table and user
+    as the sequence number of its last write in any process. Entries are stored under the
+    versions of the tables they read, so one INSERT OR REPLACE publishes an entry atomically
+    and a write anywhere makes older entries unreachable; those and other cold entries are
+    evicted least recently used once the file holds more than `max_bytes`. The file is only
+    a cache: on any SQLite error the caller loads from the database as usual.
+
+    One connection serves the whole process (statements here take microseconds), which also
+    makes PRAGMA data_version report exactly the writes of other processes.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024, touch_interval: float = 60.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.touch_interval = touch_interval
+        self._versions = {}  # "table:<name>" / "user:<id>" / "user:*" / "all" -> latest version seen
+        self._seen = 0  # highest cache_versions.version synced
+        self._data_version = None
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "bumps": 0, "remote_bumps": 0,
+                       "errors": 0}
+        self.conn = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=OFF")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS cache_meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self.conn.execute("INSERT OR IGNORE INTO cache_meta (name, value) VALUES ('seq', 0)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS cache_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_versions_version ON cache_versions (version)")
+        self.conn.execute("""
+                          CREATE TABLE IF NOT EXISTS cache_entries
+                          (
+                              key      TEXT PRIMARY KEY,
+                              value    BLOB    NOT NULL,
+                              size     INTEGER NOT NULL,
+                              accessed REAL    NOT NULL
+                          )""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_entries_accessed ON cache_entries (accessed)")
+        self._bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0]
+
+    @contextmanager
+    def _transaction(self):
+        """BEGIN IMMEDIATE ... COMMIT on the cache connection; caller holds the lock"""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def sync(self) -> tuple:
+        """(tables, users, everything) bumped by other processes since the last sync; None in users: anyone.
+
+        When PRAGMA data_version says no other process wrote the file, a sync is that one PRAGMA.
+        """
+        tables, users, everything = set(), set(), False
+        with self._lock:
+            try:
+                data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+                if data_version == self._data_version:
+                    return tables, users, everything
+                rows = self.conn.execute("SELECT name, version FROM cache_versions WHERE version > ?",
+                                         (self._seen,)).fetchall()
+            except sqlite3.Error:
+                self._stats["errors"] += 1
+                return tables, users, everything
+            self._data_version = data_version
+            for name, version in rows:
+                self._seen = max(self._seen, version)
+                if version <= self._versions.get(name, 0):
+                    continue  # our own bump, or already seen
+                self._versions[name] = version
+                self._stats["remote_bumps"] += 1
+                kind, _, value = name.partition(":")
+                if kind == "table":
+                    tables.add(value)
+                elif kind == "user":
+                    users.add(None if value == "*" else int(value))
+                else:
+                    everything = True
+        return tables, users, everything
+
+    def bump(self, tables=(), users=(), everything: bool = False):
+        """Record a committed write of this process so every other process sees it on its next sync"""
+        names = [f"table:{table}" for table in tables] + [f"user:{'*' if user_id is None else user_id}"
+                                                           for user_id in users] + (["all"] if everything else [])
+        with self._lock:
+            try:
+                with self._transaction() as conn:
+                    seq = conn.execute("UPDATE cache_meta SET value = value + 1 WHERE name = 'seq' "
+                                       "RETURNING value").fetchone()[0]
+                    conn.executemany("""
+                                     INSERT INTO cache_versions (name, version)
+                                     VALUES (?, ?)
+                                     ON CONFLICT (name) DO UPDATE SET version = excluded.version
+                                     """, [(name, seq) for name in names])
+            except sqlite3.Error:
+                self._stats["errors"] += 1
+                return
+            for name in names:
+                self._versions[name] = max(self._versions.get(name, 0), seq)
+            self._stats["bumps"] += 1
+
+    def get_or_load(self, key, tables, load: Callable[[], List[sqlite3.Row]]) -> List[sqlite3.Row]:
+        """Rows stored under key and the current versions of `tables`, else load() and store them"""
+        now = time.time()
+        with self._lock:
+            versions = (self._versions.get("all", 0),) + tuple(self._versions.get(f"table:{table}", 0)
+                                                                for table in sorted(tables))
+            entry_key = repr((key, versions))
+            try:
+                row = self.conn.execute("SELECT value, accessed FROM cache_entries WHERE key = ?",
+                                        (entry_key,)).fetchone()
+                if row and now - row[1] > self.touch_interval:
+                    # Recency only needs to be roughly right; don't turn every hit into a write
+                    self.conn.execute("UPDATE cache_entries SET accessed = ? WHERE key = ?", (now, entry_key))
+            except sqlite3.Error:
+                self._stats["errors"] += 1
+                row = None
+            self._stats["hits" if row else "misses"] += 1
+        if row:
+            return decode_rows(row[0])
+
+        rows = load()
+        blob = encode_rows(rows)
+        with self._lock:
+            try:
+                self.conn.execute("INSERT OR REPLACE INTO cache_entries (key, value, size, accessed) "
+                                  "VALUES (?, ?, ?, ?)", (entry_key, blob, len(blob), now))
+            except sqlite3.Error:
+                self._stats["errors"] += 1
+                return rows
+            self._stats["stores"] += 1
+            self._bytes += len(blob)
+            if self._bytes > self.max_bytes:
+                self._evict()
+        return rows
+
+    def _evict(self):
+        """Drop the least recently used entries until the file holds 90% of max_bytes; caller holds the lock"""
+        try:
+            with self._transaction() as conn:
+                # rowcount is -1 for a statement starting with WITH
+                changes = conn.total_changes
+                conn.execute("""
+                             WITH ranked AS (SELECT key, SUM(size) OVER (ORDER BY accessed DESC) AS kept
+                                             FROM cache_entries)
+                             DELETE FROM cache_entries
+                             WHERE key IN (SELECT key FROM ranked WHERE kept > ?)
+                             """, (int(self.max_bytes * 0.9),))
+                deleted = conn.total_changes - changes
+                self._bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0]
+        except sqlite3.Error:
+            self._stats["errors"] += 1
+            return
+        self._stats["evictions"] += deleted
+
+    def clear(self):
+        """Forget everything, in every process (the database was reseeded or reset)"""
+        with self._lock:
+            try:
+                self.conn.execute("DELETE FROM cache_entries")
+                self._bytes = 0
+            except sqlite3.Error:
+                self._stats["errors"] += 1
+        self.bump(everything=True)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["bytes"] = self._bytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class ProfileCache:
+    """The `users` row of each signed-in user, shared by every session of that user.
+
+    Writes go through Database.write_through_profile: the unit that changes a user re-reads
+    the row inside its transaction and the cache takes that copy once the transaction has
+    committed. Every write gets a sequence number; a cache miss that overlaps an uncommitted
+    write is served but not stored, so the cache never holds a row older than a commit.
+    Password hashes are never cached.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # user id -> (seq, fields)
+        self._issued = {}  # user id -> last write sequence handed out
+        self._committed = {}  # user id -> last write sequence committed or abandoned
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "write_throughs": 0, "evictions": 0}
+
+    @staticmethod
+    def _fields(row) -> Dict:
+        fields = dict(row)
+        fields.pop("password_hash", None)
+        return fields
+
+    def _store(self, user_id: int, seq: int, fields: Dict):
+        self._entries[user_id] = (seq, fields)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def get_or_load(self, user_id: int, load: Callable[[], Optional[sqlite3.Row]]) -> Optional[Dict]:
+        """A copy of the user's row; callers may modify it freely"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry:
+                self._entries.move_to_end(user_id)
+                self._stats["hits"] += 1
+                return dict(entry[1])
+            self._stats["misses"] += 1
+            seq = self._issued.get(user_id, 0)
+            settled = seq == self._committed.get(user_id, 0)
+
+        row = load()
+        if row is None:
+            return None
+        fields = self._fields(row)
+        with self._lock:
+            if settled and self._issued.get(user_id, 0) == seq and user_id not in self._entries:
+                self._store(user_id, seq, fields)
+        return dict(fields)
+
+    def begin_write(self, user_id: int) -> int:
+        with self._lock:
+            self._issued[user_id] = self._issued.get(user_id, 0) + 1
+            return self._issued[user_id]
+
+    def apply(self, user_id: int, seq: int, row):
+        """The row as written by write `seq`, now committed"""
+        with self._lock:
+            self._committed[user_id] = max(self._committed.get(user_id, 0), seq)
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] < seq:
+                self._store(user_id, seq, self._fields(row))
+                self._stats["write_throughs"] += 1
+
+    def discard(self, user_id: int, seq: int):
+        """Write `seq` rolled back; drop the entry so the next read reloads it"""
+        with self._lock:
+            self._committed[user_id] = max(self._committed.get(user_id, 0), seq)
+            self._entries.pop(user_id, None)
+
+    def forget(self, user_ids):
+        """Rows another process wrote: drop them, and keep overlapping misses from storing (None: everyone)"""
+        with self._lock:
+            if None in user_ids:
+                self._entries.clear()
+                return
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+                seq = self._issued.get(user_id, 0) + 1
+                self._issued[user_id] = self._committed[user_id] = seq
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
+
+
+class CommitBatch:
+    """Units of work waiting for the same COMMIT"""
+
+    def __init__(self):
+        self.units = 0
+        self.done = threading.Event()
+        self.error: Optional[Exception] = None
+        # (user id, write sequence, row) to hand to the ProfileCache once committed
+        self.profiles = []
+
+
+@dataclass(frozen=True)
+class PageQuery:
+    """One independent read of a page's data bundle; shape picks fetch_all, fetch_one or fetch_value.
+
+    cached=True reads an "all"-shaped query through the shared query cache (fetch_cached);
+    user_id reads a query about that user's own rows through fetch_for_user.
+    """
+    query: str
+    params: tuple = ()
+    shape: str = "all"
+    default: object = None
+    cached: bool = False
+    user_id: Optional[int] = None
+
+
 class Database:
-    def __init__(self, db_path="innovate_hub_ultimate.db"):
-        self.conn = sqlite3.connect(db_path, check_same_thread=False)
-        self.conn.row_factory = sqlite3.Row
-        self.create_tables()
+    # Number of Database objects built in this process; with get_database() this stays at 1
+    instances_created = 0
+
+    def __init__(self, db_path=DB_PATH, pool_size: int = 8, idle_timeout: float = 300.0,
+                 pool_wait_timeout: float = 10.0, storage_profile: str = DEFAULT_STORAGE_PROFILE,
+                 group_commit_max_batch: int = 64, group_commit_wait: float = 0.05, loader_workers: int = 4,
+                 analytics_interval: float = 60.0, analytics_max_staleness: float = 300.0,
+                 option_cache_ttl: float = 300.0, option_cache_entries: int = 256,
+                 query_cache_bytes: int = 32 * 1024 * 1024, query_cache_entries: int = 4096,
+                 fragment_cache_bytes: int = 128 * 1024 * 1024, counter_reconcile_interval: float = 300.0,
+                 user_cache_entries: int = 16384, shared_cache_bytes: int = SHARED_CACHE_MB * 1024 * 1024):
+        self.db_path = db_path
+        self.storage_profile = storage_profile
+        profile = STORAGE_PROFILES[storage_profile]
+        self.pool = ConnectionPool(db_path, size=pool_size, idle_timeout=idle_timeout,
+                                   wait_timeout=pool_wait_timeout, pragmas=profile)
+        self.checkpointer = None
+        if profile.get("journal_mode", "").upper() == "WAL" and "checkpoint_interval" in profile:
+            self.checkpointer = WalCheckpointer(self.pool, interval=profile["checkpoint_interval"],
+                                                max_wal_bytes=profile["checkpoint_max_wal_bytes"]).start()
+        # The writer connection; every INSERT/UPDATE/DELETE goes through it via unit_of_work()
+        self.conn = self.pool.writer
+        self._write_depth = 0
+        # Group commit: units finished while other sessions queue for the writer share one COMMIT
+        self.group_commit_max_batch = group_commit_max_batch
+        self.group_commit_wait = group_commit_wait
+        self._batch: Optional[CommitBatch] = None
+        self._writers_queued = 0
+        self._queue_lock = threading.Lock()
+        self._tx_stats = {"units": 0, "rolled_back": 0, "commits": 0, "commit_errors": 0, "max_batch": 0}
+        # Tables written by the open transaction; their cached results are dropped once it commits
+        self._dirty_tables = set()
+        self._dirty_users = set()  # users whose rows the open batch wrote; None: could be anyone
+        self.option_cache = ResultCache(ttl=option_cache_ttl, max_entries=option_cache_entries)
+        # Catalog reads shared by every session; kept until a write to a table they read
+        self.query_cache = ResultCache(ttl=None, max_entries=query_cache_entries, max_bytes=query_cache_bytes)
+        # Rendered listing cards keyed by row content (see card_fragment); never invalidated, only aged out
+        self.fragments = ResultCache(ttl=None, max_entries=50000, max_bytes=fragment_cache_bytes)
+        # Serialized chart specs per user and data version (see Database.figure)
+        self.figure_cache = ResultCache(ttl=None, max_entries=2048, max_bytes=32 * 1024 * 1024)
+        # Per-user reads keyed by data version (see fetch_for_user); stale versions age out
+        self.user_cache = ResultCache(ttl=None, max_entries=user_cache_entries, max_bytes=32 * 1024 * 1024)
+        # Committed writes as per-table and per-user versions; the table-tagged caches listen to it
+        self.bus = InvalidationBus()
+        for cache in (self.option_cache, self.query_cache):
+            self.bus.subscribe(cache.invalidate)
+        # Second tier behind the option and query caches, shared with the other worker processes
+        self.shared = SharedCache(db_path + "-cache", max_bytes=shared_cache_bytes) if shared_cache_bytes else None
+        self.profiles = ProfileCache()
+        # Startup prefetch, started by get_database (CacheWarmer)
+        self.warmer: Optional[CacheWarmer] = None
+        # Profile write-throughs of the open outermost unit: [(savepoint depth, user id, seq, row)]
+        self._unit_profiles = []
+        self._tx_latency = deque(maxlen=2048)
+        self._commit_times = deque(maxlen=4096)
+        self._query_stats = {}
+        self._query_stats_lock = threading.Lock()
+        # Page loader threads each keep one read connection from the pool
+        self._loader = ThreadPoolExecutor(max_workers=max(1, min(loader_workers, pool_size - 1)),
+                                          thread_name_prefix="page-loader")
+        self._loader_stats = {"loads": 0, "queries": 0, "wall_ms": 0.0, "serial_ms": 0.0, "max_wall_ms": 0.0}
+        self.created_at = datetime.now()
+        self.schema_initializations = 0
+        Database.instances_created += 1
+        self.migrate()
+        # Analytics tabs read a periodically refreshed copy instead of competing with writes
+        self.analytics = AnalyticsSnapshot(self.pool, interval=analytics_interval,
+                                           max_staleness=analytics_max_staleness).start()
+        self.reconciler = CounterReconciler(self.reconcile_user_counters, counter_reconcile_interval).start()
 
     def create_tables(self):
         """Enhanced database schema with all features"""
-        cursor = self.conn.cursor()
-
-        try:
+        with self.writer() as cursor:
             # Enhanced users table
             cursor.execute('''
                            CREATE TABLE IF NOT EXISTS users
@@ -888,395 +2163,1775 @@ class Database:
                            )
                                )''')
 
-            self.conn.commit()
-            print("Database tables created successfully")
-
-        except sqlite3.Error as e:
-            print(f"Error creating tables: {e}")
-            st.error(f"Database error: {e}")
+        self.schema_initializations += 1
+        print("Database tables created successfully")
+
+    def ensure_indexes(self):
+        """Create any missing index from INDEXES, one short write transaction per index"""
+        for name, table, columns in INDEXES:
+            with self.writer() as cursor:
+                cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+        with self.writer() as cursor:
+            cursor.execute("PRAGMA optimize")
+
+    def schema_version(self) -> int:
+        if not self.fetch_one("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'"):
+            return 0
+        return self.fetch_value("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+
+    def migrate(self) -> List[Dict]:
+        """Apply every pending step of MIGRATIONS in order and report how long each took"""
+        with self.writer() as cursor:
+            cursor.execute("""
+                           CREATE TABLE IF NOT EXISTS schema_version
+                           (
+                               version     INTEGER PRIMARY KEY,
+                               description TEXT NOT NULL,
+                               applied_at  TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                               duration_ms REAL
+                           )""")
+
+        current = self.schema_version()
+        report = []
+        for migration in MIGRATIONS:
+            if migration.version <= current:
+                continue
+            start = time.perf_counter()
+            migration.apply(self)
+            duration_ms = (time.perf_counter() - start) * 1000
+            with self.writer() as cursor:
+                cursor.execute("""
+                               INSERT OR IGNORE INTO schema_version (version, description, duration_ms)
+                               VALUES (?, ?, ?)
+                               """, (migration.version, migration.description, duration_ms))
+            report.append({"version": migration.version, "description": migration.description,
+                           "duration_ms": round(duration_ms, 1)})
+            print(f"Migration {migration.version} ({migration.description}) applied in {duration_ms:.1f} ms")
+        return report
+
+    def add_column(self, table: str, column: str, definition: str) -> bool:
+        """ALTER TABLE ADD COLUMN unless the column already exists; O(1) in SQLite"""
+        columns = [row['name'] for row in self.fetch_all(f"PRAGMA table_info({table})")]
+        if column in columns:
+            return False
+        with self.writer() as cursor:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        return True
+
+    def backfill_in_batches(self, table: str, assignments: str, where: str = "1 = 1",
+                            batch_size: int = 5000) -> int:
+        """UPDATE a large table one rowid window at a time.
+
+        Each window commits on its own, so the writer lock is released between batches and
+        sessions keep writing while the backfill runs. `where` should exclude rows that are
+        already done (e.g. "col IS NULL") so an interrupted backfill resumes where it stopped.
+        """
+        max_rowid = self.fetch_value(f"SELECT MAX(rowid) FROM {table}") or 0
+        updated = 0
+        for start in range(0, max_rowid, batch_size):
+            with self.writer() as cursor:
+                cursor.execute(f"UPDATE {table} SET {assignments} WHERE rowid > ? AND rowid <= ? AND ({where})",
+                               (start, start + batch_size))
+                self._dirty_tables.add(table)
+                if table in USER_SCOPED_TABLES:
+                    self._dirty_users.add(None)
+                updated += cursor.rowcount
+        return updated
+
+    def create_counters(self):
+        """platform_counters, the triggers that keep it current and its initial values"""
+        with self.writer() as cursor:
+            cursor.execute("""
+                           CREATE TABLE IF NOT EXISTS platform_counters
+                           (
+                               name  TEXT PRIMARY KEY,
+                               value NUMERIC NOT NULL DEFAULT 0
+                           )""")
+            cursor.execute("""
+                           CREATE TABLE IF NOT EXISTS counter_groups
+                           (
+                               counter TEXT    NOT NULL,
+                               value   TEXT    NOT NULL,
+                               rows    INTEGER NOT NULL,
+                               PRIMARY KEY (counter, value)
+                           )""")
+            for sql in counter_trigger_statements():
+                cursor.execute(sql)
+        self.rebuild_counters()
+
+    def rebuild_counters(self) -> Dict[str, tuple]:
+        """Recompute every KPI counter from the base tables; returns {name: (old, new)} for drifted ones"""
+        with self.writer() as cursor:
+            cursor.execute("SELECT name, value FROM platform_counters")
+            before = dict(cursor.fetchall())
+            cursor.execute("DELETE FROM counter_groups")
+            cursor.execute("DELETE FROM platform_counters")
+            for table, spec in KPI_COUNTERS.items():
+                names = list(spec["counters"])
+                cursor.execute("SELECT " + ", ".join(f"COALESCE(SUM({spec['counters'][name].format(row=table)}), 0)"
+                                                     for name in names) + f" FROM {table}")
+                cursor.executemany("INSERT INTO platform_counters (name, value) VALUES (?, ?)",
+                                   zip(names, cursor.fetchone()))
+            for name, (table, column) in KPI_DISTINCT_COUNTERS.items():
+                cursor.execute("INSERT INTO platform_counters (name, value) VALUES (?, 0)", (name,))
+                # Each group row inserted bumps the distinct counter through its trigger
+                cursor.execute(f"""
+                               INSERT INTO counter_groups (counter, value, rows)
+                               SELECT ?, {column}, COUNT(*)
+                               FROM {table}
+                               WHERE {column} IS NOT NULL
+                               GROUP BY {column}
+                               """, (name,))
+            cursor.execute("SELECT name, value FROM platform_counters")
+            after = dict(cursor.fetchall())
+        return {name: (before.get(name), value) for name, value in after.items() if before.get(name) != value}
+
+    def create_user_counters(self):
+        """user_counters, the triggers that keep the per-user badges current and their initial values"""
+        with self.writer() as cursor:
+            cursor.execute("""
+                           CREATE TABLE IF NOT EXISTS user_counters
+                           (
+                               user_id INTEGER NOT NULL,
+                               name    TEXT    NOT NULL,
+                               value   INTEGER NOT NULL DEFAULT 0,
+                               PRIMARY KEY (user_id, name)
+                           ) WITHOUT ROWID""")
+            for sql in user_counter_trigger_statements():
+                cursor.execute(sql)
+        self.reconcile_user_counters()
+
+    def create_search_index(self, index: str):
+        """One SEARCH_INDEXES FTS5 table, the triggers that keep it current and its initial contents"""
+        with self.writer() as cursor:
+            cursor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5("
+                           f"{', '.join(SEARCH_INDEXES[index]['columns'])}, "
+                           f"tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')")
+            for sql in search_index_trigger_statements(index):
+                cursor.execute(sql)
+        self.rebuild_search_index(index)
+
+    def rebuild_search_index(self, index: str) -> int:
+        """Re-index every row of the index's base table; returns the number of rows indexed"""
+        spec = SEARCH_INDEXES[index]
+        table = spec["table"]
+        with self.writer() as cursor:
+            cursor.execute(f"DELETE FROM {index}")
+            cursor.execute(f"INSERT INTO {index} (rowid, {', '.join(spec['columns'])}) "
+                           f"SELECT id, {', '.join(expr.format(row=table) for expr in spec['columns'].values())} "
+                           f"FROM {table}")
+            self._dirty_tables.add(index)
+            return cursor.rowcount
+
+    def create_item_index(self, items: str):
+        """One ITEM_INDEXES table, the triggers that keep it current and its initial rows"""
+        _, key, _ = ITEM_INDEXES[items]
+        with self.writer() as cursor:
+            cursor.execute(f"""
+                           CREATE TABLE IF NOT EXISTS {items}
+                           (
+                               kind  TEXT    NOT NULL,
+                               item  TEXT    NOT NULL COLLATE NOCASE,
+                               {key} INTEGER NOT NULL,
+                               PRIMARY KEY (kind, item, {key})
+                           ) WITHOUT ROWID""")
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{items}_{key} ON {items} ({key}, kind)")
+            for sql in item_index_trigger_statements(items):
+                cursor.execute(sql)
+        self.rebuild_item_index(items)
+
+    def replace_item_triggers(self):
+        """Recreate every ITEM_INDEXES trigger from item_index_trigger_statements() and re-split the rows"""
+        with self.writer() as cursor:
+            for items, (_, _, kinds) in ITEM_INDEXES.items():
+                for kind in kinds:
+                    for event in ("insert", "delete", "update"):
+                        cursor.execute(f"DROP TRIGGER IF EXISTS {items}_{kind}_{event}")
+                for sql in item_index_trigger_statements(items):
+                    cursor.execute(sql)
+        for items in ITEM_INDEXES:
+            self.rebuild_item_index(items)
+
+    def rebuild_item_index(self, items: str) -> int:
+        """Re-split every row of the index's base table; returns the number of items indexed"""
+        table, key, kinds = ITEM_INDEXES[items]
+        indexed = 0
+        with self.writer() as cursor:
+            cursor.execute(f"DELETE FROM {items}")
+            for kind, column in kinds.items():
+                cursor.execute(f"INSERT OR IGNORE INTO {items} (kind, item, {key}) "
+                               f"SELECT '{kind}', {ITEM_VALUE}, {table}.id FROM {table}, {split_items(table, column)} "
+                               f"WHERE {ITEM_VALUE} != ''")
+                indexed += cursor.rowcount
+            self._dirty_tables.add(items)
+        return indexed
+
+    def reconcile_user_counters(self) -> Dict[tuple, tuple]:
+        """Recount every badge from its base table and fix the drifted ones; returns {(user_id, name): (old, new)}"""
+        with self.writer() as cursor:
+            cursor.execute("SELECT user_id, name, value FROM user_counters WHERE value != 0")
+            stored = {(user_id, name): value for user_id, name, value in cursor.fetchall()}
+            actual = {}
+            for name, (table, owner, condition, _) in USER_COUNTERS.items():
+                cursor.execute(f"SELECT {owner}, COUNT(*) FROM {table} "
+                               f"WHERE {condition.format(row=table)} GROUP BY {owner}")
+                actual.update(((user_id, name), count) for user_id, count in cursor.fetchall())
+            drift = {key: (stored.get(key, 0), actual.get(key, 0)) for key in stored.keys() | actual.keys()
+                     if stored.get(key, 0) != actual.get(key, 0)}
+            cursor.executemany("""
+                               INSERT INTO user_counters (user_id, name, value)
+                               VALUES (?, ?, ?)
+                               ON CONFLICT (user_id, name) DO UPDATE SET value = excluded.value
+                               """, [(user_id, name, new) for (user_id, name), (_, new) in drift.items()])
+            if drift:
+                self._dirty_tables.add("user_counters")
+                self._dirty_users |= {user_id for user_id, _ in drift}
+        return drift
+
+    def badges(self, user_id: int) -> Dict[str, int]:
+        """The user's unread messages, unread notifications and pending connection requests"""
+        return badge_values(self.fetch_for_user("counters.for_user", user_id, (user_id,)))
+
+    def counters(self) -> Dict[str, float]:
+        """Every KPI counter plus the averages derived from them, in one lookup"""
+        return kpi_values(self.fetch_cached("counters.all"))
+
+    def explain(self, sql: str, params=()) -> List[str]:
+        """EXPLAIN QUERY PLAN detail lines for a statement"""
+        with self.reader() as conn:
+            return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
 
     def seed_comprehensive_data(self):
         """Seed comprehensive data for all features"""
-        cursor = self.conn.cursor()
-
-        # Check if data already exists
-        cursor.execute("SELECT COUNT(*) FROM users")
-        if cursor.fetchone()[0] > 0:
-            return
-
         try:
-            # Seed universities
-            universities = [
-                ("United Arab Emirates University", "Al Ain", "UAE", "https://uaeu.ac.ae",
-                 "info@uaeu.ac.ae", "+971-3-713-5555",
-                 "The oldest university in the UAE, established in 1976", 1976, 14000, 700, 1, True),
-                ("American University of Sharjah", "Sharjah", "UAE", "https://aus.edu",
-                 "info@aus.edu", "+971-6-515-5555",
-                 "Leading American-style university in the Middle East", 1997, 6000, 400, 2, True),
-                ("Khalifa University", "Abu Dhabi", "UAE", "https://ku.ac.ae",
-                 "info@ku.ac.ae", "+971-2-312-3456",
-                 "Research-intensive university focusing on science and engineering", 2007, 4000, 500, 3, True),
-                ("NYU Abu Dhabi", "Abu Dhabi", "UAE", "https://nyuad.nyu.edu",
-                 "nyuad.info@nyu.edu", "+971-2-628-4000",
-                 "Liberal arts and science college bringing together NYU and Abu Dhabi", 2010, 2000, 300, 4, True),
-                ("Masdar Institute", "Abu Dhabi", "UAE", "https://masdar.ac.ae",
-                 "info@masdar.ac.ae", "+971-2-810-9999",
-                 "Graduate-level research university focused on alternative energy", 2007, 800, 150, 5, True)
-            ]
-
-            for uni in universities:
-                cursor.execute('''
-                               INSERT INTO universities (name, location, country, website, contact_email,
-                                                         contact_phone, description, established_year, total_students,
-                                                         total_faculty, ranking_national, is_verified)
-                               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                               ''', uni)
-
-            # Seed companies
-            companies = [
-                ("Dubai Future Foundation", "Leading government organization driving future innovation in UAE",
-                 "Government", "Large", "Dubai", "https://dubaifuture.gov.ae", None, 2016, 50000, 15, 4.8, True),
-                ("Mubadala Investment Company", "Strategic investment company creating lasting value",
-                 "Investment", "Large", "Abu Dhabi", "https://mubadala.com", None, 2002, 75000, 22, 4.9, True),
-                ("ADNOC", "Leading energy and petrochemicals company",
-                 "Energy", "Large", "Abu Dhabi", "https://adnoc.ae", None, 1971, 60000, 18, 4.7, True),
-                ("Noon", "E-commerce platform and technology company",
-                 "Technology", "Large", "Dubai", "https://noon.com", None, 2016, 40000, 12, 4.6, True),
-                ("Emaar Properties", "Leading real estate development company",
-                 "Real Estate", "Large", "Dubai", "https://emaar.com", None, 1997, 45000, 20, 4.5, True),
-                ("Careem", "Revolutionary ride-hailing and delivery platform",
-                 "Technology", "Medium", "Dubai", "https://careem.com", None, 2012, 35000, 10, 4.7, True),
-                ("Etisalat", "Leading telecommunications provider",
-                 "Telecommunications", "Large", "Abu Dhabi", "https://etisalat.ae", None, 1976, 55000, 25, 4.6, True)
-            ]
-
-            cursor.executemany('''
-                               INSERT INTO companies (name, description, industry, size, location, website,
-                                                      logo_url, founded_year, kic_balance, total_projects_posted,
-                                                      rating, is_verified)
-                               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                               ''', companies)
-
-            # Seed users
-            users = [
-                ("ahmed.mansouri@example.com", hashlib.sha256("password123".encode()).hexdigest(),
-                 "Ahmed Al Mansouri", "talent", "Tech Innovations LLC",
-                 "Robotics Engineer specializing in AI-driven automation systems. 5+ years experience in industrial robotics.",
-                 "Abu Dhabi", None, "+971501234567", "https://linkedin.com/in/ahmed-mansouri",
-                 "https://robotics-portfolio.ae", 1500, 15, 450, True, True),
-                ("fatima.zaabi@example.com", hashlib.sha256("password123".encode()).hexdigest(),
-                 "Dr. Fatima Al Zaabi", "talent", "Analytics Solutions",
-                 "Data Scientist and Machine Learning expert with focus on healthcare applications.",
-                 "Dubai", None, "+971507654321", "https://linkedin.com/in/fatima-zaabi",
-                 "https://ml-portfolio.ae", 2200, 25, 780, True, True),
-                ("sara.hassan@example.com", hashlib.sha256("password123".encode()).hexdigest(),
-                 "Sara Hassan", "company", "Dubai Future Foundation",
-                 "Innovation Manager at Dubai Future Foundation, leading emerging technology initiatives.",
-                 "Dubai", None, "+971509876543", "https://linkedin.com/in/sara-hassan", None,
-                 5000, 8, 320, True, True),
-                ("mohammed.rashid@uaeu.ac.ae", hashlib.sha256("password123".encode()).hexdigest(),
-                 "Dr. Mohammed Al Rashid", "researcher", "UAE University",
-                 "Professor of Computer Science specializing in AI and Machine Learning research.",
-                 "Al Ain", None, "+971501112233", "https://linkedin.com/in/mohammed-rashid",
-                 "https://uaeu.ac.ae/dr-rashid", 3000, 20, 650, True, True),
-                ("layla.ibrahim@example.com", hashlib.sha256("password123".encode()).hexdigest(),
-                 "Layla Ibrahim", "talent", "Biotech Solutions",
-                 "Biotechnology researcher with expertise in genomics and pharmaceutical development.",
-                 "Sharjah", None, "+971502223344", "https://linkedin.com/in/layla-ibrahim", None,
-                 1800, 12, 380, True, True)
-            ]
-
-            for user in users:
-                cursor.execute('''
-                               INSERT INTO users (email, password_hash, name, user_type, organization, bio, location,
-                                                  profile_image, phone, linkedin_url, website_url, kic_balance,
-                                                  total_projects_completed, reputation_score, is_verified, is_active)
-                               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                               ''', user)
-
-            # Seed talents
-            talents_data = [
-                (1, "Senior Robotics Engineer", "Abu Dhabi", "5-10 years", "MSc Robotics Engineering",
-                 "Python,C++,ROS,Machine Learning,Computer Vision,MATLAB", "Full-time",
-                 "Expert in autonomous systems and industrial automation", 200, 100,
-                 "https://portfolio.ae/ahmed", "https://linkedin.com/in/ahmed", 4.8, 15, 45000,
-                 "Industrial Automation,Autonomous Systems", "ROS Certified,AWS ML Certified",
-                 "English,Arabic", True),
-                (2, "Lead Data Scientist", "Dubai", "10+ years", "PhD Computer Science",
-                 "Python,R,TensorFlow,PyTorch,SQL,Spark,Tableau", "Full-time",
-                 "Specializing in healthcare AI and predictive analytics", 250, 125,
-                 "https://portfolio.ae/fatima", "https://linkedin.com/in/fatima", 4.9, 25, 72000,
-                 "Healthcare AI,Predictive Analytics", "Google ML Engineer,AWS Data Analytics",
-                 "English,Arabic,French", True),
-                (5, "Biotechnology Research Consultant", "Sharjah", "5-10 years", "PhD Biotechnology",
-                 "Gene Sequencing,CRISPR,Cell Culture,Bioinformatics,Python", "Part-time",
-                 "Expert in genomics and pharmaceutical research", 180, 90,
-                 None, "https://linkedin.com/in/layla", 4.7, 12, 28000,
-                 "Genomics,Drug Discovery", "Certified Clinical Research", "English,Arabic", False)
-            ]
-
-            cursor.executemany('''
-                               INSERT INTO talents (user_id, title, location, experience, education, skills,
-                                                    availability, bio, hourly_rate, kic_hourly_rate, portfolio_url,
-                                                    linkedin_url, rating, total_projects, total_earnings,
-                                                    specializations, certifications, languages, is_featured)
-                               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                               ''', talents_data)
-
-            # Seed labs
-            labs = [
-                ("AI & Machine Learning Lab", 1, "Al Ain", "Artificial Intelligence",
-                 "2024-03-01", "GPU Clusters,Python Environment,TensorFlow,PyTorch,CUDA Workstations",
-                 "State-of-the-art AI research facility with latest GPU clusters", "ai.lab@uaeu.ac.ae",
-                 800, 400, 4.8, None, 20, "High-speed Internet,Coffee Station,Whiteboards,24/7 Access",
-                 45, True, "PhD or Masters in AI/ML required", "Safety briefing mandatory"),
-                ("Robotics Engineering Lab", 2, "Sharjah", "Robotics",
-                 "2024-03-01", "Industrial Robots,3D Printers,Sensors,Actuators,Motion Capture System",
-                 "Comprehensive robotics research and development facility", "robotics@aus.edu",
-                 1200, 600, 4.7, None, 15, "Tool Workshop,Testing Arena,Storage,VR Equipment",
-                 38, True, "Engineering background required", "Protective equipment mandatory"),
-                ("Biotechnology Research Lab", 3, "Abu Dhabi", "Biotechnology",
-                 "2024-03-01", "PCR Machines,Microscopes,Centrifuges,Incubators,Flow Cytometer",
-                 "Advanced biotechnology facility for cutting-edge research", "biolab@ku.ac.ae",
-                 1500, 750, 4.9, None, 12, "Clean Room,Chemical Storage,Emergency Shower,Fume Hoods",
-                 52, True, "Biology/Chemistry degree required", "Biosafety level 2 protocols"),
-                ("Nanotechnology Lab", 4, "Abu Dhabi", "Nanotechnology",
-                 "2024-03-01", "Electron Microscope,AFM,Cleanroom,Lithography Equipment",
-                 "Advanced nanoscale research and fabrication facility", "nanolab@nyuad.nyu.edu",
-                 2000, 1000, 4.9, None, 8, "Cleanroom,Gas Storage,Chemical Storage",
-                 28, True, "Nanotechnology training required", "Cleanroom protocols mandatory"),
-                ("Renewable Energy Lab", 5, "Abu Dhabi", "Energy",
-                 "2024-03-01", "Solar Panels,Wind Turbines,Battery Storage,Power Analyzers",
-                 "Renewable energy testing and development facility", "energy@masdar.ac.ae",
-                 1000, 500, 4.7, None, 25, "Outdoor Testing Area,Workshop,Conference Room",
-                 35, True, "Energy engineering background", "Electrical safety training required")
-            ]
-
-            for lab in labs:
-                cursor.execute('''
-                               INSERT INTO labs (name, university_id, location, specialty, available_from, equipment,
-                                                 description, contact, price_per_day, kic_price_per_day, rating,
-                                                 image_url, capacity, amenities, total_bookings, is_featured,
-                                                 access_requirements, safety_protocols)
-                               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                               ''', lab)
-
-            # Seed projects
-            projects = [
-                ("AI-Powered Smart City Infrastructure", "Dubai Future Foundation", 1, "Dubai",
-                 "2024-08-15", "2024-02-01",
-                 "Develop AI systems for smart traffic management, energy optimization, and citizen services integration.",
-                 "AI/ML expertise, smart city experience, IoT knowledge, Arabic language preferred",
-                 "AI,Smart City,IoT,Machine Learning,Arabic", 80000, 120000, 4000, 6000, "Active",
-                 "projects@dubaifuture.gov.ae", 234, 18, "Innovation", "High", True, 3),
-                ("Blockchain Supply Chain Transparency", "Mubadala Investment Company", 2, "Abu Dhabi",
-                 "2024-07-30", "2024-02-05",
-                 "Create blockchain solution for supply chain transparency in healthcare and pharmaceuticals.",
-                 "Blockchain development, smart contracts, healthcare domain knowledge",
-                 "Blockchain,Healthcare,Supply Chain,Smart Contracts", 60000, 90000, 3000, 4500, "Active",
-                 "blockchain@mubadala.ae", 156, 12, "Research", "Medium", False, 3),
-                ("Renewable Energy Grid Optimization", "ADNOC", 3, "Abu Dhabi",
-                 "2024-09-01", "2024-02-10",
-                 "Optimize energy distribution using AI and IoT sensors for renewable energy integration.",
-                 "Energy systems, AI/ML, IoT, electrical engineering background",
-                 "Energy,AI,IoT,Sustainability,Grid Systems", 100000, 150000, 5000, 7500, "Active",
-                 "energy@adnoc.ae", 189, 15, "Innovation", "High", True, 3),
-                ("E-commerce Personalization Engine", "Noon", 4, "Dubai",
-                 "2024-06-30", "2024-02-12",
-                 "Build advanced ML models for personalized shopping experiences and recommendations.",
-                 "Machine Learning, recommendation systems, e-commerce experience",
-                 "ML,E-commerce,Python,Recommendation Systems", 70000, 100000, 3500, 5000, "Active",
-                 "tech@noon.com", 203, 22, "Development", "Medium", True, 3),
-                ("Smart Building Management System", "Emaar Properties", 5, "Dubai",
-                 "2024-08-01", "2024-02-15",
-                 "Develop IoT-based building management system for energy efficiency and tenant comfort.",
-                 "IoT development, building automation, energy management",
-                 "IoT,Smart Buildings,Energy,Automation", 85000, 125000, 4250, 6250, "Active",
-                 "innovation@emaar.com", 145, 10, "Development", "Medium", False, 3)
-            ]
+            # One unit on the shared writer: a concurrent session's open batch is never mixed in,
+            # and two workers starting together don't both seed
+            with self.writer() as cursor:
+                # Check if data already exists
+                cursor.execute("SELECT COUNT(*) FROM users")
+                if cursor.fetchone()[0] > 0:
+                    return
+
+                # Seed universities
+                universities = [
+                    ("United Arab Emirates University", "Al Ain", "UAE", "https://uaeu.ac.ae",
+                     "info@uaeu.ac.ae", "+971-3-713-5555",
+                     "The oldest university in the UAE, established in 1976", 1976, 14000, 700, 1, True),
+                    ("American University of Sharjah", "Sharjah", "UAE", "https://aus.edu",
+                     "info@aus.edu", "+971-6-515-5555",
+                     "Leading American-style university in the Middle East", 1997, 6000, 400, 2, True),
+                    ("Khalifa University", "Abu Dhabi", "UAE", "https://ku.ac.ae",
+                     "info@ku.ac.ae", "+971-2-312-3456",
+                     "Research-intensive university focusing on science and engineering", 2007, 4000, 500, 3, True),
+                    ("NYU Abu Dhabi", "Abu Dhabi", "UAE", "https://nyuad.nyu.edu",
+                     "nyuad.info@nyu.edu", "+971-2-628-4000",
+                     "Liberal arts and science college bringing together NYU and Abu Dhabi", 2010, 2000, 300, 4, True),
+                    ("Masdar Institute", "Abu Dhabi", "UAE", "https://masdar.ac.ae",
+                     "info@masdar.ac.ae", "+971-2-810-9999",
+                     "Graduate-level research university focused on alternative energy", 2007, 800, 150, 5, True)
+                ]
+
+                for uni in universities:
+                    cursor.execute('''
+                                   INSERT INTO universities (name, location, country, website, contact_email,
+                                                             contact_phone, description, established_year, total_students,
+                                                             total_faculty, ranking_national, is_verified)
+                                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                                   ''', uni)
+
+                # Seed companies
+                companies = [
+                    ("Dubai Future Foundation", "Leading government organization driving future innovation in UAE",
+                     "Government", "Large", "Dubai", "https://dubaifuture.gov.ae", None, 2016, 50000, 15, 4.8, True),
+                    ("Mubadala Investment Company", "Strategic investment company creating lasting value",
+                     "Investment", "Large", "Abu Dhabi", "https://mubadala.com", None, 2002, 75000, 22, 4.9, True),
+                    ("ADNOC", "Leading energy and petrochemicals company",
+                     "Energy", "Large", "Abu Dhabi", "https://adnoc.ae", None, 1971, 60000, 18, 4.7, True),
+                    ("Noon", "E-commerce platform and technology company",
+                     "Technology", "Large", "Dubai", "https://noon.com", None, 2016, 40000, 12, 4.6, True),
+                    ("Emaar Properties", "Leading real estate development company",
+                     "Real Estate", "Large", "Dubai", "https://emaar.com", None, 1997, 45000, 20, 4.5, True),
+                    ("Careem", "Revolutionary ride-hailing and delivery platform",
+                     "Technology", "Medium", "Dubai", "https://careem.com", None, 2012, 35000, 10, 4.7, True),
+                    ("Etisalat", "Leading telecommunications provider",
+                     "Telecommunications", "Large", "Abu Dhabi", "https://etisalat.ae", None, 1976, 55000, 25, 4.6, True)
+                ]
+
+                cursor.executemany('''
+                                   INSERT INTO companies (name, description, industry, size, location, website,
+                                                          logo_url, founded_year, kic_balance, total_projects_posted,
+                                                          rating, is_verified)
+                                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                                   ''', companies)
+
+                # Seed users
+                users = [
+                    ("ahmed.mansouri@example.com", hashlib.sha256("password123".encode()).hexdigest(),
+                     "Ahmed Al Mansouri", "talent", "Tech Innovations LLC",
+                     "Robotics Engineer specializing in AI-driven automation systems. 5+ years experience in industrial robotics.",
+                     "Abu Dhabi", None, "+971501234567", "https://linkedin.com/in/ahmed-mansouri",
+                     "https://robotics-portfolio.ae", 1500, 15, 450, True, True),
+                    ("fatima.zaabi@example.com", hashlib.sha256("password123".encode()).hexdigest(),
+                     "Dr. Fatima Al Zaabi", "talent", "Analytics Solutions",
+                     "Data Scientist and Machine Learning expert with focus on healthcare applications.",
+                     "Dubai", None, "+971507654321", "https://linkedin.com/in/fatima-zaabi",
+                     "https://ml-portfolio.ae", 2200, 25, 780, True, True),
+                    ("sara.hassan@example.com", hashlib.sha256("password123".encode()).hexdigest(),
+                     "Sara Hassan", "company", "Dubai Future Foundation",
+                     "Innovation Manager at Dubai Future Foundation, leading emerging technology initiatives.",
+                     "Dubai", None, "+971509876543", "https://linkedin.com/in/sara-hassan", None,
+                     5000, 8, 320, True, True),
+                    ("mohammed.rashid@uaeu.ac.ae", hashlib.sha256("password123".encode()).hexdigest(),
+                     "Dr. Mohammed Al Rashid", "researcher", "UAE University",
+                     "Professor of Computer Science specializing in AI and Machine Learning research.",
+                     "Al Ain", None, "+971501112233", "https://linkedin.com/in/mohammed-rashid",
+                     "https://uaeu.ac.ae/dr-rashid", 3000, 20, 650, True, True),
+                    ("layla.ibrahim@example.com", hashlib.sha256("password123".encode()).hexdigest(),
+                     "Layla Ibrahim", "talent", "Biotech Solutions",
+                     "Biotechnology researcher with expertise in genomics and pharmaceutical development.",
+                     "Sharjah", None, "+971502223344", "https://linkedin.com/in/layla-ibrahim", None,
+                     1800, 12, 380, True, True)
+                ]
+
+                for user in users:
+                    cursor.execute('''
+                                   INSERT INTO users (email, password_hash, name, user_type, organization, bio, location,
+                                                      profile_image, phone, linkedin_url, website_url, kic_balance,
+                                                      total_projects_completed, reputation_score, is_verified, is_active)
+                                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                                   ''', user)
+
+                # Seed talents
+                talents_data = [
+                    (1, "Senior Robotics Engineer", "Abu Dhabi", "5-10 years", "MSc Robotics Engineering",
+                     "Python,C++,ROS,Machine Learning,Computer Vision,MATLAB", "Full-time",
+                     "Expert in autonomous systems and industrial automation", 200, 100,
+                     "https://portfolio.ae/ahmed", "https://linkedin.com/in/ahmed", 4.8, 15, 45000,
+                     "Industrial Automation,Autonomous Systems", "ROS Certified,AWS ML Certified",
+                     "English,Arabic", True),
+                    (2, "Lead Data Scientist", "Dubai", "10+ years", "PhD Computer Science",
+                     "Python,R,TensorFlow,PyTorch,SQL,Spark,Tableau", "Full-time",
+                     "Specializing in healthcare AI and predictive analytics", 250, 125,
+                     "https://portfolio.ae/fatima", "https://linkedin.com/in/fatima", 4.9, 25, 72000,
+                     "Healthcare AI,Predictive Analytics", "Google ML Engineer,AWS Data Analytics",
+                     "English,Arabic,French", True),
+                    (5, "Biotechnology Research Consultant", "Sharjah", "5-10 years", "PhD Biotechnology",
+                     "Gene Sequencing,CRISPR,Cell Culture,Bioinformatics,Python", "Part-time",
+                     "Expert in genomics and pharmaceutical research", 180, 90,
+                     None, "https://linkedin.com/in/layla", 4.7, 12, 28000,
+                     "Genomics,Drug Discovery", "Certified Clinical Research", "English,Arabic", False)
+                ]
+
+                cursor.executemany('''
+                                   INSERT INTO talents (user_id, title, location, experience, education, skills,
+                                                        availability, bio, hourly_rate, kic_hourly_rate, portfolio_url,
+                                                        linkedin_url, rating, total_projects, total_earnings,
+                                                        specializations, certifications, languages, is_featured)
+                                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                                   ''', talents_data)
+
+                # Seed labs
+                labs = [
+                    ("AI & Machine Learning Lab", 1, "Al Ain", "Artificial Intelligence",
+                     "2024-03-01", "GPU Clusters,Python Environment,TensorFlow,PyTorch,CUDA Workstations",
+                     "State-of-the-art AI research facility with latest GPU clusters", "ai.lab@uaeu.ac.ae",
+                     800, 400, 4.8, None, 20, "High-speed Internet,Coffee Station,Whiteboards,24/7 Access",
+                     45, True, "PhD or Masters in AI/ML required", "Safety briefing mandatory"),
+                    ("Robotics Engineering Lab", 2, "Sharjah", "Robotics",
+                     "2024-03-01", "Industrial Robots,3D Printers,Sensors,Actuators,Motion Capture System",
+                     "Comprehensive robotics research and development facility", "robotics@aus.edu",
+                     1200, 600, 4.7, None, 15, "Tool Workshop,Testing Arena,Storage,VR Equipment",
+                     38, True, "Engineering background required", "Protective equipment mandatory"),
+                    ("Biotechnology Research Lab", 3, "Abu Dhabi", "Biotechnology",
+                     "2024-03-01", "PCR Machines,Microscopes,Centrifuges,Incubators,Flow Cytometer",
+                     "Advanced biotechnology facility for cutting-edge research", "biolab@ku.ac.ae",
+                     1500, 750, 4.9, None, 12, "Clean Room,Chemical Storage,Emergency Shower,Fume Hoods",
+                     52, True, "Biology/Chemistry degree required", "Biosafety level 2 protocols"),
+                    ("Nanotechnology Lab", 4, "Abu Dhabi", "Nanotechnology",
+                     "2024-03-01", "Electron Microscope,AFM,Cleanroom,Lithography Equipment",
+                     "Advanced nanoscale research and fabrication facility", "nanolab@nyuad.nyu.edu",
+                     2000, 1000, 4.9, None, 8, "Cleanroom,Gas Storage,Chemical Storage",
+                     28, True, "Nanotechnology training required", "Cleanroom protocols mandatory"),
+                    ("Renewable Energy Lab", 5, "Abu Dhabi", "Energy",
+                     "2024-03-01", "Solar Panels,Wind Turbines,Battery Storage,Power Analyzers",
+                     "Renewable energy testing and development facility", "energy@masdar.ac.ae",
+                     1000, 500, 4.7, None, 25, "Outdoor Testing Area,Workshop,Conference Room",
+                     35, True, "Energy engineering background", "Electrical safety training required")
+                ]
+
+                for lab in labs:
+                    cursor.execute('''
+                                   INSERT INTO labs (name, university_id, location, specialty, available_from, equipment,
+                                                     description, contact, price_per_day, kic_price_per_day, rating,
+                                                     image_url, capacity, amenities, total_bookings, is_featured,
+                                                     access_requirements, safety_protocols)
+                                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                                   ''', lab)
+
+                # Seed projects
+                projects = [
+                    ("AI-Powered Smart City Infrastructure", "Dubai Future Foundation", 1, "Dubai",
+                     "2024-08-15", "2024-02-01",
+                     "Develop AI systems for smart traffic management, energy optimization, and citizen services integration.",
+                     "AI/ML expertise, smart city experience, IoT knowledge, Arabic language preferred",
+                     "AI,Smart City,IoT,Machine Learning,Arabic", 80000, 120000, 4000, 6000, "Active",
+                     "projects@dubaifuture.gov.ae", 234, 18, "Innovation", "High", True, 3),
+                    ("Blockchain Supply Chain Transparency", "Mubadala Investment Company", 2, "Abu Dhabi",
+                     "2024-07-30", "2024-02-05",
+                     "Create blockchain solution for supply chain transparency in healthcare and pharmaceuticals.",
+                     "Blockchain development, smart contracts, healthcare domain knowledge",
+                     "Blockchain,Healthcare,Supply Chain,Smart Contracts", 60000, 90000, 3000, 4500, "Active",
+                     "blockchain@mubadala.ae", 156, 12, "Research", "Medium", False, 3),
+                    ("Renewable Energy Grid Optimization", "ADNOC", 3, "Abu Dhabi",
+                     "2024-09-01", "2024-02-10",
+                     "Optimize energy distribution using AI and IoT sensors for renewable energy integration.",
+                     "Energy systems, AI/ML, IoT, electrical engineering background",
+                     "Energy,AI,IoT,Sustainability,Grid Systems", 100000, 150000, 5000, 7500, "Active",
+                     "energy@adnoc.ae", 189, 15, "Innovation", "High", True, 3),
+                    ("E-commerce Personalization Engine", "Noon", 4, "Dubai",
+                     "2024-06-30", "2024-02-12",
+                     "Build advanced ML models for personalized shopping experiences and recommendations.",
+                     "Machine Learning, recommendation systems, e-commerce experience",
+                     "ML,E-commerce,Python,Recommendation Systems", 70000, 100000, 3500, 5000, "Active",
+                     "tech@noon.com", 203, 22, "Development", "Medium", True, 3),
+                    ("Smart Building Management System", "Emaar Properties", 5, "Dubai",
+                     "2024-08-01", "2024-02-15",
+                     "Develop IoT-based building management system for energy efficiency and tenant comfort.",
+                     "IoT development, building automation, energy management",
+                     "IoT,Smart Buildings,Energy,Automation", 85000, 125000, 4250, 6250, "Active",
+                     "innovation@emaar.com", 145, 10, "Development", "Medium", False, 3)
+                ]
+
+                cursor.executemany('''
+                                   INSERT INTO projects (title, organization, company_id, location, deadline, posted,
+                                                         description, requirements, tags, budget_min, budget_max,
+                                                         kic_budget_min, kic_budget_max, status, contact, views,
+                                                         applications, project_type, urgency, remote_possible, created_by)
+                                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                                   ''', projects)
+
+                # Seed user projects
+                user_projects = [
+                    (1, 1, "lead_engineer", "active", "2024-02-01", None,
+                     "Leading the robotics and automation team", None, None),
+                    (2, 2, "data_scientist", "active", "2024-02-05", None,
+                     "Developing predictive models for supply chain", None, None),
+                    (1, 3, "consultant", "completed", "2024-01-15", "2024-02-28",
+                     "Consulted on industrial automation solutions", 4.8, 4000),
+                    (2, 4, "ml_engineer", "active", "2024-02-12", None,
+                     "Building recommendation algorithms", None, None),
+                    (5, 2, "researcher", "active", "2024-02-08", None,
+                     "Researching blockchain applications in pharma", None, None)
+                ]
+
+                cursor.executemany('''
+                                   INSERT INTO user_projects (user_id, project_id, role, status, joined_date,
+                                                              completion_date, contribution_description, rating_received,
+                                                              payment_received)
+                                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                                   ''', user_projects)
+
+                # Seed connections
+                connections = [
+                    (1, 2, "accepted", "Would love to connect and discuss AI projects",
+                     datetime.now().strftime('%Y-%m-%d %H:%M:%S'), datetime.now().strftime('%Y-%m-%d %H:%M:%S')),
+                    (1, 4, "accepted", "Great to connect with fellow researchers",
+                     datetime.now().strftime('%Y-%m-%d %H:%M:%S'), datetime.now().strftime('%Y-%m-%d %H:%M:%S')),
+                    (2, 5, "accepted", "Looking forward to collaborating",
+                     datetime.now().strftime('%Y-%m-%d %H:%M:%S'), datetime.now().strftime('%Y-%m-%d %H:%M:%S')),
+                    (3, 1, "pending", "Would like to discuss potential projects",
+                     datetime.now().strftime('%Y-%m-%d %H:%M:%S'), None),
+                    (4, 5, "accepted", "Fellow researcher in biotech",
+                     datetime.now().strftime('%Y-%m-%d %H:%M:%S'), datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+                ]
+
+                cursor.executemany('''
+                                   INSERT INTO connections (requester_id, addressee_id, status, message, created_at, accepted_at)
+                                   VALUES (?, ?, ?, ?, ?, ?)
+                                   ''', connections)
+
+                # Seed messages
+                messages = [
+                    (1, 2, "Hi Fatima! I saw your work on healthcare AI. Would love to discuss potential collaboration.",
+                     "text", False),
+                    (2, 1, "Hi Ahmed! Thanks for reaching out. I'd be happy to discuss. When are you available?", "text",
+                     True),
+                    (1, 2, "I'm free this Thursday afternoon or Friday morning. What works for you?", "text", False),
+                    (2, 1, "Thursday afternoon works great! Let's meet at 3 PM?", "text", True),
+                    (3, 1, "Ahmed, we have an exciting robotics project coming up. Are you interested?", "text", False)
+                ]
+
+                cursor.executemany('''
+                                   INSERT INTO messages (sender_id, receiver_id, message, message_type, is_read)
+                                   VALUES (?, ?, ?, ?, ?)
+                                   ''', messages)
+
+                # Seed activities
+                activities = [
+                    (1, "project_completed", "Completed Robotics Automation Project",
+                     "Successfully delivered industrial automation solution for manufacturing company", 3),
+                    (2, "skill_certified", "Earned AI/ML Certification",
+                     "Completed advanced certification in Machine Learning from Stanford Online", None),
+                    (1, "connection_made", "Connected with Dr. Fatima Al Zaabi",
+                     "New professional connection in Data Science field", 2),
+                    (2, "project_started", "Started Healthcare Analytics Project",
+                     "Beginning new project on predictive analytics for patient outcomes", 2),
+                    (4, "university_project", "Published Research Paper",
+                     "Co-authored paper on AI applications in smart cities", None),
+                    (5, "lab_booking", "Booked Biotechnology Lab",
+                     "Reserved lab for genomics research project", 3)
+                ]
+
+                cursor.executemany('''
+                                   INSERT INTO activities (user_id, activity_type, title, description, related_id)
+                                   VALUES (?, ?, ?, ?, ?)
+                                   ''', activities)
+
+                # Seed KIC transactions
+                kic_transactions = [
+                    (1, "project_payment", 4000, "Payment for completed robotics project", 3),
+                    (2, "lab_booking", -750, "Paid for AI lab booking using KIC", 1),
+                    (1, "bonus", 500, "Performance bonus for high-rated project delivery", None),
+                    (2, "talent_fee", 1200, "Received payment for consulting work", 2),
+                    (4, "research_grant", 2000, "Research grant for smart city project", 1),
+                    (5, "lab_booking", -500, "Biotech lab booking payment", 3)
+                ]
+
+                cursor.executemany('''
+                                   INSERT INTO kic_transactions (user_id, transaction_type, amount, description, related_id)
+                                   VALUES (?, ?, ?, ?, ?)
+                                   ''', kic_transactions)
+
+                # Seed project applications
+                applications = [
+                    (1, 1,
+                     "I have extensive experience in robotics and AI integration. My recent project involved developing autonomous systems for industrial automation. I can bring valuable expertise to your smart city initiative.",
+                     100000, 5000, "pending", None, None),
+                    (1, 2,
+                     "With my background in IoT and blockchain, I can contribute to building secure and transparent supply chain solutions.",
+                     85000, 4250, "accepted", datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                     "Great experience! Welcome to the team."),
+                    (2, 4,
+                     "As a ML expert specializing in recommendation systems, I have built similar solutions for e-commerce platforms.",
+                     95000, 4750, "pending", None, None)
+                ]
+
+                for app in applications:
+                    cursor.execute('''
+                                   INSERT INTO project_applications (project_id, user_id, application_text,
+                                                                     proposed_rate, proposed_kic_rate, status,
+                                                                     response_date, response_message)
+                                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                                   ''', app)
+
+                # Seed bookings
+                bookings = [
+                    (1, 1, "2024-03-15", "2024-03-17", "Testing AI models for robotics project",
+                     "Confirmed", 2400, 1200, "KIC"),
+                    (2, 1, "2024-03-20", "2024-03-22", "Machine learning experiments",
+                     "Pending", 2400, 1200, "AED"),
+                    (5, 3, "2024-03-25", "2024-03-30", "Genomics research project",
+                     "Confirmed", 7500, 3750, "KIC")
+                ]
+
+                cursor.executemany('''
+                                   INSERT INTO bookings (user_id, lab_id, start_date, end_date, purpose,
+                                                         status, total_cost, kic_cost, payment_method)
+                                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                                   ''', bookings)
+
+                # Seed notifications
+                notifications = [
+                    (1, "New Connection Request", "Sara Hassan wants to connect with you", "connection", False),
+                    (2, "Project Application Update", "Your application for 'Blockchain Supply Chain' was accepted!",
+                     "application", True),
+                    (1, "Lab Booking Confirmed", "Your booking for AI Lab on March 15-17 is confirmed", "booking", True),
+                    (2, "New Message", "You have a new message from Ahmed Al Mansouri", "message", False),
+                    (4, "Research Grant Approved", "Your research grant of 2000 KIC has been approved", "grant", True)
+                ]
+
+                cursor.executemany('''
+                                   INSERT INTO notifications (user_id, title, message, type, is_read)
+                                   VALUES (?, ?, ?, ?, ?)
+                                   ''', notifications)
 
-            cursor.executemany('''
-                               INSERT INTO projects (title, organization, company_id, location, deadline, posted,
-                                                     description, requirements, tags, budget_min, budget_max,
-                                                     kic_budget_min, kic_budget_max, status, contact, views,
-                                                     applications, project_type, urgency, remote_possible, created_by)
-                               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                               ''', projects)
-
-            # Seed user projects
-            user_projects = [
-                (1, 1, "lead_engineer", "active", "2024-02-01", None,
-                 "Leading the robotics and automation team", None, None),
-                (2, 2, "data_scientist", "active", "2024-02-05", None,
-                 "Developing predictive models for supply chain", None, None),
-                (1, 3, "consultant", "completed", "2024-01-15", "2024-02-28",
-                 "Consulted on industrial automation solutions", 4.8, 4000),
-                (2, 4, "ml_engineer", "active", "2024-02-12", None,
-                 "Building recommendation algorithms", None, None),
-                (5, 2, "researcher", "active", "2024-02-08", None,
-                 "Researching blockchain applications in pharma", None, None)
-            ]
-
-            cursor.executemany('''
-                               INSERT INTO user_projects (user_id, project_id, role, status, joined_date,
-                                                          completion_date, contribution_description, rating_received,
-                                                          payment_received)
-                               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                               ''', user_projects)
-
-            # Seed connections
-            connections = [
-                (1, 2, "accepted", "Would love to connect and discuss AI projects",
-                 datetime.now().strftime('%Y-%m-%d %H:%M:%S'), datetime.now().strftime('%Y-%m-%d %H:%M:%S')),
-                (1, 4, "accepted", "Great to connect with fellow researchers",
-                 datetime.now().strftime('%Y-%m-%d %H:%M:%S'), datetime.now().strftime('%Y-%m-%d %H:%M:%S')),
-                (2, 5, "accepted", "Looking forward to collaborating",
-                 datetime.now().strftime('%Y-%m-%d %H:%M:%S'), datetime.now().strftime('%Y-%m-%d %H:%M:%S')),
-                (3, 1, "pending", "Would like to discuss potential projects",
-                 datetime.now().strftime('%Y-%m-%d %H:%M:%S'), None),
-                (4, 5, "accepted", "Fellow researcher in biotech",
-                 datetime.now().strftime('%Y-%m-%d %H:%M:%S'), datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-            ]
-
-            cursor.executemany('''
-                               INSERT INTO connections (requester_id, addressee_id, status, message, created_at, accepted_at)
-                               VALUES (?, ?, ?, ?, ?, ?)
-                               ''', connections)
-
-            # Seed messages
-            messages = [
-                (1, 2, "Hi Fatima! I saw your work on healthcare AI. Would love to discuss potential collaboration.",
-                 "text", False),
-                (2, 1, "Hi Ahmed! Thanks for reaching out. I'd be happy to discuss. When are you available?", "text",
-                 True),
-                (1, 2, "I'm free this Thursday afternoon or Friday morning. What works for you?", "text", False),
-                (2, 1, "Thursday afternoon works great! Let's meet at 3 PM?", "text", True),
-                (3, 1, "Ahmed, we have an exciting robotics project coming up. Are you interested?", "text", False)
-            ]
+        except sqlite3.Error as e:
+            print(f"Error seeding data: {e}")
+            return
 
-            cursor.executemany('''
-                               INSERT INTO messages (sender_id, receiver_id, message, message_type, is_read)
-                               VALUES (?, ?, ?, ?, ?)
-                               ''', messages)
-
-            # Seed activities
-            activities = [
-                (1, "project_completed", "Completed Robotics Automation Project",
-                 "Successfully delivered industrial automation solution for manufacturing company", 3),
-                (2, "skill_certified", "Earned AI/ML Certification",
-                 "Completed advanced certification in Machine Learning from Stanford Online", None),
-                (1, "connection_made", "Connected with Dr. Fatima Al Zaabi",
-                 "New professional connection in Data Science field", 2),
-                (2, "project_started", "Started Healthcare Analytics Project",
-                 "Beginning new project on predictive analytics for patient outcomes", 2),
-                (4, "university_project", "Published Research Paper",
-                 "Co-authored paper on AI applications in smart cities", None),
-                (5, "lab_booking", "Booked Biotechnology Lab",
-                 "Reserved lab for genomics research project", 3)
-            ]
+        print("Comprehensive sample data seeded successfully")
+        self.invalidate_all()
 
-            cursor.executemany('''
-                               INSERT INTO activities (user_id, activity_type, title, description, related_id)
-                               VALUES (?, ?, ?, ?, ?)
-                               ''', activities)
-
-            # Seed KIC transactions
-            kic_transactions = [
-                (1, "project_payment", 4000, "Payment for completed robotics project", 3),
-                (2, "lab_booking", -750, "Paid for AI lab booking using KIC", 1),
-                (1, "bonus", 500, "Performance bonus for high-rated project delivery", None),
-                (2, "talent_fee", 1200, "Received payment for consulting work", 2),
-                (4, "research_grant", 2000, "Research grant for smart city project", 1),
-                (5, "lab_booking", -500, "Biotech lab booking payment", 3)
-            ]
+    def reset_database(self):
+        """Reset database completely"""
+        try:
+            with self.writer() as cursor:
+                cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+                tables = cursor.fetchall()
 
-            cursor.executemany('''
-                               INSERT INTO kic_transactions (user_id, transaction_type, amount, description, related_id)
-                               VALUES (?, ?, ?, ?, ?)
-                               ''', kic_transactions)
-
-            # Seed project applications
-            applications = [
-                (1, 1,
-                 "I have extensive experience in robotics and AI integration. My recent project involved developing autonomous systems for industrial automation. I can bring valuable expertise to your smart city initiative.",
-                 100000, 5000, "pending", None, None),
-                (1, 2,
-                 "With my background in IoT and blockchain, I can contribute to building secure and transparent supply chain solutions.",
-                 85000, 4250, "accepted", datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                 "Great experience! Welcome to the team."),
-                (2, 4,
-                 "As a ML expert specializing in recommendation systems, I have built similar solutions for e-commerce platforms.",
-                 95000, 4750, "pending", None, None)
-            ]
+                for table in tables:
+                    if not table[0].startswith("sqlite_"):
+                        cursor.execute(f"DROP TABLE IF EXISTS {table[0]}")
 
-            for app in applications:
-                cursor.execute('''
-                               INSERT INTO project_applications (project_id, user_id, application_text,
-                                                                 proposed_rate, proposed_kic_rate, status,
-                                                                 response_date, response_message)
-                               VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                               ''', app)
-
-            # Seed bookings
-            bookings = [
-                (1, 1, "2024-03-15", "2024-03-17", "Testing AI models for robotics project",
-                 "Confirmed", 2400, 1200, "KIC"),
-                (2, 1, "2024-03-20", "2024-03-22", "Machine learning experiments",
-                 "Pending", 2400, 1200, "AED"),
-                (5, 3, "2024-03-25", "2024-03-30", "Genomics research project",
-                 "Confirmed", 7500, 3750, "KIC")
-            ]
+            print("Database reset successfully")
+            self.migrate()
 
-            cursor.executemany('''
-                               INSERT INTO bookings (user_id, lab_id, start_date, end_date, purpose,
-                                                     status, total_cost, kic_cost, payment_method)
-                               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                               ''', bookings)
-
-            # Seed notifications
-            notifications = [
-                (1, "New Connection Request", "Sara Hassan wants to connect with you", "connection", False),
-                (2, "Project Application Update", "Your application for 'Blockchain Supply Chain' was accepted!",
-                 "application", True),
-                (1, "Lab Booking Confirmed", "Your booking for AI Lab on March 15-17 is confirmed", "booking", True),
-                (2, "New Message", "You have a new message from Ahmed Al Mansouri", "message", False),
-                (4, "Research Grant Approved", "Your research grant of 2000 KIC has been approved", "grant", True)
-            ]
+        except sqlite3.Error as e:
+            print(f"Error resetting database: {e}")
 
-            cursor.executemany('''
-                               INSERT INTO notifications (user_id, title, message, type, is_read)
-                               VALUES (?, ?, ?, ?, ?)
-                               ''', notifications)
+        # Even a failed reset may have dropped tables; nothing cached before it is safe to serve
+        self.invalidate_all()
+
+    def invalidate_all(self):
+        """Drop every cached read in this process and the shared tier and announce a change to every table"""
+        self.option_cache.clear()
+        self.query_cache.clear()
+        self.fragments.clear()
+        self.figure_cache.clear()
+        self.user_cache.clear()
+        self.bus.publish_all()
+        if self.shared:
+            self.shared.clear()
+        self.profiles.clear()
+        self.analytics.refresh()
+
+    @contextmanager
+    def reader(self):
+        """The calling thread's read connection"""
+        yield self.pool.acquire()
+
+    def release_reader(self):
+        """Hand the calling thread's read connection back to the pool once its unit of work is done"""
+        self.pool.release()
+
+    @contextmanager
+    def unit_of_work(self):
+        """One transaction for every write of a user action.
+
+        Yields a cursor on the writer connection. Nested blocks (a page action calling several
+        manager methods) become savepoints of the outermost one, so a failing inner step rolls
+        back alone when the caller handles its error. When the outermost block ends while other
+        sessions are queued for the writer, its changes stay in the open transaction and the
+        last unit in the queue commits them all at once (group commit). Either way the block
+        returns only after its changes are committed.
+        """
+        started = time.perf_counter()
+        with self._queue_lock:
+            self._writers_queued += 1
+        self.pool.write_lock.acquire()
+        with self._queue_lock:
+            self._writers_queued -= 1
+
+        self._write_depth += 1
+        savepoint = f"uow_{self._write_depth}"
+        batch = None
+        failed = False
+        try:
+            if not self.conn.in_transaction:
+                self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.execute(f"SAVEPOINT {savepoint}")
+            try:
+                yield self.conn.cursor()
+            except BaseException:
+                failed = True
+                self.conn.execute(f"ROLLBACK TO {savepoint}")
+                self._discard_profiles(self._write_depth)
+                raise
+            finally:
+                self.conn.execute(f"RELEASE {savepoint}")
+                if self._write_depth == 1:
+                    batch = self._finish_unit(failed)
+        finally:
+            self._write_depth -= 1
+            self.pool.write_lock.release()
+
+        if batch is not None:
+            self._await_commit(batch)
+            with self._queue_lock:
+                self._tx_latency.append(time.perf_counter() - started)
+
+    # Schema, seeding and maintenance code use the same transaction machinery
+    writer = unit_of_work
+
+    def _finish_unit(self, failed: bool) -> Optional[CommitBatch]:
+        """Close the outermost unit while holding the write lock; returns the batch to wait for"""
+        batch = None
+        with self._queue_lock:
+            if failed:
+                self._tx_stats["rolled_back"] += 1
+            else:
+                self._tx_stats["units"] += 1
+                batch = self._batch = self._batch or CommitBatch()
+                batch.units += 1
+                batch.profiles.extend(write[1:] for write in self._unit_profiles)
+                self._unit_profiles = []
+            queued = self._writers_queued
+        if self._batch and (not queued or self._batch.units >= self.group_commit_max_batch):
+            self._commit_batch()
+        elif not self._batch and self.conn.in_transaction:
+            self.conn.rollback()
+        return batch
 
+    def _commit_batch(self):
+        """COMMIT every unit of the open batch; caller holds the write lock"""
+        batch, self._batch = self._batch, None
+        dirty, self._dirty_tables = self._dirty_tables, set()
+        users, self._dirty_users = self._dirty_users, set()
+        try:
             self.conn.commit()
-            print("Comprehensive sample data seeded successfully")
-
         except sqlite3.Error as e:
-            print(f"Error seeding data: {e}")
+            batch.error = e
             self.conn.rollback()
-
-    def reset_database(self):
-        """Reset database completely"""
+            for user_id, seq, _ in batch.profiles:
+                self.profiles.discard(user_id, seq)
+        else:
+            if dirty:
+                self._publish(dirty, users)
+            for user_id, seq, row in batch.profiles:
+                self.profiles.apply(user_id, seq, row)
+        with self._queue_lock:
+            self._tx_stats["commit_errors" if batch.error else "commits"] += 1
+            self._tx_stats["max_batch"] = max(self._tx_stats["max_batch"], batch.units)
+            self._commit_times.append(time.monotonic())
+        batch.done.set()
+
+    def _publish(self, tables, users=()):
+        """Announce committed writes to `tables` (and the tables their triggers write) and `users` on the bus"""
+        tables = set(tables)
+        for table in list(tables):
+            tables |= TRIGGER_WRITES.get(table, set())
+        self.bus.publish(tables, users)
+        if self.shared:
+            self.shared.bump(tables, users)
+
+    def sync(self):
+        """Apply the writes other worker processes committed since the last call; main() runs it every rerun"""
+        if not self.shared:
+            return
+        tables, users, everything = self.shared.sync()
+        if everything:
+            self.option_cache.clear()
+            self.query_cache.clear()
+            self.profiles.clear()
+            self.bus.publish_all()
+        elif tables or users:
+            self.profiles.forget(users)
+            self.bus.publish(tables, users)
+
+    def _shared_or_load(self, key, tables, query: str, params) -> Callable[[], List[sqlite3.Row]]:
+        """Loader for an in-process cache miss: the shared tier if there is one, else the database"""
+        if not self.shared:
+            return lambda: self.fetch_all(query, params)
+        return lambda: self.shared.get_or_load(key, tables, lambda: self.fetch_all(query, params))
+
+    def _written_users(self, cursor: sqlite3.Cursor, query: str, table: str, params) -> set:
+        """Users whose rows a write is about to change, from USER_WRITES"""
+        source = USER_WRITES.get(query)
+        if isinstance(source, tuple):
+            return {params[i] for i in source}
+        if source:
+            return set(cursor.execute(source, params).fetchone() or ())
+        return {None} if table in USER_SCOPED_TABLES else set()
+
+    def _discard_profiles(self, depth: int):
+        """Forget write-throughs made at or below a savepoint that was rolled back"""
+        keep = []
+        for write in self._unit_profiles:
+            if write[0] >= depth:
+                self.profiles.discard(write[1], write[2])
+            else:
+                keep.append(write)
+        self._unit_profiles = keep
+
+    def write_through_profile(self, cursor: sqlite3.Cursor, user_id: int):
+        """Inside a unit_of_work: re-read the user's row so the ProfileCache takes it after COMMIT"""
+        seq = self.profiles.begin_write(user_id)
+        row = self.execute(cursor, "users.profile", (user_id,)).fetchone()
+        if row is None:
+            self.profiles.discard(user_id, seq)
+        else:
+            self._unit_profiles.append((self._write_depth, user_id, seq, row))
+
+    def profile(self, user_id: int) -> Optional[Dict]:
+        """The user's current row (without password hash) from the shared ProfileCache"""
+        return self.profiles.get_or_load(user_id, lambda: self.fetch_one("users.profile", (user_id,)))
+
+    def _await_commit(self, batch: CommitBatch):
+        # The next unit in the queue normally commits the batch; if it stalls, commit it ourselves
+        while not batch.done.wait(self.group_commit_wait):
+            with self.pool.write_lock:
+                if self._batch is batch:
+                    self._commit_batch()
+        if batch.error:
+            raise batch.error
+
+    def transaction_stats(self) -> Dict:
+        """Commit throughput, units per COMMIT and unit-of-work latency (enter to durable)"""
+        with self._queue_lock:
+            stats = dict(self._tx_stats)
+            latency = sorted(self._tx_latency)
+            now = time.monotonic()
+            recent = sum(1 for t in self._commit_times if now - t <= 60)
+        stats["units_per_commit"] = round(stats["units"] / stats["commits"], 2) if stats["commits"] else 0.0
+        stats["commits_per_second"] = round(recent / 60, 2)
+        stats["latency_p50_ms"] = round(latency[len(latency) // 2] * 1000, 2) if latency else 0.0
+        stats["latency_p95_ms"] = round(latency[int(len(latency) * 0.95)] * 1000, 2) if latency else 0.0
+        stats["latency_max_ms"] = round(latency[-1] * 1000, 2) if latency else 0.0
+        return stats
+
+    def _run(self, cursor: sqlite3.Cursor, query: str, params) -> sqlite3.Cursor:
+        """Execute a QUERIES name (or raw SQL) on cursor, counting statement cache hits per name"""
+        sql = QUERIES.get(query, query)
+        if cursor.connection is self.conn:
+            written = written_table(sql)
+            if written:
+                self._dirty_tables.add(written)
+                self._dirty_users |= self._written_users(cursor, query, written, params)
+        hit = cursor.connection.note_statement(sql)
+        start = time.perf_counter()
+        cursor.execute(sql, params)
+        if query in QUERIES:
+            elapsed = time.perf_counter() - start
+            with self._query_stats_lock:
+                stats = self._query_stats.setdefault(query, {"calls": 0, "cache_hits": 0, "cache_misses": 0,
+                                                             "total_ms": 0.0})
+                stats["calls"] += 1
+                stats["cache_hits" if hit else "cache_misses"] += 1
+                stats["total_ms"] += elapsed * 1000
+        return cursor
+
+    def execute(self, cursor: sqlite3.Cursor, query: str, params=()) -> sqlite3.Cursor:
+        """Run a named write inside a writer() block: db.execute(cursor, "messages.send", (...))"""
+        return self._run(cursor, query, params)
+
+    def fetch_all(self, query: str, params=()) -> List[sqlite3.Row]:
+        """Rows of a QUERIES name; raw SQL is accepted too for schema and maintenance statements"""
+        with self.reader() as conn:
+            return self._run(conn.cursor(), query, params).fetchall()
+
+    def fetch_one(self, query: str, params=()) -> Optional[sqlite3.Row]:
+        # fetchall() runs the statement to completion so no read lock outlives the call
+        rows = self.fetch_all(query, params)
+        return rows[0] if rows else None
+
+    def fetch_value(self, query: str, params=(), default=None):
+        row = self.fetch_one(query, params)
+        return row[0] if row is not None else default
+
+    def fetch_cached(self, query: str, params=()) -> List[sqlite3.Row]:
+        """Rows of a read from the shared query cache; a committed write to a table it reads evicts it.
+
+        Only for statements whose result depends on nothing but table contents (no 'now').
+        """
+        sql = QUERIES.get(query, query)
+        key, tables = (normalize_sql(sql), tuple(params)), read_tables(sql)
+        return self.query_cache.get_or_load(key, tables, self._shared_or_load(key, tables, query, params))
+
+    def data_version(self, query: str, user_id: int) -> tuple:
+        """Version of what `query` returns for user_id: the user's version plus the shared tables it reads"""
+        shared = read_tables(QUERIES.get(query, query)) - USER_SCOPED_TABLES
+        return (self.bus.user_version(user_id),) + self.bus.versions(shared)
+
+    def fetch_for_user(self, query: str, user_id: int, params=()) -> List[sqlite3.Row]:
+        """Rows of a read about user_id's own rows, refetched only after a write changed its data version.
+
+        Every USER_SCOPED_TABLES row the query reads must belong to user_id (or be written
+        together with one that does, like both sides of a message), and no 'now'.
+        """
+        key = (query, tuple(params), self.data_version(query, user_id))
+        return self.user_cache.get_or_load(key, (), lambda: self.fetch_all(query, params))
+
+    def facets(self, listing: str, params: Dict) -> Optional[Dict[str, Dict[str, int]]]:
+        """Counts per value of each FACETS[listing] facet under the listing's current filters.
+
+        A facet counts the rows that pass every other facet's filter, so with Dubai picked the
+        other locations still show how many matches they would add. The facet query makes one
+        GROUP BY pass and the counts are summed from its few cells, then kept in query_cache
+        until a write to a table it reads. None when the pass runs past FACET_BUDGET_MS; that
+        outcome is kept for FACET_RETRY_SECONDS only, so reruns skip the pass for a while and
+        then try again.
+        """
+        query = f"{listing}.facets:{'match' if params.get('match') else 'search'}"
+        key = ("facets", query, tuple(sorted(params.items())))
+        return self.query_cache.get_or_load(key, read_tables(QUERIES[query]),
+                                            lambda: self._count_facets(listing, query, params),
+                                            ttl_for=lambda counts: FACET_RETRY_SECONDS if counts is None else None)
+
+    def _count_facets(self, listing: str, query: str, params: Dict) -> Optional[Dict[str, Dict[str, int]]]:
+        deadline = time.perf_counter() + FACET_BUDGET_MS / 1000
+        with self.reader() as conn:
+            conn.set_progress_handler(lambda: time.perf_counter() > deadline, 1000)
+            try:
+                cells = self._run(conn.cursor(), query, params).fetchall()
+            except sqlite3.OperationalError as e:
+                if "interrupted" not in str(e):
+                    raise
+                return None
+            finally:
+                conn.set_progress_handler(None, 0)
+        counts = {facet: {} for facet in FACETS[listing]}
+        for cell in cells:
+            failed = [facet for facet in counts if not cell[f"in_{facet}"]]
+            # A cell counts for a facet when no other facet's filter rejects it
+            for facet, values in counts.items():
+                value, bounds = cell[facet], FACETS[listing][facet][2]
+                if value is None or failed and failed != [facet]:
+                    continue
+                value = bucket_label(value, bounds) if bounds else value
+                values[value] = values.get(value, 0) + cell['matches']
+        return counts
+
+    def fetch_options(self, query: str, params=()) -> List[sqlite3.Row]:
+        """Rows of a small option-list query from the shared cache, reloaded after writes to its tables"""
+        key, tables = ("options", query, tuple(params)), read_tables(QUERIES.get(query, query))
+        return self.option_cache.get_or_load(key, tables, self._shared_or_load(key, tables, query, params))
+
+    def fetch_analytics(self, query: str, params=()) -> List[sqlite3.Row]:
+        """Rows of a heavy analytics query from the snapshot, or live when it is too stale"""
+        if self.analytics.is_fresh():
+            try:
+                rows = self._run(self.analytics.connection().cursor(), query, params).fetchall()
+            except sqlite3.Error:
+                pass
+            else:
+                self.analytics.record(served=True)
+                return rows
+        self.analytics.record(served=False)
+        return self.fetch_all(query, params)
+
+    def figure(self, chart: str, user_id: int, query: str, build: Callable[[List[sqlite3.Row]], object],
+               version=()):
+        """A chart spec built from fetch_analytics(query, (user_id,)), rebuilt only when its data changes.
+
+        The key holds the snapshot generation the rows would come from (None when served live),
+        the query's data_version for the user and `version`; specs of older versions age out.
+        """
+        key = (chart, user_id, self.analytics.generation if self.analytics.is_fresh() else None,
+               self.data_version(query, user_id)) + tuple(version)
+        return self.figure_cache.get_or_load(key, (), lambda: build(self.fetch_analytics(query, (user_id,))))
+
+    def _load_one(self, page_query: PageQuery):
+        start = time.perf_counter()
         try:
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-            tables = cursor.fetchall()
-
-            for table in tables:
-                cursor.execute(f"DROP TABLE IF EXISTS {table[0]}")
+            if page_query.shape == "value":
+                result = self.fetch_value(page_query.query, page_query.params, page_query.default)
+            elif page_query.shape == "one":
+                result = self.fetch_one(page_query.query, page_query.params)
+            elif page_query.user_id is not None:
+                result = self.fetch_for_user(page_query.query, page_query.user_id, page_query.params)
+            elif page_query.cached:
+                result = self.fetch_cached(page_query.query, page_query.params)
+            else:
+                result = self.fetch_all(page_query.query, page_query.params)
+        finally:
+            # Loader threads live as long as the process; don't let them pin pool slots between pages
+            self.release_reader()
+        return result, time.perf_counter() - start
+
+    def load_page(self, queries: Dict[str, PageQuery]) -> Dict[str, object]:
+        """Run a page's independent reads concurrently and return {key: result}.
+
+        Each query runs on a page-loader thread with its own read connection (sqlite3 releases
+        the GIL while stepping a statement), so the bundle takes about as long as its slowest
+        query rather than the sum of all of them. The first failing query's error is raised.
+        """
+        start = time.perf_counter()
+        futures = {key: self._loader.submit(self._load_one, page_query) for key, page_query in queries.items()}
+        bundle, serial = {}, 0.0
+        for key, future in futures.items():
+            bundle[key], elapsed = future.result()
+            serial += elapsed
+        wall = time.perf_counter() - start
+        with self._query_stats_lock:
+            self._loader_stats["loads"] += 1
+            self._loader_stats["queries"] += len(queries)
+            self._loader_stats["wall_ms"] += wall * 1000
+            self._loader_stats["serial_ms"] += serial * 1000
+            self._loader_stats["max_wall_ms"] = max(self._loader_stats["max_wall_ms"], wall * 1000)
+        return bundle
+
+    def loader_stats(self) -> Dict:
+        """Page bundles loaded, their wall time and the time the same queries took summed up"""
+        with self._query_stats_lock:
+            stats = dict(self._loader_stats)
+        stats["avg_wall_ms"] = round(stats["wall_ms"] / stats["loads"], 2) if stats["loads"] else 0.0
+        stats["speedup"] = round(stats["serial_ms"] / stats["wall_ms"], 2) if stats["wall_ms"] else 0.0
+        return stats
+
+    def query_stats(self) -> Dict[str, Dict]:
+        """Per-name call counts, statement cache hits/misses and total time for registry queries"""
+        with self._query_stats_lock:
+            stats = {name: dict(values) for name, values in self._query_stats.items()}
+        for values in stats.values():
+            values["hit_rate"] = round(values["cache_hits"] / values["calls"], 3)
+            values["avg_ms"] = round(values["total_ms"] / values["calls"], 3)
+            values["total_ms"] = round(values["total_ms"], 1)
+        return stats
+
+    def storage_stats(self) -> Dict:
+        """Active storage profile as the connections report it, plus checkpointer stats"""
+        with self.reader() as conn:
+            stats = {pragma: conn.execute(f"PRAGMA {pragma}").fetchone()[0]
+                     for pragma in ("journal_mode", "synchronous", "cache_size", "mmap_size", "temp_store")}
+        stats["profile"] = self.storage_profile
+        if self.checkpointer:
+            stats["checkpoint"] = self.checkpointer.stats()
+        return stats
+
+    def close(self):
+        if self.checkpointer:
+            self.checkpointer.stop()
+        self.analytics.stop()
+        self.reconciler.stop()
+        self._loader.shutdown(wait=True)
+        if self.shared:
+            self.shared.close()
+        self.pool.close()
+
+    def init_stats(self) -> Dict:
+        """How often the database resource and its schema were (re)initialized"""
+        return {
+            "instances_created": Database.instances_created,
+            "schema_initializations": self.schema_initializations,
+            "created_at": self.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+            "uptime_seconds": int((datetime.now() - self.created_at).total_seconds())
+        }
 
-            self.conn.commit()
-            print("Database reset successfully")
-            self.create_tables()
 
-        except sqlite3.Error as e:
-            print(f"Error resetting database: {e}")
+@dataclass
+class Migration:
+    version: int
+    description: str
+    apply: Callable[[Database], None]
+
+
+def add_talent_and_project_items(db: Database):
+    db.create_item_index("talent_items")
+    db.create_item_index("project_items")
+
+
+# Ordered schema history. Never edit an applied step; append a new one instead. Each step
+# builds only its own objects, so a recorded version always stands for the same schema.
+MIGRATIONS = [
+    Migration(1, "baseline schema", Database.create_tables),
+    Migration(2, "hot-path secondary indexes", Database.ensure_indexes),
+    Migration(3, "trigger-maintained KPI counters", Database.create_counters),
+    Migration(4, "trigger-maintained unread badge counters", Database.create_user_counters),
+    Migration(5, "FTS5 talent search index", lambda db: db.create_search_index("talent_search")),
+    Migration(6, "FTS5 project search index", lambda db: db.create_search_index("project_search")),
+    Migration(7, "FTS5 lab search index", lambda db: db.create_search_index("lab_search")),
+    Migration(8, "trigger-maintained lab equipment and amenity items", lambda db: db.create_item_index("lab_items")),
+    Migration(9, "skill, specialization, language and tag inverted indexes", add_talent_and_project_items),
+    Migration(10, "item triggers that split lists with tabs and line breaks", Database.replace_item_triggers),
+]
+
+
+# What the listing pages query before any filter is touched: (entity, query, params, view mode)
+DEFAULT_LISTINGS = [
+    ("talent", "talents.search:Best Match", {"locations": None, "availability": None, "min_rate": 0,
+                                              "max_rate": 500, "min_projects": 0, "skills": None,
+                                              "specializations": None, "languages": None}, "Professional"),
+    ("project", "projects.search", {"urgency": None, "remote_only": False, "tags": None}, "Card"),
+    ("lab", "labs.search:Best Match", {"specialties": None, "locations": None, "min_price": 0, "max_price": 3000,
+                                       "min_kic_price": 0, "max_kic_price": 1500, "equipment": None,
+                                       "amenities": None}, "Card")
+]
+
+
+def warm_listing(db: Database, kind: str, query: str, params: Dict, view_mode: str) -> int:
+    """Read a default listing and render its cards into db.fragments"""
+    render = {"talent": render_talent_card, "project": render_project_card, "lab": render_lab_card}[kind]
+    rows = db.fetch_all(query, params)
+    for row in rows:
+        card_fragment(db, kind, row, view_mode, render, version=project_version(row) if kind == "project" else None)
+    return len(rows)
+
+
+def warmup_steps(db: Database) -> List[tuple]:
+    """What CacheWarmer prefetches after startup, hottest first"""
+    steps = [("KPI counters", lambda: len(db.counters()))]
+    steps += [(f"options {query}", lambda query=query: len(db.fetch_options(query)))
+              for query in ("talents.locations", "labs.specialties", "labs.locations", "labs.names",
+                            "labs.with_university", "users.directory")]
+    steps += [(f"options {table}.items {kind}", lambda table=table, kind=kind:
+               len(db.fetch_options(f"{table}.items", (kind,))))
+              for table, _, kinds in ITEM_INDEXES.values() for kind in kinds]
+    steps += [(f"catalog {query}", lambda query=query: len(db.fetch_cached(query)))
+              for query in ("projects.trending", "companies.all", "universities.all", "projects.high_value")]
+    steps += [(f"listing {query}", lambda listing=listing: warm_listing(db, *listing))
+              for listing in DEFAULT_LISTINGS for query in [listing[1]]]
+    # Whole-index scans pull the hot indexes into the page cache
+    steps += [(f"index {name}", lambda name=name, table=table:
+               db.fetch_value(f"SELECT COUNT(*) FROM {table} INDEXED BY {name}"))
+              for name, table, _ in INDEXES]
+    return steps
+
+
+@st.cache_resource(show_spinner=False)
+def get_database(db_path: str = DB_PATH) -> Database:
+    """Process-wide database shared by all sessions; schema setup and seeding run once per process"""
+    db = Database(db_path)
+    db.seed_comprehensive_data()
+    if WARMUP_BUDGET > 0:
+        db.warmer = CacheWarmer(warmup_steps(db), budget=WARMUP_BUDGET).start()
+    return db
+
+
+# ==================== QUERY REGISTRY ====================
+# Every statement the pages and managers run, by name. Pass the name to Database.fetch_*
+# or Database.execute. A name always maps to the same SQL text, so each connection prepares
+# it once and later calls hit sqlite3's statement cache. Variable-length filter lists are
+# bound as one JSON array parameter (see bind_list) and expanded with json_each, which
+# keeps the text identical whatever the user selects.
+QUERIES = {
+    # Users and authentication
+    "auth.login": """
+        SELECT *
+        FROM users
+        WHERE email = ?
+          AND password_hash = ?
+          AND is_active = TRUE
+    """,
+    "users.register": """
+        INSERT INTO users (email, password_hash, name, user_type,
+                           organization, location, phone, kic_balance)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """,
+    "users.kic_balance": "SELECT kic_balance FROM users WHERE id = ?",
+    "users.profile": "SELECT * FROM users WHERE id = ?",
+    "users.debit_kic": """
+        UPDATE users
+        SET kic_balance = kic_balance - ?
+        WHERE id = ?
+    """,
+    "users.credit_kic": """
+        UPDATE users
+        SET kic_balance = kic_balance + ?
+        WHERE id = ?
+    """,
+    "users.directory": "SELECT id, name, user_type FROM users ORDER BY name",
+    "users.name_and_type": "SELECT name, user_type FROM users WHERE id = ?",
+    "users.update_profile": """
+        UPDATE users
+        SET name         = ?,
+            organization = ?,
+            bio          = ?,
+            location     = ?,
+            phone        = ?,
+            linkedin_url = ?,
+            website_url  = ?
+        WHERE id = ?
+    """,
+    "users.verify_password": """
+        SELECT id
+        FROM users
+        WHERE id = ?
+          AND password_hash = ?
+    """,
+    "users.update_password": """
+        UPDATE users
+        SET password_hash = ?
+        WHERE id = ?
+    """,
+    # Social: connections and messages
+    "connections.request": """
+        INSERT INTO connections (requester_id, addressee_id, message)
+        VALUES (?, ?, ?)
+    """,
+    "connections.accept": """
+        UPDATE connections
+        SET status      = 'accepted',
+            accepted_at = CURRENT_TIMESTAMP
+        WHERE id = ?
+    """,
+    "messages.send": """
+        INSERT INTO messages (sender_id, receiver_id, message)
+        VALUES (?, ?, ?)
+    """,
+    "messages.conversations": """
+        SELECT DISTINCT CASE WHEN sender_id = ? THEN receiver_id ELSE sender_id END as other_user_id,
+                        u.name,
+                        u.user_type,
+                        MAX(m.created_at) as last_message_time
+        FROM messages m
+                 JOIN users u ON u.id = CASE WHEN m.sender_id = ? THEN m.receiver_id ELSE m.sender_id END
+        WHERE m.sender_id = ?
+           OR m.receiver_id = ?
+        GROUP BY other_user_id, u.name, u.user_type
+        ORDER BY last_message_time DESC
+    """,
+    "messages.thread": """
+        SELECT m.*, u.name as sender_name
+        FROM messages m
+                 JOIN users u ON m.sender_id = u.id
+        WHERE (sender_id = ? AND receiver_id = ?)
+           OR (sender_id = ? AND receiver_id = ?)
+        ORDER BY created_at ASC
+    """,
+    "notifications.mark_all_read": "UPDATE notifications SET is_read = TRUE WHERE user_id = ? AND is_read = FALSE",
+    "connections.accepted_count": """
+        SELECT COUNT(*)
+        FROM connections
+        WHERE (requester_id = ? OR addressee_id = ?)
+          AND status = 'accepted'
+    """,
+    "activities.recent": """
+        SELECT a.*, u.name, u.user_type
+        FROM activities a
+                 JOIN users u ON a.user_id = u.id
+        ORDER BY a.created_at DESC LIMIT 10
+    """,
+    "connections.accepted_users": """
+        SELECT u.id, u.name, u.user_type, u.organization, u.is_verified
+        FROM connections c
+                 JOIN users u
+                      ON u.id = CASE WHEN c.requester_id = ? THEN c.addressee_id ELSE c.requester_id END
+        WHERE (c.requester_id = ? OR c.addressee_id = ?)
+          AND c.status = 'accepted'
+        ORDER BY c.accepted_at DESC
+    """,
+    "connections.pending_requests": """
+        SELECT c.id, u.name, u.user_type, u.organization, c.message
+        FROM connections c
+                 JOIN users u ON c.requester_id = u.id
+        WHERE c.addressee_id = ?
+          AND c.status = 'pending'
+    """,
+    "connections.decline": "UPDATE connections SET status = 'declined' WHERE id = ?",
+    "activities.count_for_user": "SELECT COUNT(*) FROM activities WHERE user_id = ?",
+    "activities.recent_for_user": """
+        SELECT *
+        FROM activities
+        WHERE user_id = ?
+        ORDER BY created_at DESC LIMIT 10
+    """,
+    "messages.mark_thread_read": """
+        UPDATE messages
+        SET is_read = TRUE
+        WHERE receiver_id = ?
+          AND sender_id = ?
+          AND is_read = FALSE
+    """,
+    # KIC wallet
+    "kic.record_sent": """
+        INSERT INTO kic_transactions (user_id, transaction_type, amount, description)
+        VALUES (?, 'sent', ?, ?)
+    """,
+    "kic.record_received": """
+        INSERT INTO kic_transactions (user_id, transaction_type, amount, description)
+        VALUES (?, 'received', ?, ?)
+    """,
+    "kic.recent_transactions": """
+        SELECT *
+        FROM kic_transactions
+        WHERE user_id = ?
+        ORDER BY created_at DESC LIMIT ?
+    """,
+    "kic.total_earned": "SELECT SUM(amount) FROM kic_transactions WHERE user_id = ? AND amount > 0",
+    "kic.total_spent": "SELECT SUM(amount) FROM kic_transactions WHERE user_id = ? AND amount < 0",
+    "kic.monthly_flow": """
+        SELECT strftime('%Y-%m', created_at)                        as month,
+               SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END)      as earned,
+               SUM(CASE WHEN amount < 0 THEN ABS(amount) ELSE 0 END) as spent
+        FROM kic_transactions
+        WHERE user_id = ?
+        GROUP BY month
+        ORDER BY month DESC LIMIT 6
+    """,
+    # Projects and applications
+    "projects.for_user": """
+        SELECT p.*,
+               up.role,
+               up.status as participation_status,
+               up.joined_date,
+               up.completion_date,
+               up.rating_received,
+               up.payment_received,
+               up.contribution_description
+        FROM projects p
+                 JOIN user_projects up ON p.id = up.project_id
+        WHERE up.user_id = ?
+        ORDER BY up.joined_date DESC
+    """,
+    "applications.create": """
+        INSERT INTO project_applications (project_id, user_id, application_text,
+                                          proposed_rate, proposed_kic_rate)
+        VALUES (?, ?, ?, ?, ?)
+    """,
+    "projects.increment_applications": """
+        UPDATE projects
+        SET applications = applications + 1
+        WHERE id = ?
+    """,
+    "applications.for_user": """
+        SELECT pa.*, p.title, p.organization, p.kic_budget_min, p.kic_budget_max
+        FROM project_applications pa
+                 JOIN projects p ON pa.project_id = p.id
+        WHERE pa.user_id = ?
+        ORDER BY pa.applied_date DESC
+    """,
+    "projects.trending": """
+        SELECT *
+        FROM projects
+        WHERE status = 'Active'
+        ORDER BY views DESC, applications DESC LIMIT 3
+    """,
+    "projects.increment_views": "UPDATE projects SET views = views + 1 WHERE id = ?",
+    "projects.urgent": """
+        SELECT p.*,
+               c.name                                 as company_name,
+               c.industry,
+               julianday(deadline) - julianday('now') as days_left
+        FROM projects p
+                 LEFT JOIN companies c ON p.company_id = c.id
+        WHERE p.urgency = 'High'
+          AND p.status = 'Active'
+        ORDER BY p.deadline ASC
+    """,
+    "projects.high_value": """
+        SELECT p.*, c.name as company_name, c.industry
+        FROM projects p
+                 LEFT JOIN companies c ON p.company_id = c.id
+        WHERE p.kic_budget_max >= 5000
+          AND p.status = 'Active'
+        ORDER BY p.kic_budget_max DESC
+    """,
+    # Talents, companies, labs and universities
+    "lab_access.grant": """
+        INSERT OR REPLACE INTO lab_access
+            (lab_id, user_id, access_level, username, password_hash, valid_from, valid_until)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """,
+    "lab_access.verify": """
+        SELECT la.*, u.name as user_name, l.name as lab_name
+        FROM lab_access la
+                 JOIN users u ON la.user_id = u.id
+                 JOIN labs l ON la.lab_id = l.id
+        WHERE la.lab_id = ?
+          AND la.username = ?
+          AND la.password_hash = ?
+          AND la.is_active = TRUE
+          AND DATE('now') BETWEEN la.valid_from AND la.valid_until
+    """,
+    "lab_access.for_user": """
+        SELECT la.*, l.name as lab_name, u.name as university_name
+        FROM lab_access la
+                 JOIN labs l ON la.lab_id = l.id
+                 JOIN universities u ON l.university_id = u.id
+        WHERE la.user_id = ?
+          AND la.is_active = TRUE
+        ORDER BY la.created_at DESC
+    """,
+    "talents.locations": "SELECT DISTINCT location FROM talents",
+    "companies.all": "SELECT * FROM companies ORDER BY rating DESC, total_projects_posted DESC",
+    "counters.all": "SELECT name, value FROM platform_counters",
+    "counters.for_user": "SELECT name, value FROM user_counters WHERE user_id = ?",
+    "labs.specialties": "SELECT DISTINCT specialty FROM labs",
+    "labs.locations": "SELECT DISTINCT location FROM labs",
+    "labs.names": "SELECT id, name FROM labs ORDER BY name",
+    "labs.with_university": """
+        SELECT l.id, l.name, u.name as university_name
+        FROM labs l
+                 JOIN universities u ON l.university_id = u.id
+        ORDER BY u.name, l.name
+    """,
+    "universities.all": "SELECT * FROM universities ORDER BY ranking_national",
+    "labs.count_for_university": "SELECT COUNT(*) FROM labs WHERE university_id = ?",
+    "talents.by_user": "SELECT * FROM talents WHERE user_id = ?",
+    "talents.update_profile": """
+        UPDATE talents
+        SET title           = ?,
+            experience      = ?,
+            availability    = ?,
+            hourly_rate     = ?,
+            kic_hourly_rate = ?,
+            skills          = ?,
+            certifications  = ?
+        WHERE user_id = ?
+    """
+}
+
+
+def split_items(row: str, column: str) -> str:
+    """json_each() over a comma-joined column of `row`: one value per item, untrimmed; nothing for NULL.
+
+    json_quote() escapes quotes, backslashes and control characters (a pasted multi-line list),
+    none of which turn into a comma, so splitting the quoted text on commas stays valid JSON.
+    """
+    return f"""json_each('[' || replace(nullif(json_quote({row}.{column}), 'null'), ',', '","') || ']')"""
+
+
+# An item of a split_items() list without the blanks and line breaks around it
+ITEM_VALUE = "trim(value, ' ' || char(9, 10, 13))"
+
+
+def item_index_trigger_statements(items: str) -> List[str]:
+    """CREATE TRIGGER statements that re-split a row's columns into the `items` table of ITEM_INDEXES"""
+    table, key, kinds = ITEM_INDEXES[items]
+    statements = []
+    for kind, column in kinds.items():
+        add = (f"INSERT OR IGNORE INTO {items} (kind, item, {key}) SELECT '{kind}', {ITEM_VALUE}, NEW.id "
+               f"FROM {split_items('NEW', column)} WHERE {ITEM_VALUE} != ''; ")
+        remove = f"DELETE FROM {items} WHERE {key} = OLD.id AND kind = '{kind}'; "
+        statements.append(f"CREATE TRIGGER IF NOT EXISTS {items}_{kind}_insert AFTER INSERT ON {table} "
+                          f"BEGIN {add}END")
+        statements.append(f"CREATE TRIGGER IF NOT EXISTS {items}_{kind}_delete AFTER DELETE ON {table} "
+                          f"BEGIN {remove}END")
+        statements.append(f"CREATE TRIGGER IF NOT EXISTS {items}_{kind}_update AFTER UPDATE OF {column} "
+                          f"ON {table} BEGIN {remove}{add}END")
+    return statements
+
+
+def having_all(items: str, kind: str) -> str:
+    """Ids of the ITEM_INDEXES entities having every item of the JSON list bound to that kind's parameter.
+
+    The intersection starts from the selected item with the fewest entities and probes the
+    primary key for the others, so adding a common item to a rare one costs next to nothing.
+    """
+    _, key, kinds = ITEM_INDEXES[items]
+    param = kinds[kind]
+    return f"""SELECT seed.{key}
+                   FROM {items} seed
+                   WHERE seed.kind = '{kind}'
+                     AND seed.item = (SELECT value
+                                      FROM json_each(:{param})
+                                      ORDER BY (SELECT COUNT(*) FROM {items} WHERE kind = '{kind}' AND item = value)
+                                      LIMIT 1)
+                     AND NOT EXISTS (SELECT 1
+                                     FROM json_each(:{param})
+                                     WHERE NOT EXISTS (SELECT 1
+                                                       FROM {items} has
+                                                       WHERE has.kind = '{kind}'
+                                                         AND has.item = json_each.value
+                                                         AND has.{key} = seed.{key}))"""
+
+
+def bm25_rank(index: str) -> str:
+    """bm25() over an FTS5 index with its SEARCH_INDEXES column weights; lower is a better match"""
+    return f"bm25({index}, {', '.join(str(weight) for weight in SEARCH_INDEXES[index]['weights'])})"
+
+
+def bucket_labels(bounds: tuple) -> List[str]:
+    """Labels of the buckets `bounds` cut a number line into, lowest first"""
+    labels = [f"< {bounds[0]}"] + [f"{low}–{high - 1}" for low, high in zip(bounds, bounds[1:])]
+    return labels + [f"{bounds[-1]}+"]
+
+
+def bucket_label(value, bounds: tuple) -> str:
+    """The bucket_labels() bucket `value` falls in"""
+    return bucket_labels(bounds)[bisect.bisect_right(bounds, value)]
+
+
+# Advanced-filter facets: listing -> {facet: (column, the filter it applies, bucket bounds or None)}.
+# The filters are part of the listing queries; Database.facets counts each facet's values over
+# the rows that pass every other facet's filter.
+FACETS = {
+    "talents": {
+        "location": ("t.location", "(:locations IS NULL OR t.location IN (SELECT value FROM json_each(:locations)))",
+                     None),
+        "availability": ("t.availability",
+                         "(:availability IS NULL OR t.availability IN (SELECT value FROM json_each(:availability)))",
+                         None),
+        "rate": ("t.kic_hourly_rate", "t.kic_hourly_rate BETWEEN :min_rate AND :max_rate", (50, 100, 200, 300)),
+        "projects": ("u.total_projects_completed", "u.total_projects_completed >= :min_projects", (1, 5, 10, 25))
+    },
+    "labs": {
+        "specialty": ("l.specialty",
+                      "(:specialties IS NULL OR l.specialty IN (SELECT value FROM json_each(:specialties)))", None),
+        "location": ("l.location", "(:locations IS NULL OR l.location IN (SELECT value FROM json_each(:locations)))",
+                     None),
+        "price": ("l.price_per_day", "l.price_per_day BETWEEN :min_price AND :max_price", (500, 1000, 1500, 2000)),
+        "kic_price": ("l.kic_price_per_day", "l.kic_price_per_day BETWEEN :min_kic_price AND :max_kic_price",
+                      (250, 500, 750, 1000))
+    }
+}
+
+
+def facet_filters(listing: str) -> str:
+    """The listing's facet filters as AND clauses, for the end of its WHERE"""
+    return "".join(f"""
+      AND {condition}""" for _, condition, _ in FACETS[listing].values())
+
+
+def facet_query(listing: str, source: str) -> str:
+    """One GROUP BY pass over `source` (FROM ... WHERE without the facet filters): a row per combination
+    of facet values with its count and whether each facet's filter passes.
+
+    Groups on the raw columns and leaves bucketing to Database.facets: a CASE per bucketed facet
+    in the GROUP BY key made the sort most of the pass. Each filter only reads its own column, so
+    its flag is the same for every row of a group.
+    """
+    facets = FACETS[listing]
+    columns = [f"{column} as {facet}" for facet, (column, _, _) in facets.items()]
+    columns += [f"{condition} as in_{facet}" for facet, (_, condition, _) in facets.items()]
+    return ("\n    SELECT " + ",\n           ".join(columns + ["COUNT(*) as matches"]) + source
+            + f"\n    GROUP BY {', '.join(str(i) for i in range(1, len(facets) + 1))}\n")
+
+
+TALENT_COLUMNS = """
+    SELECT t.*,
+           u.name,
+           u.email,
+           u.location as user_location,
+           u.is_verified,
+           u.reputation_score,
+           u.total_projects_completed,
+           u.phone"""
+TALENT_ITEM_FILTERS = """
+      AND (:specializations IS NULL OR t.id IN (""" + having_all("talent_items", "specialization") + """))
+      AND (:languages IS NULL OR t.id IN (""" + having_all("talent_items", "language") + """))"""
+TALENT_SEARCH_SOURCE = """
+    FROM talents t
+             JOIN users u ON t.user_id = u.id
+    WHERE t.id IN (""" + having_all("talent_items", "skill") + """
+                   UNION ALL
+                   SELECT id FROM talents WHERE :skills IS NULL)""" + TALENT_ITEM_FILTERS
+# With search text the FTS5 index drives the query and bm25 ranks "Best Match"
+TALENT_MATCH_SOURCE = """
+    FROM talent_search
+             JOIN talents t ON t.id = talent_search.rowid
+             JOIN users u ON t.user_id = u.id
+    WHERE talent_search MATCH :match
+      AND (:skills IS NULL OR t.id IN (""" + having_all("talent_items", "skill") + """))""" + TALENT_ITEM_FILTERS
+TALENT_SEARCH = TALENT_COLUMNS + TALENT_SEARCH_SOURCE + facet_filters("talents") + "\n"
+TALENT_MATCH = TALENT_COLUMNS + TALENT_MATCH_SOURCE + facet_filters("talents") + "\n"
+TALENT_SORTS = {
+    "Best Match": "u.is_verified DESC, u.reputation_score DESC",
+    "Reputation Score": "u.reputation_score DESC",
+    "Project Count": "u.total_projects_completed DESC",
+    "Rating": "t.rating DESC",
+    "Recently Active": "u.is_verified DESC, u.reputation_score DESC"
+}
+TALENT_MATCH_SORTS = {**TALENT_SORTS, "Best Match": f"{bm25_rank('talent_search')}, u.reputation_score DESC"}
+
+# Without search text the equipment filter is a UNION, which SQLite can start from: a selected
+# instrument reads its few lab_items rows and looks those labs up instead of scanning every lab.
+# Only one filter per query can drive, so amenities keep the plain form. Talents drive from
+# skills and projects from tags the same way.
+LAB_SEARCH_SOURCE = """
+    FROM labs l
+             JOIN universities u ON l.university_id = u.id
+    WHERE l.id IN (""" + having_all("lab_items", "equipment") + """
+                   UNION ALL
+                   SELECT id FROM labs WHERE :equipment IS NULL)
+      AND (:amenities IS NULL OR l.id IN (""" + having_all("lab_items", "amenity") + """))"""
+# With search text the FTS5 index drives the query and bm25 ranks "Best Match"
+LAB_MATCH_SOURCE = """
+    FROM lab_search
+             JOIN labs l ON l.id = lab_search.rowid
+             JOIN universities u ON l.university_id = u.id
+    WHERE lab_search MATCH :match
+      AND (:equipment IS NULL OR l.id IN (""" + having_all("lab_items", "equipment") + """))
+      AND (:amenities IS NULL OR l.id IN (""" + having_all("lab_items", "amenity") + """))"""
+LAB_SEARCH = """
+    SELECT l.*, u.name as university_name""" + LAB_SEARCH_SOURCE + facet_filters("labs") + "\n"
+LAB_MATCH = """
+    SELECT l.*, u.name as university_name""" + LAB_MATCH_SOURCE + facet_filters("labs") + "\n"
+LAB_SORTS = {
+    "Best Match": "l.rating DESC",
+    "Rating": "l.rating DESC",
+    "Price": "l.price_per_day ASC",
+    "KIC Price": "l.kic_price_per_day ASC",
+    "Availability": "l.available_from ASC"
+}
+LAB_MATCH_SORTS = {**LAB_SORTS, "Best Match": f"{bm25_rank('lab_search')}, l.rating DESC"}
+
+PROJECT_COLUMNS = """
+    SELECT p.*,
+           c.name                                 as company_name,
+           c.industry,
+           c.is_verified                          as company_verified,
+           julianday(deadline) - julianday('now') as days_left"""
+PROJECT_FILTERS = """
+      AND p.status = 'Active'
+      AND (:urgency IS NULL OR p.urgency = :urgency)
+      AND (NOT :remote_only OR p.remote_possible = TRUE)
+"""
+QUERIES["projects.search"] = PROJECT_COLUMNS + """
+    FROM projects p
+             LEFT JOIN companies c ON p.company_id = c.id
+    WHERE p.id IN (""" + having_all("project_items", "tag") + """
+                   UNION ALL
+                   SELECT id FROM projects WHERE :tags IS NULL)""" + PROJECT_FILTERS + """    ORDER BY p.views DESC, p.posted DESC
+"""
+# Search text: bm25-ranked matches from the FTS5 index, with the best-matching passage highlighted
+QUERIES["projects.match"] = PROJECT_COLUMNS + """,
+           snippet(project_search, -1, '<mark>', '</mark>', '…', 24) as match_snippet
+    FROM project_search
+             JOIN projects p ON p.id = project_search.rowid
+             LEFT JOIN companies c ON p.company_id = c.id
+    WHERE project_search MATCH :match
+      AND (:tags IS NULL OR p.id IN (""" + having_all("project_items", "tag") + """))""" + PROJECT_FILTERS + f"""    ORDER BY {bm25_rank('project_search')}, p.views DESC
+"""
+# Filter lists with counts: "labs.items", "talents.items", ... bound to one ITEM_INDEXES kind
+QUERIES.update({f"{table}.items": f"SELECT item, COUNT(*) as total FROM {items} WHERE kind = ? "
+                                  f"GROUP BY item ORDER BY total DESC, item"
+                for items, (table, _, _) in ITEM_INDEXES.items()})
+# One fixed text per sort order: "talents.search:Rating", "labs.search:Price", ...
+QUERIES.update({f"talents.search:{label}": f"{TALENT_SEARCH}    ORDER BY {order}\n"
+                for label, order in TALENT_SORTS.items()})
+QUERIES.update({f"talents.match:{label}": f"{TALENT_MATCH}    ORDER BY {order}\n"
+                for label, order in TALENT_MATCH_SORTS.items()})
+QUERIES.update({f"labs.search:{label}": f"{LAB_SEARCH}    ORDER BY {order}\n" for label, order in LAB_SORTS.items()})
+QUERIES.update({f"labs.match:{label}": f"{LAB_MATCH}    ORDER BY {order}\n"
+                for label, order in LAB_MATCH_SORTS.items()})
+# Facet counts for the listing with and without search text: "talents.facets:search", ...
+QUERIES.update({f"{listing}.facets:{variant}": facet_query(listing, source)
+                for listing, sources in (("talents", (TALENT_SEARCH_SOURCE, TALENT_MATCH_SOURCE)),
+                                         ("labs", (LAB_SEARCH_SOURCE, LAB_MATCH_SOURCE)))
+                for variant, source in zip(("search", "match"), sources)})
+
+# Prepared-statement slots per connection: every registry text plus headroom for ad-hoc SQL
+STATEMENT_CACHE_SIZE = max(128, 2 * len(QUERIES))
+
+
+def bind_list(values) -> Optional[str]:
+    """A filter list as one JSON parameter for json_each; None (no filter) when empty"""
+    return json.dumps(list(values)) if values else None
+
+
+def like_pattern(text: str) -> Optional[str]:
+    return f"%{text}%" if text else None
+
+
+def fts_query(text: str) -> Optional[str]:
+    """Search box text as an FTS5 query: every word must match, as a prefix; None when there are no words"""
+    return " ".join(f'"{word}"*' for word in re.findall(r"\w+", text or "")) or None
+
+
+@lru_cache(maxsize=None)
+def normalize_sql(sql: str) -> str:
+    """Statement text with whitespace collapsed, so reformatting does not split cache keys"""
+    return " ".join(sql.split())
+
+
+def estimate_size(value) -> int:
+    """Rough bytes held by a cached result (a list of rows)"""
+    if isinstance(value, (list, tuple)):
+        if len(value) > 256:
+            # Rows of one result are alike: measure an even sample of 64 and scale up
+            sample = value[::len(value) // 64][:64]
+            return sys.getsizeof(value) + sum(estimate_size(item) for item in sample) * len(value) // len(sample)
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    if isinstance(value, sqlite3.Row):
+        return sys.getsizeof(value) + sum(sys.getsizeof(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sys.getsizeof(item) for item in value.values())
+    return sys.getsizeof(value)
+
+
+@lru_cache(maxsize=None)
+def read_tables(sql: str) -> frozenset:
+    """Tables a statement reads, for tagging cached results"""
+    return frozenset(re.findall(r"\b(?:FROM|JOIN)\s+(\w+)", sql, re.I)) - {"json_each"}
+
+
+@lru_cache(maxsize=None)
+def written_table(sql: str) -> Optional[str]:
+    """Table an INSERT, UPDATE or DELETE writes; None for reads"""
+    match = re.match(r"\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)"
+                     r"\s+(\w+)", sql, re.I)
+    return match.group(1) if match else None
+
+
+def counter_trigger_statements() -> List[str]:
+    """CREATE TRIGGER statements that apply every row change to platform_counters"""
+    def apply(row: str, sign: str, counters: Dict[str, str]) -> str:
+        return "".join(f"UPDATE platform_counters SET value = value {sign} COALESCE({expr.format(row=row)}, 0) "
+                       f"WHERE name = '{name}'; " for name, expr in counters.items())
+
+    statements = []
+    for table, spec in KPI_COUNTERS.items():
+        counters = spec["counters"]
+        statements.append(f"CREATE TRIGGER IF NOT EXISTS kpi_{table}_insert AFTER INSERT ON {table} "
+                          f"BEGIN {apply('NEW', '+', counters)}END")
+        statements.append(f"CREATE TRIGGER IF NOT EXISTS kpi_{table}_delete AFTER DELETE ON {table} "
+                          f"BEGIN {apply('OLD', '-', counters)}END")
+        if spec["watch"]:
+            statements.append(f"CREATE TRIGGER IF NOT EXISTS kpi_{table}_update AFTER UPDATE OF {spec['watch']} "
+                              f"ON {table} BEGIN {apply('OLD', '-', counters)}{apply('NEW', '+', counters)}END")
+
+    for name, (table, column) in KPI_DISTINCT_COUNTERS.items():
+        add = (f"INSERT INTO counter_groups (counter, value, rows) SELECT '{name}', NEW.{column}, 1 "
+               f"WHERE NEW.{column} IS NOT NULL ON CONFLICT (counter, value) DO UPDATE SET rows = rows + 1; ")
+        remove = (f"UPDATE counter_groups SET rows = rows - 1 WHERE counter = '{name}' AND value = OLD.{column}; "
+                  f"DELETE FROM counter_groups WHERE counter = '{name}' AND value = OLD.{column} AND rows <= 0; ")
+        statements.append(f"CREATE TRIGGER IF NOT EXISTS kpi_{name}_insert AFTER INSERT ON {table} BEGIN {add}END")
+        statements.append(f"CREATE TRIGGER IF NOT EXISTS kpi_{name}_delete AFTER DELETE ON {table} BEGIN {remove}END")
+        statements.append(f"CREATE TRIGGER IF NOT EXISTS kpi_{name}_update AFTER UPDATE OF {column} ON {table} "
+                          f"WHEN OLD.{column} IS NOT NEW.{column} BEGIN {remove}{add}END")
+
+    # A value's first row adds one to its distinct counter, its last row removed takes one away
+    statements.append("CREATE TRIGGER IF NOT EXISTS kpi_counter_groups_insert AFTER INSERT ON counter_groups "
+                      "BEGIN UPDATE platform_counters SET value = value + 1 WHERE name = NEW.counter; END")
+    statements.append("CREATE TRIGGER IF NOT EXISTS kpi_counter_groups_delete AFTER DELETE ON counter_groups "
+                      "BEGIN UPDATE platform_counters SET value = value - 1 WHERE name = OLD.counter; END")
+    return statements
+
+
+def user_counter_trigger_statements() -> List[str]:
+    """CREATE TRIGGER statements that apply every row change to user_counters"""
+    statements = []
+    for name, (table, owner, condition, watch) in USER_COUNTERS.items():
+        add = (f"INSERT INTO user_counters (user_id, name, value) SELECT NEW.{owner}, '{name}', 1 "
+               f"WHERE {condition.format(row='NEW')} ON CONFLICT (user_id, name) DO UPDATE SET value = value + 1; ")
+        remove = (f"UPDATE user_counters SET value = value - 1 WHERE user_id = OLD.{owner} AND name = '{name}' "
+                  f"AND {condition.format(row='OLD')}; ")
+        statements.append(f"CREATE TRIGGER IF NOT EXISTS badge_{name}_insert AFTER INSERT ON {table} BEGIN {add}END")
+        statements.append(f"CREATE TRIGGER IF NOT EXISTS badge_{name}_delete AFTER DELETE ON {table} "
+                          f"BEGIN {remove}END")
+        statements.append(f"CREATE TRIGGER IF NOT EXISTS badge_{name}_update AFTER UPDATE OF {watch} ON {table} "
+                          f"BEGIN {remove}{add}END")
+    return statements
+
+
+def search_index_trigger_statements(index: str) -> List[str]:
+    """CREATE TRIGGER statements that apply every base-row change to the SEARCH_INDEXES index `index`"""
+    spec = SEARCH_INDEXES[index]
+    table, columns = spec["table"], ", ".join(spec["columns"])
+    statements = []
+
+    def add(row: str) -> str:
+        return (f"INSERT INTO {index} (rowid, {columns}) VALUES ({row}.id, "
+                f"{', '.join(expr.format(row=row) for expr in spec['columns'].values())}); ")
+
+    remove = f"DELETE FROM {index} WHERE rowid = OLD.id; "
+    statements.append(f"CREATE TRIGGER IF NOT EXISTS search_{index}_insert AFTER INSERT ON {table} "
+                      f"BEGIN {add('NEW')}END")
+    statements.append(f"CREATE TRIGGER IF NOT EXISTS search_{index}_delete AFTER DELETE ON {table} "
+                      f"BEGIN {remove}END")
+    statements.append(f"CREATE TRIGGER IF NOT EXISTS search_{index}_update AFTER UPDATE OF {spec['watch']} "
+                      f"ON {table} BEGIN {remove}{add('NEW')}END")
+    # A change to a related row re-indexes the base rows that point at it
+    for related, (watch, key) in spec["related"].items():
+        rows = f"FROM {table} WHERE {key} = NEW.id"
+        statements.append(
+            f"CREATE TRIGGER IF NOT EXISTS search_{index}_{related}_update AFTER UPDATE OF {watch} ON {related} "
+            f"BEGIN DELETE FROM {index} WHERE rowid IN (SELECT id {rows}); "
+            f"INSERT INTO {index} (rowid, {columns}) SELECT id, "
+            f"{', '.join(expr.format(row=table) for expr in spec['columns'].values())} {rows}; END")
+    return statements
+
+
+def badge_values(rows) -> Dict[str, int]:
+    """user_counters rows of one user as a dict, zero for counters that were never bumped"""
+    badges = dict.fromkeys(USER_COUNTERS, 0)
+    badges.update((row['name'], row['value']) for row in rows)
+    return badges
+
+
+def kpi_values(rows) -> Dict[str, float]:
+    """platform_counters rows as a dict, with the averages the KPI cards show"""
+    kpis = {row['name']: row['value'] for row in rows}
+    rated = kpis.get("lab_rating_rows", 0)
+    applied = kpis.get("active_applications_rows", 0)
+    kpis["lab_avg_rating"] = kpis.get("lab_rating_sum", 0) / rated if rated else 0
+    kpis["active_avg_applications"] = kpis.get("active_applications_sum", 0) / applied if applied else 0
+    return kpis
 
 
 # ==================== ENHANCED STYLES ====================
-def load_ultimate_css():
-    st.markdown("""
-    <style>
+UI_STYLESHEET = """
         /* Modern light theme with LinkedIn-inspired design */
         .main {
             background: linear-gradient(135deg, #f8fafc 0%, #e2e8f0 100%);
@@ -1458,6 +4113,19 @@ def load_ultimate_css():
         }
 
         /* Professional skill tags */
+        .match-snippet {
+            color: #475569;
+            font-size: 0.9rem;
+            margin-bottom: 1rem;
+        }
+
+        .match-snippet mark {
+            background: rgba(250, 204, 21, 0.35);
+            color: inherit;
+            padding: 0 0.15rem;
+            border-radius: 3px;
+        }
+
         .skill-tag {
             background: rgba(0, 119, 181, 0.08);
             color: #0077b5;
@@ -1735,8 +4403,60 @@ def load_ultimate_css():
         .success-animation {
             animation: successPulse 0.5s ease-out;
         }
-    </style>
-    """, unsafe_allow_html=True)
+"""
+
+# Written here and served at app/static/ when server.enableStaticServing is on (.streamlit/config.toml)
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+
+
+def minify_css(css: str) -> str:
+    """Strip comments and the whitespace CSS does not need"""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    css = re.sub(r":\s+", ":", css)
+    return css.replace(";}", "}").strip()
+
+
+@st.cache_resource(show_spinner=False)
+def stylesheet_asset() -> tuple:
+    """(URL, CSS) of the minified UI stylesheet, written once per content hash to STATIC_DIR.
+
+    The URL is None when static serving is off or the folder is not writable; the
+    stylesheet is then inlined on every rerun as before. Stylesheets left in STATIC_DIR
+    by earlier versions are removed.
+    """
+    css = minify_css(UI_STYLESHEET)
+    if not st.get_option("server.enableStaticServing"):
+        return None, css
+    name = f"ui.{hashlib.sha256(css.encode()).hexdigest()[:12]}.css"
+    path = os.path.join(STATIC_DIR, name)
+    try:
+        if not os.path.exists(path):
+            os.makedirs(STATIC_DIR, exist_ok=True)
+            staging = f"{path}.{os.getpid()}.tmp"
+            with open(staging, "w", encoding="utf-8") as f:
+                f.write(css)
+            os.replace(staging, path)
+        for stale in os.listdir(STATIC_DIR):
+            if stale != name and stale.startswith("ui.") and stale.endswith(".css"):
+                try:
+                    os.remove(os.path.join(STATIC_DIR, stale))
+                except OSError:
+                    pass  # another process already removed it
+    except OSError as e:
+        print(f"Error writing stylesheet {path}: {e}")
+        return None, css
+    return f"app/static/{name}", css
+
+
+def load_ultimate_css():
+    """Reference the cached stylesheet; the browser fetches a given hash only once"""
+    href, css = stylesheet_asset()
+    if href:
+        st.markdown(f'<link rel="stylesheet" href="{href}">', unsafe_allow_html=True)
+    else:
+        st.markdown(f"<style>{css}</style>", unsafe_allow_html=True)
 
 
 # ==================== AUTHENTICATION & MANAGERS ====================
@@ -1747,19 +4467,10 @@ class AuthManager:
 
     @staticmethod
     def login(email: str, password: str, db: Database):
-        cursor = db.conn.cursor()
         try:
-            cursor.execute("""
-                           SELECT *
-                           FROM users
-                           WHERE email = ?
-                             AND password_hash = ?
-                             AND is_active = TRUE
-                           """, (email, AuthManager.hash_password(password)))
-
-            user = cursor.fetchone()
+            user = db.fetch_one("auth.login", (email, AuthManager.hash_password(password)))
             if user:
-                return dict(user)
+                return db.profile(user['id'])
             return None
         except sqlite3.Error as e:
             st.error(f"Login error: {e}")
@@ -1769,14 +4480,9 @@ class AuthManager:
     def register(email: str, password: str, name: str, user_type: str,
                  organization: str, location: str, phone: str, db: Database) -> bool:
         try:
-            cursor = db.conn.cursor()
-            cursor.execute("""
-                           INSERT INTO users (email, password_hash, name, user_type,
-                                              organization, location, phone, kic_balance)
-                           VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                           """, (email, AuthManager.hash_password(password),
-                                 name, user_type, organization, location, phone, 1000))
-            db.conn.commit()
+            with db.unit_of_work() as cursor:
+                db.execute(cursor, "users.register", (email, AuthManager.hash_password(password),
+                                                      name, user_type, organization, location, phone, 1000))
             return True
         except sqlite3.IntegrityError:
             return False
@@ -1788,115 +4494,70 @@ class AuthManager:
 class SocialManager:
     @staticmethod
     def send_connection_request(requester_id: int, addressee_id: int, message: str, db: Database):
-        cursor = db.conn.cursor()
-        cursor.execute("""
-                       INSERT INTO connections (requester_id, addressee_id, message)
-                       VALUES (?, ?, ?)
-                       """, (requester_id, addressee_id, message))
-        db.conn.commit()
+        with db.unit_of_work() as cursor:
+            db.execute(cursor, "connections.request", (requester_id, addressee_id, message))
 
     @staticmethod
     def accept_connection(connection_id: int, db: Database):
-        cursor = db.conn.cursor()
-        cursor.execute("""
-                       UPDATE connections
-                       SET status      = 'accepted',
-                           accepted_at = CURRENT_TIMESTAMP
-                       WHERE id = ?
-                       """, (connection_id,))
-        db.conn.commit()
+        with db.unit_of_work() as cursor:
+            db.execute(cursor, "connections.accept", (connection_id,))
 
     @staticmethod
     def send_message(sender_id: int, receiver_id: int, message: str, db: Database):
-        cursor = db.conn.cursor()
-        cursor.execute("""
-                       INSERT INTO messages (sender_id, receiver_id, message)
-                       VALUES (?, ?, ?)
-                       """, (sender_id, receiver_id, message))
-        db.conn.commit()
+        with db.unit_of_work() as cursor:
+            db.execute(cursor, "messages.send", (sender_id, receiver_id, message))
+
+    @staticmethod
+    def mark_conversation_read(user_id: int, other_user_id: int, db: Database):
+        with db.unit_of_work() as cursor:
+            db.execute(cursor, "messages.mark_thread_read", (user_id, other_user_id))
+
+    @staticmethod
+    def mark_notifications_read(user_id: int, db: Database):
+        with db.unit_of_work() as cursor:
+            db.execute(cursor, "notifications.mark_all_read", (user_id,))
 
     @staticmethod
     def get_conversations(user_id: int, db: Database):
-        cursor = db.conn.cursor()
-        cursor.execute("""
-                       SELECT DISTINCT CASE WHEN sender_id = ? THEN receiver_id ELSE sender_id END as other_user_id,
-                                       u.name,
-                                       u.user_type,
-                                       MAX(m.created_at)                                           as last_message_time
-                       FROM messages m
-                                JOIN users u ON u.id = CASE WHEN m.sender_id = ? THEN m.receiver_id ELSE m.sender_id END
-                       WHERE ? IN (sender_id, receiver_id)
-                       GROUP BY other_user_id, u.name, u.user_type
-                       ORDER BY last_message_time DESC
-                       """, (user_id, user_id, user_id))
-        return cursor.fetchall()
+        return db.fetch_for_user("messages.conversations", user_id, (user_id, user_id, user_id, user_id))
 
     @staticmethod
     def get_messages(user1_id: int, user2_id: int, db: Database):
-        cursor = db.conn.cursor()
-        cursor.execute("""
-                       SELECT m.*, u.name as sender_name
-                       FROM messages m
-                                JOIN users u ON m.sender_id = u.id
-                       WHERE (sender_id = ? AND receiver_id = ?)
-                          OR (sender_id = ? AND receiver_id = ?)
-                       ORDER BY created_at ASC
-                       """, (user1_id, user2_id, user2_id, user1_id))
-        return cursor.fetchall()
+        return db.fetch_for_user("messages.thread", user1_id, (user1_id, user2_id, user2_id, user1_id))
 
 
 class KICManager:
     @staticmethod
     def transfer_kic(from_user_id: int, to_user_id: int, amount: int,
                      description: str, db: Database) -> bool:
-        cursor = db.conn.cursor()
+        with db.unit_of_work() as cursor:
+            # Balance check and debit share the writer lock so concurrent transfers cannot overdraw
+            db.execute(cursor, "users.kic_balance", (from_user_id,))
+            balance = cursor.fetchone()[0]
 
-        cursor.execute("SELECT kic_balance FROM users WHERE id = ?", (from_user_id,))
-        balance = cursor.fetchone()[0]
+            if balance < amount:
+                return False
 
-        if balance >= amount:
-            cursor.execute("""
-                           UPDATE users
-                           SET kic_balance = kic_balance - ?
-                           WHERE id = ?
-                           """, (amount, from_user_id))
+            db.execute(cursor, "users.debit_kic", (amount, from_user_id))
 
-            cursor.execute("""
-                           UPDATE users
-                           SET kic_balance = kic_balance + ?
-                           WHERE id = ?
-                           """, (amount, to_user_id))
+            db.execute(cursor, "users.credit_kic", (amount, to_user_id))
 
-            cursor.execute("""
-                           INSERT INTO kic_transactions (user_id, transaction_type, amount, description)
-                           VALUES (?, 'sent', ?, ?)
-                           """, (from_user_id, -amount, description))
+            db.execute(cursor, "kic.record_sent", (from_user_id, -amount, description))
 
-            cursor.execute("""
-                           INSERT INTO kic_transactions (user_id, transaction_type, amount, description)
-                           VALUES (?, 'received', ?, ?)
-                           """, (to_user_id, amount, description))
+            db.execute(cursor, "kic.record_received", (to_user_id, amount, description))
 
-            db.conn.commit()
-            return True
-        return False
+            db.write_through_profile(cursor, from_user_id)
+            db.write_through_profile(cursor, to_user_id)
+        return True
 
     @staticmethod
     def get_kic_balance(user_id: int, db: Database) -> int:
-        cursor = db.conn.cursor()
-        cursor.execute("SELECT kic_balance FROM users WHERE id = ?", (user_id,))
-        return cursor.fetchone()[0]
+        profile = db.profile(user_id)
+        return profile['kic_balance'] if profile else None
 
     @staticmethod
     def get_kic_transactions(user_id: int, db: Database, limit: int = 10):
-        cursor = db.conn.cursor()
-        cursor.execute("""
-                       SELECT *
-                       FROM kic_transactions
-                       WHERE user_id = ?
-                       ORDER BY created_at DESC LIMIT ?
-                       """, (user_id, limit))
-        return cursor.fetchall()
+        return db.fetch_for_user("kic.recent_transactions", user_id, (user_id, limit))
 
 
 class LabAccessManager:
@@ -1912,14 +4573,10 @@ class LabAccessManager:
         username, password = LabAccessManager.generate_credentials()
         password_hash = AuthManager.hash_password(password)
 
-        cursor = db.conn.cursor()
         try:
-            cursor.execute("""
-                INSERT OR REPLACE INTO lab_access 
-                (lab_id, user_id, access_level, username, password_hash, valid_from, valid_until)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (lab_id, user_id, access_level, username, password_hash, valid_from, valid_until))
-            db.conn.commit()
+            with db.unit_of_work() as cursor:
+                db.execute(cursor, "lab_access.grant",
+                           (lab_id, user_id, access_level, username, password_hash, valid_from, valid_until))
             return username, password
         except sqlite3.Error as e:
             st.error(f"Error granting lab access: {e}")
@@ -1927,24 +4584,10 @@ class LabAccessManager:
 
     @staticmethod
     def verify_lab_access(lab_id: int, username: str, password: str, db: Database):
-        cursor = db.conn.cursor()
         password_hash = AuthManager.hash_password(password)
 
         try:
-            cursor.execute("""
-                           SELECT la.*, u.name as user_name, l.name as lab_name
-                           FROM lab_access la
-                                    JOIN users u ON la.user_id = u.id
-                                    JOIN labs l ON la.lab_id = l.id
-                           WHERE la.lab_id = ?
-                             AND la.username = ?
-                             AND la.password_hash = ?
-                             AND la.is_active = TRUE
-                             AND DATE ('now') BETWEEN la.valid_from
-                             AND la.valid_until
-                           """, (lab_id, username, password_hash))
-
-            access = cursor.fetchone()
+            access = db.fetch_one("lab_access.verify", (lab_id, username, password_hash))
             return dict(access) if access else None
         except sqlite3.Error as e:
             st.error(f"Error verifying access: {e}")
@@ -1952,18 +4595,8 @@ class LabAccessManager:
 
     @staticmethod
     def get_user_lab_access(user_id: int, db: Database):
-        cursor = db.conn.cursor()
         try:
-            cursor.execute("""
-                           SELECT la.*, l.name as lab_name, u.name as university_name
-                           FROM lab_access la
-                                    JOIN labs l ON la.lab_id = l.id
-                                    JOIN universities u ON l.university_id = u.id
-                           WHERE la.user_id = ?
-                             AND la.is_active = TRUE
-                           ORDER BY la.created_at DESC
-                           """, (user_id,))
-            return cursor.fetchall()
+            return db.fetch_all("lab_access.for_user", (user_id,))
         except sqlite3.Error as e:
             st.error(f"Error getting lab access: {e}")
             return []
@@ -1972,23 +4605,8 @@ class LabAccessManager:
 class ProjectManager:
     @staticmethod
     def get_user_projects(user_id: int, db: Database):
-        cursor = db.conn.cursor()
         try:
-            cursor.execute("""
-                           SELECT p.*,
-                                  up.role,
-                                  up.status as participation_status,
-                                  up.joined_date,
-                                  up.completion_date,
-                                  up.rating_received,
-                                  up.payment_received,
-                                  up.contribution_description
-                           FROM projects p
-                                    JOIN user_projects up ON p.id = up.project_id
-                           WHERE up.user_id = ?
-                           ORDER BY up.joined_date DESC
-                           """, (user_id,))
-            return cursor.fetchall()
+            return db.fetch_all("projects.for_user", (user_id,))
         except sqlite3.Error as e:
             st.error(f"Error getting user projects: {e}")
             return []
@@ -1997,20 +4615,11 @@ class ProjectManager:
     def apply_to_project(project_id: int, user_id: int, application_text: str,
                          proposed_rate: int, proposed_kic_rate: int, db: Database) -> bool:
         try:
-            cursor = db.conn.cursor()
-            cursor.execute("""
-                           INSERT INTO project_applications (project_id, user_id, application_text,
-                                                             proposed_rate, proposed_kic_rate)
-                           VALUES (?, ?, ?, ?, ?)
-                           """, (project_id, user_id, application_text, proposed_rate, proposed_kic_rate))
+            with db.unit_of_work() as cursor:
+                db.execute(cursor, "applications.create",
+                           (project_id, user_id, application_text, proposed_rate, proposed_kic_rate))
 
-            cursor.execute("""
-                           UPDATE projects
-                           SET applications = applications + 1
-                           WHERE id = ?
-                           """, (project_id,))
-
-            db.conn.commit()
+                db.execute(cursor, "projects.increment_applications", (project_id,))
             return True
         except sqlite3.IntegrityError:
             return False
@@ -2020,21 +4629,207 @@ class ProjectManager:
 
     @staticmethod
     def get_project_applications(user_id: int, db: Database):
-        cursor = db.conn.cursor()
         try:
-            cursor.execute("""
-                           SELECT pa.*, p.title, p.organization, p.kic_budget_min, p.kic_budget_max
-                           FROM project_applications pa
-                                    JOIN projects p ON pa.project_id = p.id
-                           WHERE pa.user_id = ?
-                           ORDER BY pa.applied_date DESC
-                           """, (user_id,))
-            return cursor.fetchall()
+            return db.fetch_all("applications.for_user", (user_id,))
         except sqlite3.Error as e:
             st.error(f"Error getting applications: {e}")
             return []
 
 
+# ==================== CARD FRAGMENTS ====================
+def card_fragment(db: Database, kind: str, row, view_mode: str, render: Callable, version=None):
+    """The rendered card for a row from db.fragments, re-rendered only when the row's content changes.
+
+    The version defaults to a hash of every column the listing query returned, so any
+    edit to the row (or a joined column) yields a new key and the old card ages out.
+    """
+    key = (kind, row['id'], hash(tuple(row)) if version is None else version, view_mode)
+    return db.fragments.get_or_load(key, (), lambda: render(row))
+
+
+def project_version(project) -> int:
+    # days_left is recomputed from 'now' on every query; the card only shows whole days
+    days_left = int(project['days_left']) if project['days_left'] else 0
+    return hash(tuple(value for key, value in zip(project.keys(), project) if key != 'days_left') + (days_left,))
+
+
+def render_talent_card(talent) -> str:
+    return f'''
+    <div class="modern-card">
+        <div style="display: flex; gap: 1.5rem;">
+            <div style="flex-shrink: 0;">
+                <div style="width: 80px; height: 80px; background: linear-gradient(135deg, #0077b5, #00a0dc); 
+                            border-radius: 50%; display: flex; align-items: center; justify-content: center;
+                            color: white; font-size: 1.8rem; font-weight: bold;">
+                    {talent['name'][0].upper()}
+                </div>
+            </div>
+            <div style="flex: 1;">
+                <div style="display: flex; align-items: center; gap: 1rem; margin-bottom: 0.5rem;">
+                    <h3 style="margin: 0;">{talent['name']}</h3>
+                    {f'<span class="status-badge status-verified">✓ Verified</span>' if talent['is_verified'] else ''}
+                    <span class="status-badge status-online">🟢 Active</span>
+                </div>
+                <div style="color: #0077b5; font-weight: 600; margin-bottom: 0.5rem;">
+                    {talent['title']}
+                </div>
+                <div style="color: #64748b; margin-bottom: 1rem;">
+                    📍 {talent['location']} • 💼 {talent['experience']} • 
+                    🎓 {talent['education']} • 
+                    📊 {talent['reputation_score']} reputation • 
+                    ✅ {talent['total_projects_completed']} projects completed
+                </div>
+                <div style="color: #475569; margin-bottom: 1rem;">
+                    {talent['bio'][:200]}{'...' if len(talent['bio']) > 200 else ''}
+                </div>
+                <div style="margin-bottom: 1rem;">
+                    {' '.join([f'<span class="skill-tag">{skill.strip()}</span>'
+                               for skill in talent['skills'].split(',')[:6]])}
+                </div>
+                <div style="display: flex; justify-content: space-between; align-items: center;">
+                    <div>
+                        <span style="color: #16a34a; font-weight: bold; font-size: 1.1rem;">
+                            💰 {talent['kic_hourly_rate']} KIC/hr
+                        </span>
+                        <span style="color: #64748b; margin-left: 1rem;">
+                            AED {talent['hourly_rate']}/hr
+                        </span>
+                    </div>
+                    <div style="display: flex; gap: 0.5rem;">
+                        <span class="status-badge status-featured">{talent['availability']}</span>
+                    </div>
+                </div>
+            </div>
+        </div>
+    </div>
+    '''
+
+
+def render_talent_row(talent) -> tuple:
+    """Cells of the compact talent listing"""
+    verified_badge = "✓" if talent['is_verified'] else ""
+    return (f"**{talent['name']} {verified_badge}**  \n{talent['title']}",
+            f"{talent['location']} • {talent['availability']}",
+            f"**{talent['total_projects_completed']}** projects",
+            f"**{talent['kic_hourly_rate']} KIC**/hr")
+
+
+def render_project_card(project) -> str:
+    days_left = int(project['days_left']) if project['days_left'] else 0
+    urgency_class = f"urgency-{project['urgency'].lower()}"
+    return f'''
+    <div class="project-card" style="--urgency-color: {'#dc2626' if project['urgency'] == 'High' else '#d97706' if project['urgency'] == 'Medium' else '#16a34a'};">
+        <div style="display: flex; justify-content: space-between; margin-bottom: 1rem;">
+            <div>
+                <h3 style="margin-bottom: 0.5rem;">{project['title']}</h3>
+                <div style="display: flex; align-items: center; gap: 1rem;">
+                    <span style="color: #0077b5; font-weight: 600;">{project['organization']}</span>
+                    {f'<span class="status-badge status-verified">✓ Verified</span>' if project['company_verified'] else ''}
+                    <span class="status-badge status-featured">{project['industry'] or 'Technology'}</span>
+                </div>
+            </div>
+            <div style="text-align: right;">
+                <div style="color: #16a34a; font-weight: bold; font-size: 1.3rem;">
+                    💰 {project['kic_budget_min']:,} - {project['kic_budget_max']:,} KIC
+                </div>
+                <div style="color: #64748b;">
+                    AED {project['budget_min']:,} - {project['budget_max']:,}
+                </div>
+            </div>
+        </div>
+
+        <div style="margin-bottom: 1rem;">
+            <span>📍 {project['location']}</span> • 
+            <span class="{urgency_class}">⚡ {project['urgency']} Priority</span> • 
+            <span>⏰ {days_left} days left</span> • 
+            <span>👁️ {project['views']} views</span> • 
+            <span>📝 {project['applications']} applications</span>
+            {f" • 🌐 Remote OK" if project['remote_possible'] else ""}
+        </div>
+        {f'<div class="match-snippet">🔎 …{project["match_snippet"]}…</div>'
+         if "match_snippet" in project.keys() else ""}
+
+        <div style="color: #475569; margin-bottom: 1.5rem; line-height: 1.6;">
+            {project['description']}
+        </div>
+
+        <div style="margin-bottom: 1rem;">
+            <strong style="color: #1e293b;">Requirements:</strong>
+            <div style="color: #64748b; margin-top: 0.5rem;">{project['requirements']}</div>
+        </div>
+
+        <div style="margin-bottom: 1rem;">
+            {' '.join([f'<span class="skill-tag">{tag.strip()}</span>' for tag in project['tags'].split(',')])}
+        </div>
+    </div>
+    '''
+
+
+def render_lab_card(lab) -> str:
+    return f'''
+    <div class="lab-card">
+        <div style="display: flex; gap: 1.5rem;">
+            <div style="flex-shrink: 0;">
+                <div style="width: 100px; height: 100px; background: linear-gradient(135deg, #0077b5, #00a0dc); 
+                            border-radius: 12px; display: flex; align-items: center; justify-content: center;
+                            color: white; font-size: 2rem;">
+                    🔬
+                </div>
+            </div>
+            <div style="flex: 1;">
+                <div style="display: flex; justify-content: between; align-items: start; margin-bottom: 0.5rem;">
+                    <div style="flex: 1;">
+                        <h3 style="margin-bottom: 0.5rem;">{lab['name']}</h3>
+                        <div style="color: #0077b5; font-weight: 600; margin-bottom: 0.5rem;">
+                            {lab['university_name']}
+                        </div>
+                        <div style="color: #64748b; margin-bottom: 1rem;">
+                            📍 {lab['location']} • 
+                            🧪 {lab['specialty']} • 
+                            👥 Capacity: {lab['capacity']} • 
+                            ⭐ {lab['rating']:.1f} rating • 
+                            📅 {lab['total_bookings']} bookings
+                        </div>
+                        <div style="color: #475569; margin-bottom: 1rem; line-height: 1.6;">
+                            {lab['description']}
+                        </div>
+                        <div style="margin-bottom: 1rem;">
+                            <strong>Equipment:</strong>
+                            <div style="margin-top: 0.5rem;">
+                                {' '.join([f'<span class="skill-tag">{eq.strip()}</span>'
+                                           for eq in lab['equipment'].split(',')[:4]])}
+                            </div>
+                        </div>
+                        <div style="margin-bottom: 1rem;">
+                            <strong>Amenities:</strong>
+                            <div style="margin-top: 0.5rem;">
+                                {' '.join([f'<span class="skill-tag">{amenity.strip()}</span>'
+                                           for amenity in lab['amenities'].split(',')[:3]])}
+                            </div>
+                        </div>
+                    </div>
+                    <div style="text-align: right; margin-left: 2rem;">
+                        <div style="background: #f8fafc; padding: 1.5rem; border-radius: 12px; border: 1px solid #e2e8f0;">
+                            <div style="margin-bottom: 1rem;">
+                                <div style="color: #16a34a; font-weight: bold; font-size: 1.3rem;">
+                                    💰 {lab['kic_price_per_day']} KIC/day
+                                </div>
+                                <div style="color: #64748b; font-size: 0.9rem;">
+                                    or AED {lab['price_per_day']}/day
+                                </div>
+                            </div>
+                            <div style="color: #64748b; font-size: 0.9rem; margin-bottom: 1rem;">
+                                Available from: {lab['available_from']}
+                            </div>
+                        </div>
+                    </div>
+                </div>
+            </div>
+        </div>
+    </div>
+    '''
+
+
 # ==================== PAGES ====================
 def show_ultimate_login_page(db: Database):
     col1, col2, col3 = st.columns([1, 2, 1])
@@ -2163,6 +4958,91 @@ def show_ultimate_login_page(db: Database):
                 if st.button("🌱 Reseed Data", use_container_width=True):
                     db.seed_comprehensive_data()
                     st.success("Data reseeded successfully!")
+            if st.button("🧮 Rebuild KPI Counters", use_container_width=True):
+                drift = db.rebuild_counters()
+                st.success(f"KPI counters rebuilt; {len(drift)} had drifted"
+                           + "".join(f"\n- {name}: {old} → {new}" for name, (old, new) in drift.items()))
+
+            stats = db.init_stats()
+            st.caption(f"Database resource: {stats['instances_created']} instance(s), "
+                       f"{stats['schema_initializations']} schema initialization(s), "
+                       f"up since {stats['created_at']}")
+            pool = db.pool.stats()
+            st.caption(f"Read pool: {pool['open']}/{pool['size']} open, {pool['in_use']} in use, "
+                       f"{pool['waits']} waits (avg {pool['avg_wait_ms']} ms, "
+                       f"max {pool['max_wait_seconds'] * 1000:.1f} ms), {pool['reaped']} reaped")
+            st.caption(f"Schema version: {db.schema_version()} of {MIGRATIONS[-1].version}")
+            storage = db.storage_stats()
+            st.caption(f"Storage profile: {storage['profile']} (journal={storage['journal_mode']}, "
+                       f"synchronous={storage['synchronous']}, cache_size={storage['cache_size']}, "
+                       f"mmap_size={storage['mmap_size']})")
+            queries = db.query_stats().values()
+            calls = sum(q['calls'] for q in queries)
+            hits = sum(q['cache_hits'] for q in queries)
+            st.caption(f"Query registry: {len(QUERIES)} named queries, {len(queries)} used, {calls} calls, "
+                       f"{hits / calls if calls else 0:.1%} statement cache hits")
+            loads = db.loader_stats()
+            st.caption(f"Page loader: {loads['loads']} bundles of {loads['queries']} queries, "
+                       f"avg {loads['avg_wall_ms']} ms wall, {loads['speedup']}x faster than sequential")
+            snapshot = db.analytics.stats()
+            st.caption(f"Analytics snapshot: generation {snapshot['generation']}, age {snapshot['age_seconds']} s "
+                       f"(max {snapshot['max_staleness']:.0f} s), {snapshot['pages']} pages copied in "
+                       f"{snapshot['last_refresh_ms']} ms, {snapshot['served']} queries served, "
+                       f"{snapshot['fallbacks']} fell back to live")
+            options = db.option_cache.stats()
+            st.caption(f"Option lists: {options['entries']} cached, {options['hit_rate']:.1%} hit rate "
+                       f"({options['hits']} hits / {options['misses']} misses), {options['invalidations']} "
+                       f"invalidated by writes, {options['expirations']} expired, {options['evictions']} evicted")
+            profiles = db.profiles.stats()
+            st.caption(f"Profile cache: {profiles['entries']} users, {profiles['hit_rate']:.1%} hit rate, "
+                       f"{profiles['write_throughs']} write-throughs")
+            figures = db.figure_cache.stats()
+            st.caption(f"Figure cache: {figures['entries']} chart specs, {figures['hit_rate']:.1%} hit rate, "
+                       f"{figures['invalidations']} invalidated by writes")
+            fragments = db.fragments.stats()
+            st.caption(f"Card fragments: {fragments['entries']} cards, {fragments['bytes'] / 1048576:.1f} MB, "
+                       f"{fragments['hit_rate']:.1%} hit rate, {fragments['evictions']} evicted")
+            if db.warmer:
+                warmup = db.warmer.stats()
+                st.caption(f"Startup warmup{' (running)' if warmup['running'] else ''}: {warmup['warmed']} steps "
+                           f"warmed in {warmup['elapsed_ms']} ms, {warmup['skipped']} skipped over the "
+                           f"{db.warmer.budget:.0f}s budget, {warmup['failed']} failed")
+            if db.shared:
+                shared = db.shared.stats()
+                st.caption(f"Shared cache ({os.path.basename(db.shared.path)}): {shared['hit_rate']:.1%} hit rate, "
+                           f"{shared['bytes'] / 1048576:.1f} of {db.shared.max_bytes // 1048576} MB, "
+                           f"{shared['remote_bumps']} writes from other workers applied, "
+                           f"{shared['evictions']} evicted")
+            bus = db.bus.stats()
+            scoped = db.user_cache.stats()
+            st.caption(f"Invalidation bus: version {bus['version']} after {bus['publishes']} commits, "
+                       f"{bus['tables']} tables and {bus['users']} users versioned; per-user reads "
+                       f"{scoped['hit_rate']:.1%} served without a query")
+            reconciler = db.reconciler.stats()
+            st.caption(f"Badge counters: {reconciler['runs']} reconciler runs every {db.reconciler.interval:.0f}s, "
+                       f"{reconciler['corrections']} drifted counters corrected "
+                       f"(last run {reconciler['last_run_ms']} ms)")
+            cached = db.query_cache.stats()
+            st.caption(f"Query cache: {cached['entries']} results, {cached['bytes'] / 1024:.0f} KB of "
+                       f"{db.query_cache.max_bytes // 1048576} MB, {cached['hit_rate']:.1%} hit rate, "
+                       f"{cached['invalidations']} invalidated by writes, {cached['evictions']} evicted")
+            tx = db.transaction_stats()
+            st.caption(f"Transactions: {tx['units']} units in {tx['commits']} commits "
+                       f"({tx['units_per_commit']} per commit, max batch {tx['max_batch']}), "
+                       f"{tx['commits_per_second']} commits/s, latency p50 {tx['latency_p50_ms']} ms / "
+                       f"p95 {tx['latency_p95_ms']} ms, {tx['rolled_back']} rolled back")
+
+
+def dashboard_queries(user_id: int) -> Dict[str, PageQuery]:
+    return {
+        "badges": PageQuery("counters.for_user", (user_id,), user_id=user_id),
+        "counters": PageQuery("counters.all", cached=True),
+        "network_size": PageQuery("connections.accepted_count", (user_id, user_id), user_id=user_id),
+        "user_projects": PageQuery("projects.for_user", (user_id,)),
+        "activities": PageQuery("activities.recent"),
+        "trending_projects": PageQuery("projects.trending", cached=True),
+        "kic_transactions": PageQuery("kic.recent_transactions", (user_id, 5), user_id=user_id)
+    }
 
 
 def show_ultimate_dashboard(db: Database):
@@ -2180,17 +5060,16 @@ def show_ultimate_dashboard(db: Database):
     </div>
     ''', unsafe_allow_html=True)
 
-    # Get notifications count
-    cursor = db.conn.cursor()
-    cursor.execute("SELECT COUNT(*) FROM notifications WHERE user_id = ? AND is_read = FALSE", (user['id'],))
-    unread_notifications = cursor.fetchone()[0]
+    # Every independent read of the dashboard, loaded concurrently
+    data = db.load_page(dashboard_queries(user['id']))
+    unread_notifications = badge_values(data["badges"])["unread_notifications"]
+    kpis = kpi_values(data["counters"])
 
     # Metrics row
     col1, col2, col3, col4, col5, col6 = st.columns(6)
 
     with col1:
-        cursor.execute("SELECT COUNT(*) FROM users WHERE user_type = 'talent'")
-        talent_count = cursor.fetchone()[0]
+        talent_count = kpis["talents"]
         st.markdown(f'''
         <div class="metric-card">
             <div class="metric-value">{talent_count}+</div>
@@ -2199,8 +5078,7 @@ def show_ultimate_dashboard(db: Database):
         ''', unsafe_allow_html=True)
 
     with col2:
-        cursor.execute("SELECT COUNT(*) FROM companies")
-        company_count = cursor.fetchone()[0]
+        company_count = kpis["companies"]
         st.markdown(f'''
         <div class="metric-card">
             <div class="metric-value">{company_count}+</div>
@@ -2209,8 +5087,7 @@ def show_ultimate_dashboard(db: Database):
         ''', unsafe_allow_html=True)
 
     with col3:
-        cursor.execute("SELECT COUNT(*) FROM projects WHERE status = 'Active'")
-        active_projects = cursor.fetchone()[0]
+        active_projects = kpis["active_projects"]
         st.markdown(f'''
         <div class="metric-card">
             <div class="metric-value">{active_projects}</div>
@@ -2219,8 +5096,7 @@ def show_ultimate_dashboard(db: Database):
         ''', unsafe_allow_html=True)
 
     with col4:
-        cursor.execute("SELECT COUNT(*) FROM labs")
-        lab_count = cursor.fetchone()[0]
+        lab_count = kpis["labs"]
         st.markdown(f'''
         <div class="metric-card">
             <div class="metric-value">{lab_count}+</div>
@@ -2229,8 +5105,7 @@ def show_ultimate_dashboard(db: Database):
         ''', unsafe_allow_html=True)
 
     with col5:
-        cursor.execute("SELECT COUNT(*) FROM universities")
-        uni_count = cursor.fetchone()[0]
+        uni_count = kpis["universities"]
         st.markdown(f'''
         <div class="metric-card">
             <div class="metric-value">{uni_count}</div>
@@ -2239,13 +5114,7 @@ def show_ultimate_dashboard(db: Database):
         ''', unsafe_allow_html=True)
 
     with col6:
-        cursor.execute("""
-                       SELECT COUNT(*)
-                       FROM connections
-                       WHERE (requester_id = ? OR addressee_id = ?)
-                         AND status = 'accepted'
-                       """, (user['id'], user['id']))
-        network_size = cursor.fetchone()[0]
+        network_size = data["network_size"][0][0]
         st.markdown(f'''
         <div class="metric-card">
             <div class="metric-value">{network_size}</div>
@@ -2266,11 +5135,13 @@ def show_ultimate_dashboard(db: Database):
                 <h4>🔔 You have {unread_notifications} new notifications</h4>
             </div>
             ''', unsafe_allow_html=True)
+            if st.button("✓ Mark all as read", key="notifications_read"):
+                SocialManager.mark_notifications_read(user['id'], db)
+                st.rerun()
 
         # My Active Projects
         st.markdown("### 📋 My Active Projects")
-        user_projects = ProjectManager.get_user_projects(user['id'], db)
-        active_projects = [p for p in user_projects if p['participation_status'] == 'active']
+        active_projects = [p for p in data["user_projects"] if p['participation_status'] == 'active']
 
         if active_projects:
             for project in active_projects[:3]:
@@ -2304,13 +5175,7 @@ def show_ultimate_dashboard(db: Database):
 
         # Activity Feed
         st.markdown("### 📈 Network Activity")
-        cursor.execute("""
-                       SELECT a.*, u.name, u.user_type
-                       FROM activities a
-                                JOIN users u ON a.user_id = u.id
-                       ORDER BY a.created_at DESC LIMIT 10
-                       """)
-        activities = cursor.fetchall()
+        activities = data["activities"]
 
         for activity in activities:
             icon_map = {
@@ -2342,13 +5207,7 @@ def show_ultimate_dashboard(db: Database):
 
         # Trending Projects
         st.markdown("### 🔥 Trending Projects")
-        cursor.execute("""
-                       SELECT *
-                       FROM projects
-                       WHERE status = 'Active'
-                       ORDER BY views DESC, applications DESC LIMIT 3
-                       """)
-        trending_projects = cursor.fetchall()
+        trending_projects = data["trending_projects"]
 
         for project in trending_projects:
             urgency_class = f"urgency-{project['urgency'].lower()}"
@@ -2404,7 +5263,7 @@ def show_ultimate_dashboard(db: Database):
         # KIC Balance and Recent Transactions
         st.markdown("### 💰 KIC Wallet")
 
-        kic_transactions = KICManager.get_kic_transactions(user['id'], db, 5)
+        kic_transactions = data["kic_transactions"]
 
         st.markdown(f'''
         <div class="modern-card">
@@ -2463,6 +5322,33 @@ def show_ultimate_dashboard(db: Database):
                 ''', unsafe_allow_html=True)
 
 
+def item_filters(db: Database, items: str) -> Dict[str, Optional[str]]:
+    """One multiselect per kind of an ITEM_INDEXES table, each option with how many entities have it.
+
+    Returns the selections as query parameters; entities must have every selected item.
+    """
+    table, _, kinds = ITEM_INDEXES[items]
+    selected = {}
+    for col, (kind, column) in zip(st.columns(len(kinds)), kinds.items()):
+        with col:
+            counts = {row['item']: row['total'] for row in db.fetch_options(f"{table}.items", (kind,))}
+            selected[column] = bind_list(st.multiselect(column.capitalize(), list(counts),
+                                                        format_func=lambda item, counts=counts:
+                                                        f"{item} ({counts[item]})",
+                                                        help=f"Only {table} with every selected {kind}"))
+    return selected
+
+
+def facet_caption(listing: str, facet: str, counts: Optional[Dict[str, Dict[str, int]]]) -> str:
+    """A facet's counts for the caption under its filter: buckets in order, other values most matches first"""
+    if counts is None:
+        return "Counts skipped: over the time budget"
+    values = counts[facet]
+    _, _, bounds = FACETS[listing][facet]
+    order = bucket_labels(bounds) if bounds else sorted(values, key=values.get, reverse=True)
+    return " · ".join(f"{value}: {values.get(value, 0)}" for value in order) or "No matches"
+
+
 def show_talents_page(db: Database):
     st.markdown('<h1 class="gradient-text">👥 Talent Network</h1>', unsafe_allow_html=True)
     st.markdown("Connect with UAE's top innovators, researchers, and industry experts")
@@ -2487,123 +5373,47 @@ def show_talents_page(db: Database):
         col1, col2, col3, col4 = st.columns(4)
 
         with col1:
-            cursor = db.conn.cursor()
-            cursor.execute("SELECT DISTINCT location FROM talents")
-            locations = [row[0] for row in cursor.fetchall()]
+            locations = [row[0] for row in db.fetch_options("talents.locations")]
             selected_locations = st.multiselect("Locations", locations)
+            facet_captions = {"location": st.empty()}
 
         with col2:
             availability_options = ["Full-time", "Part-time", "Contract", "Remote"]
             selected_availability = st.multiselect("Availability", availability_options)
+            facet_captions["availability"] = st.empty()
 
         with col3:
             rate_range = st.slider("KIC Hourly rate", 0, 500, (0, 500))
+            facet_captions["rate"] = st.empty()
 
         with col4:
             min_projects = st.slider("Min. projects completed", 0, 50, 0)
+            facet_captions["projects"] = st.empty()
 
-    # Fetch talents
-    query = """
-            SELECT t.*, \
-                   u.name, \
-                   u.email, \
-                   u.location as user_location, \
-                   u.is_verified,
-                   u.reputation_score, \
-                   u.total_projects_completed, \
-                   u.phone
-            FROM talents t
-                     JOIN users u ON t.user_id = u.id
-            WHERE 1 = 1 \
-            """
-    params = []
-
-    if search_query:
-        query += " AND (u.name LIKE ? OR t.title LIKE ? OR t.skills LIKE ? OR t.bio LIKE ?)"
-        search_param = f"%{search_query}%"
-        params.extend([search_param] * 4)
-
-    if selected_locations:
-        query += f" AND t.location IN ({','.join(['?'] * len(selected_locations))})"
-        params.extend(selected_locations)
-
-    if selected_availability:
-        query += f" AND t.availability IN ({','.join(['?'] * len(selected_availability))})"
-        params.extend(selected_availability)
-
-    query += " AND t.kic_hourly_rate BETWEEN ? AND ?"
-    params.extend([rate_range[0], rate_range[1]])
-
-    query += " AND u.total_projects_completed >= ?"
-    params.append(min_projects)
-
-    # Sorting
-    if sort_option == "Reputation Score":
-        query += " ORDER BY u.reputation_score DESC"
-    elif sort_option == "Project Count":
-        query += " ORDER BY u.total_projects_completed DESC"
-    elif sort_option == "Rating":
-        query += " ORDER BY t.rating DESC"
-    else:
-        query += " ORDER BY u.is_verified DESC, u.reputation_score DESC"
+        selected_items = item_filters(db, "talent_items")
 
-    cursor.execute(query, params)
-    talents = cursor.fetchall()
+    # Fetch talents
+    match = fts_query(search_query)
+    filters = {
+        "match": match,
+        **selected_items,
+        "locations": bind_list(selected_locations),
+        "availability": bind_list(selected_availability),
+        "min_rate": rate_range[0],
+        "max_rate": rate_range[1],
+        "min_projects": min_projects
+    }
+    talents = db.fetch_all(f"talents.{'match' if match else 'search'}:{sort_option}", filters)
+    counts = db.facets("talents", filters)
+    for facet, caption in facet_captions.items():
+        caption.caption(facet_caption("talents", facet, counts))
 
     st.markdown(f"### Found {len(talents)} talented professionals")
 
     # Display talents
     if view_mode == "Professional":
         for talent in talents:
-            st.markdown(f'''
-            <div class="modern-card">
-                <div style="display: flex; gap: 1.5rem;">
-                    <div style="flex-shrink: 0;">
-                        <div style="width: 80px; height: 80px; background: linear-gradient(135deg, #0077b5, #00a0dc); 
-                                    border-radius: 50%; display: flex; align-items: center; justify-content: center;
-                                    color: white; font-size: 1.8rem; font-weight: bold;">
-                            {talent['name'][0].upper()}
-                        </div>
-                    </div>
-                    <div style="flex: 1;">
-                        <div style="display: flex; align-items: center; gap: 1rem; margin-bottom: 0.5rem;">
-                            <h3 style="margin: 0;">{talent['name']}</h3>
-                            {f'<span class="status-badge status-verified">✓ Verified</span>' if talent['is_verified'] else ''}
-                            <span class="status-badge status-online">🟢 Active</span>
-                        </div>
-                        <div style="color: #0077b5; font-weight: 600; margin-bottom: 0.5rem;">
-                            {talent['title']}
-                        </div>
-                        <div style="color: #64748b; margin-bottom: 1rem;">
-                            📍 {talent['location']} • 💼 {talent['experience']} • 
-                            🎓 {talent['education']} • 
-                            📊 {talent['reputation_score']} reputation • 
-                            ✅ {talent['total_projects_completed']} projects completed
-                        </div>
-                        <div style="color: #475569; margin-bottom: 1rem;">
-                            {talent['bio'][:200]}{'...' if len(talent['bio']) > 200 else ''}
-                        </div>
-                        <div style="margin-bottom: 1rem;">
-                            {' '.join([f'<span class="skill-tag">{skill.strip()}</span>'
-                                       for skill in talent['skills'].split(',')[:6]])}
-                        </div>
-                        <div style="display: flex; justify-content: space-between; align-items: center;">
-                            <div>
-                                <span style="color: #16a34a; font-weight: bold; font-size: 1.1rem;">
-                                    💰 {talent['kic_hourly_rate']} KIC/hr
-                                </span>
-                                <span style="color: #64748b; margin-left: 1rem;">
-                                    AED {talent['hourly_rate']}/hr
-                                </span>
-                            </div>
-                            <div style="display: flex; gap: 0.5rem;">
-                                <span class="status-badge status-featured">{talent['availability']}</span>
-                            </div>
-                        </div>
-                    </div>
-                </div>
-            </div>
-            ''', unsafe_allow_html=True)
+            st.markdown(card_fragment(db, "talent", talent, view_mode, render_talent_card), unsafe_allow_html=True)
 
             # Action buttons
             col1, col2, col3, col4 = st.columns(4)
@@ -2629,16 +5439,17 @@ def show_talents_page(db: Database):
     else:  # Compact view
         for talent in talents:
             col1, col2, col3, col4, col5 = st.columns([3, 2, 1, 1, 1])
+            name_cell, place_cell, projects_cell, rate_cell = card_fragment(db, "talent", talent, view_mode,
+                                                                            render_talent_row)
 
             with col1:
-                verified_badge = "✓" if talent['is_verified'] else ""
-                st.markdown(f"**{talent['name']} {verified_badge}**  \n{talent['title']}")
+                st.markdown(name_cell)
             with col2:
-                st.markdown(f"{talent['location']} • {talent['availability']}")
+                st.markdown(place_cell)
             with col3:
-                st.markdown(f"**{talent['total_projects_completed']}** projects")
+                st.markdown(projects_cell)
             with col4:
-                st.markdown(f"**{talent['kic_hourly_rate']} KIC**/hr")
+                st.markdown(rate_cell)
             with col5:
                 if st.button("→", key=f"compact_{talent['id']}"):
                     st.session_state.selected_talent_id = talent['id']
@@ -2650,9 +5461,7 @@ def show_companies_page(db: Database):
     st.markdown('<h1 class="gradient-text">🏢 Partner Companies</h1>', unsafe_allow_html=True)
     st.markdown("Discover innovative companies driving UAE's future")
 
-    cursor = db.conn.cursor()
-    cursor.execute("SELECT * FROM companies ORDER BY rating DESC, total_projects_posted DESC")
-    companies = cursor.fetchall()
+    companies = db.fetch_cached("companies.all")
 
     # Company metrics
     col1, col2, col3, col4 = st.columns(4)
@@ -2765,13 +5574,12 @@ def show_projects_page(db: Database):
     st.markdown("Discover cutting-edge projects and collaboration opportunities")
 
     # Project metrics
+    kpis = db.counters()
     col1, col2, col3, col4 = st.columns(4)
 
-    cursor = db.conn.cursor()
 
     with col1:
-        cursor.execute("SELECT COUNT(*) FROM projects WHERE status = 'Active'")
-        active_count = cursor.fetchone()[0]
+        active_count = kpis["active_projects"]
         st.markdown(f'''
         <div class="metric-card">
             <div class="metric-value">{active_count}</div>
@@ -2780,8 +5588,7 @@ def show_projects_page(db: Database):
         ''', unsafe_allow_html=True)
 
     with col2:
-        cursor.execute("SELECT SUM(kic_budget_max) FROM projects WHERE status = 'Active'")
-        total_kic = cursor.fetchone()[0] or 0
+        total_kic = kpis["active_kic_budget"]
         st.markdown(f'''
         <div class="metric-card">
             <div class="metric-value">{total_kic:,}</div>
@@ -2790,8 +5597,7 @@ def show_projects_page(db: Database):
         ''', unsafe_allow_html=True)
 
     with col3:
-        cursor.execute("SELECT COUNT(DISTINCT organization) FROM projects")
-        org_count = cursor.fetchone()[0]
+        org_count = kpis["project_organizations"]
         st.markdown(f'''
         <div class="metric-card">
             <div class="metric-value">{org_count}</div>
@@ -2800,8 +5606,7 @@ def show_projects_page(db: Database):
         ''', unsafe_allow_html=True)
 
     with col4:
-        cursor.execute("SELECT AVG(applications) FROM projects WHERE status = 'Active'")
-        avg_applications = cursor.fetchone()[0] or 0
+        avg_applications = kpis["active_avg_applications"]
         st.markdown(f'''
         <div class="metric-card">
             <div class="metric-value">{avg_applications:.1f}</div>
@@ -2819,97 +5624,32 @@ def show_projects_page(db: Database):
         col1, col2, col3 = st.columns([2, 1, 1])
         with col1:
             search_query = st.text_input("🔍 Search projects...",
-                                         placeholder="Search by title, organization, or tags")
+                                         placeholder="Search by title, organization, tags, or description")
         with col2:
             urgency_filter = st.selectbox("Urgency", ["All", "High", "Medium", "Low"])
         with col3:
             remote_filter = st.checkbox("Remote possible", value=False)
+        selected_items = item_filters(db, "project_items")
 
         # Fetch projects
-        query = """
-                SELECT p.*, \
-                       c.name                                 as company_name, \
-                       c.industry, \
-                       c.is_verified                          as company_verified,
-                       julianday(deadline) - julianday('now') as days_left
-                FROM projects p
-                         LEFT JOIN companies c ON p.company_id = c.id
-                WHERE p.status = 'Active' \
-                """
-        params = []
-
-        if search_query:
-            query += " AND (p.title LIKE ? OR p.organization LIKE ? OR p.tags LIKE ?)"
-            search_param = f"%{search_query}%"
-            params.extend([search_param] * 3)
-
-        if urgency_filter != "All":
-            query += " AND p.urgency = ?"
-            params.append(urgency_filter)
-
-        if remote_filter:
-            query += " AND p.remote_possible = TRUE"
-
-        query += " ORDER BY p.views DESC, p.posted DESC"
-
-        cursor.execute(query, params)
-        projects = cursor.fetchall()
+        match = fts_query(search_query)
+        projects = db.fetch_all("projects.match" if match else "projects.search", {
+            "match": match,
+            **selected_items,
+            "urgency": None if urgency_filter == "All" else urgency_filter,
+            "remote_only": remote_filter
+        })
 
         if projects:
             for project in projects:
-                days_left = int(project['days_left']) if project['days_left'] else 0
-                urgency_class = f"urgency-{project['urgency'].lower()}"
-
-                st.markdown(f'''
-                <div class="project-card" style="--urgency-color: {'#dc2626' if project['urgency'] == 'High' else '#d97706' if project['urgency'] == 'Medium' else '#16a34a'};">
-                    <div style="display: flex; justify-content: space-between; margin-bottom: 1rem;">
-                        <div>
-                            <h3 style="margin-bottom: 0.5rem;">{project['title']}</h3>
-                            <div style="display: flex; align-items: center; gap: 1rem;">
-                                <span style="color: #0077b5; font-weight: 600;">{project['organization']}</span>
-                                {f'<span class="status-badge status-verified">✓ Verified</span>' if project.get('company_verified') else ''}
-                                <span class="status-badge status-featured">{project.get('industry', 'Technology')}</span>
-                            </div>
-                        </div>
-                        <div style="text-align: right;">
-                            <div style="color: #16a34a; font-weight: bold; font-size: 1.3rem;">
-                                💰 {project['kic_budget_min']:,} - {project['kic_budget_max']:,} KIC
-                            </div>
-                            <div style="color: #64748b;">
-                                AED {project['budget_min']:,} - {project['budget_max']:,}
-                            </div>
-                        </div>
-                    </div>
-
-                    <div style="margin-bottom: 1rem;">
-                        <span>📍 {project['location']}</span> • 
-                        <span class="{urgency_class}">⚡ {project['urgency']} Priority</span> • 
-                        <span>⏰ {days_left} days left</span> • 
-                        <span>👁️ {project['views']} views</span> • 
-                        <span>📝 {project['applications']} applications</span>
-                        {f" • 🌐 Remote OK" if project['remote_possible'] else ""}
-                    </div>
-
-                    <div style="color: #475569; margin-bottom: 1.5rem; line-height: 1.6;">
-                        {project['description']}
-                    </div>
-
-                    <div style="margin-bottom: 1rem;">
-                        <strong style="color: #1e293b;">Requirements:</strong>
-                        <div style="color: #64748b; margin-top: 0.5rem;">{project['requirements']}</div>
-                    </div>
-
-                    <div style="margin-bottom: 1rem;">
-                        {' '.join([f'<span class="skill-tag">{tag.strip()}</span>' for tag in project['tags'].split(',')])}
-                    </div>
-                </div>
-                ''', unsafe_allow_html=True)
+                st.markdown(card_fragment(db, "project", project, "Card", render_project_card,
+                                          version=project_version(project)), unsafe_allow_html=True)
 
                 col1, col2, col3, col4 = st.columns(4)
                 with col1:
                     if st.button("📋 View Details", key=f"view_proj_{project['id']}"):
-                        cursor.execute("UPDATE projects SET views = views + 1 WHERE id = ?", (project['id'],))
-                        db.conn.commit()
+                        with db.unit_of_work() as cursor:
+                            db.execute(cursor, "projects.increment_views", (project['id'],))
                         st.session_state.selected_project_id = project['id']
                         st.session_state.current_page = "Project Details"
                         st.rerun()
@@ -2931,19 +5671,7 @@ def show_projects_page(db: Database):
             st.info("No projects found matching your criteria.")
 
     with tab2:  # Urgent Projects
-        cursor.execute("""
-                       SELECT p.*,
-                              c.name                                 as company_name,
-                              c.industry,
-                              julianday(deadline) - julianday('now') as days_left
-                       FROM projects p
-                                LEFT JOIN companies c ON p.company_id = c.id
-                       WHERE p.urgency = 'High'
-                         AND p.status = 'Active'
-                       ORDER BY p.deadline ASC
-                       """)
-
-        urgent_projects = cursor.fetchall()
+        urgent_projects = db.fetch_all("projects.urgent")
 
         if urgent_projects:
             st.markdown("### ⚡ High Priority Projects - Act Fast!")
@@ -2977,16 +5705,7 @@ def show_projects_page(db: Database):
             st.info("No urgent projects at the moment.")
 
     with tab3:  # High Value Projects
-        cursor.execute("""
-                       SELECT p.*, c.name as company_name, c.industry
-                       FROM projects p
-                                LEFT JOIN companies c ON p.company_id = c.id
-                       WHERE p.kic_budget_max >= 5000
-                         AND p.status = 'Active'
-                       ORDER BY p.kic_budget_max DESC
-                       """)
-
-        high_value_projects = cursor.fetchall()
+        high_value_projects = db.fetch_cached("projects.high_value")
 
         st.markdown("### 💎 Premium Projects - High Value Opportunities")
 
@@ -3090,13 +5809,12 @@ def show_labs_page(db: Database):
     st.markdown("Access cutting-edge research facilities across the UAE")
 
     # Lab metrics
+    kpis = db.counters()
     col1, col2, col3, col4 = st.columns(4)
 
-    cursor = db.conn.cursor()
 
     with col1:
-        cursor.execute("SELECT COUNT(*) FROM labs")
-        total_labs = cursor.fetchone()[0]
+        total_labs = kpis["labs"]
         st.markdown(f'''
         <div class="metric-card">
             <div class="metric-value">{total_labs}</div>
@@ -3105,8 +5823,7 @@ def show_labs_page(db: Database):
         ''', unsafe_allow_html=True)
 
     with col2:
-        cursor.execute("SELECT AVG(rating) FROM labs")
-        avg_rating = cursor.fetchone()[0] or 0
+        avg_rating = kpis["lab_avg_rating"]
         st.markdown(f'''
         <div class="metric-card">
             <div class="metric-value">{avg_rating:.1f}⭐</div>
@@ -3115,8 +5832,7 @@ def show_labs_page(db: Database):
         ''', unsafe_allow_html=True)
 
     with col3:
-        cursor.execute("SELECT COUNT(DISTINCT specialty) FROM labs")
-        specialties = cursor.fetchone()[0]
+        specialties = kpis["lab_specialties"]
         st.markdown(f'''
         <div class="metric-card">
             <div class="metric-value">{specialties}</div>
@@ -3125,8 +5841,7 @@ def show_labs_page(db: Database):
         ''', unsafe_allow_html=True)
 
     with col4:
-        cursor.execute("SELECT SUM(total_bookings) FROM labs")
-        total_bookings = cursor.fetchone()[0] or 0
+        total_bookings = kpis["lab_bookings"]
         st.markdown(f'''
         <div class="metric-card">
             <div class="metric-value">{total_bookings}</div>
@@ -3141,10 +5856,10 @@ def show_labs_page(db: Database):
 
     with col1:
         search_query = st.text_input("🔍 Search labs...",
-                                     placeholder="Search by name, equipment, or specialty")
+                                     placeholder="Search by name, instrument, specialty, or amenity")
 
     with col2:
-        sort_by = st.selectbox("Sort by", ["Rating", "Price", "KIC Price", "Availability"])
+        sort_by = st.selectbox("Sort by", list(LAB_SORTS))
 
     with col3:
         payment_method = st.radio("Payment", ["Both", "AED", "KIC"], horizontal=True)
@@ -3154,134 +5869,54 @@ def show_labs_page(db: Database):
         col1, col2, col3, col4 = st.columns(4)
 
         with col1:
-            cursor.execute("SELECT DISTINCT specialty FROM labs")
-            specialties = [row[0] for row in cursor.fetchall()]
+            specialties = [row[0] for row in db.fetch_options("labs.specialties")]
             selected_specialties = st.multiselect("Specialties", specialties)
+            facet_captions = {"specialty": st.empty()}
 
         with col2:
-            cursor.execute("SELECT DISTINCT location FROM labs")
-            locations = [row[0] for row in cursor.fetchall()]
+            locations = [row[0] for row in db.fetch_options("labs.locations")]
             selected_locations = st.multiselect("Locations", locations)
+            facet_captions["location"] = st.empty()
 
         with col3:
             if payment_method in ["Both", "AED"]:
                 aed_range = st.slider("AED Price per day", 0, 3000, (0, 3000))
+                facet_captions["price"] = st.empty()
             else:
                 aed_range = (0, 10000)
 
         with col4:
             if payment_method in ["Both", "KIC"]:
                 kic_range = st.slider("KIC Price per day", 0, 1500, (0, 1500))
+                facet_captions["kic_price"] = st.empty()
             else:
                 kic_range = (0, 5000)
 
-    # Build query
-    query = """
-            SELECT l.*, u.name as university_name
-            FROM labs l
-                     JOIN universities u ON l.university_id = u.id
-            WHERE 1 = 1 \
-            """
-    params = []
-
-    if search_query:
-        query += " AND (l.name LIKE ? OR l.description LIKE ? OR l.equipment LIKE ? OR l.specialty LIKE ?)"
-        search_param = f"%{search_query}%"
-        params.extend([search_param] * 4)
-
-    if selected_specialties:
-        query += f" AND l.specialty IN ({','.join(['?'] * len(selected_specialties))})"
-        params.extend(selected_specialties)
-
-    if selected_locations:
-        query += f" AND l.location IN ({','.join(['?'] * len(selected_locations))})"
-        params.extend(selected_locations)
-
-    query += " AND l.price_per_day BETWEEN ? AND ?"
-    params.extend([aed_range[0], aed_range[1]])
-
-    query += " AND l.kic_price_per_day BETWEEN ? AND ?"
-    params.extend([kic_range[0], kic_range[1]])
-
-    # Sorting
-    if sort_by == "Rating":
-        query += " ORDER BY l.rating DESC"
-    elif sort_by == "Price":
-        query += " ORDER BY l.price_per_day ASC"
-    elif sort_by == "KIC Price":
-        query += " ORDER BY l.kic_price_per_day ASC"
-    else:
-        query += " ORDER BY l.available_from ASC"
-
-    cursor.execute(query, params)
-    labs = cursor.fetchall()
+        # Instrument-level filters
+        selected_items = item_filters(db, "lab_items")
+
+    # Fetch labs
+    match = fts_query(search_query)
+    filters = {
+        "match": match,
+        **selected_items,
+        "specialties": bind_list(selected_specialties),
+        "locations": bind_list(selected_locations),
+        "min_price": aed_range[0],
+        "max_price": aed_range[1],
+        "min_kic_price": kic_range[0],
+        "max_kic_price": kic_range[1]
+    }
+    labs = db.fetch_all(f"labs.{'match' if match else 'search'}:{sort_by}", filters)
+    counts = db.facets("labs", filters)
+    for facet, caption in facet_captions.items():
+        caption.caption(facet_caption("labs", facet, counts))
 
     st.markdown(f"### Found {len(labs)} laboratories")
 
     # Display labs
     for lab in labs:
-        st.markdown(f'''
-        <div class="lab-card">
-            <div style="display: flex; gap: 1.5rem;">
-                <div style="flex-shrink: 0;">
-                    <div style="width: 100px; height: 100px; background: linear-gradient(135deg, #0077b5, #00a0dc); 
-                                border-radius: 12px; display: flex; align-items: center; justify-content: center;
-                                color: white; font-size: 2rem;">
-                        🔬
-                    </div>
-                </div>
-                <div style="flex: 1;">
-                    <div style="display: flex; justify-content: between; align-items: start; margin-bottom: 0.5rem;">
-                        <div style="flex: 1;">
-                            <h3 style="margin-bottom: 0.5rem;">{lab['name']}</h3>
-                            <div style="color: #0077b5; font-weight: 600; margin-bottom: 0.5rem;">
-                                {lab['university_name']}
-                            </div>
-                            <div style="color: #64748b; margin-bottom: 1rem;">
-                                📍 {lab['location']} • 
-                                🧪 {lab['specialty']} • 
-                                👥 Capacity: {lab['capacity']} • 
-                                ⭐ {lab['rating']:.1f} rating • 
-                                📅 {lab['total_bookings']} bookings
-                            </div>
-                            <div style="color: #475569; margin-bottom: 1rem; line-height: 1.6;">
-                                {lab['description']}
-                            </div>
-                            <div style="margin-bottom: 1rem;">
-                                <strong>Equipment:</strong>
-                                <div style="margin-top: 0.5rem;">
-                                    {' '.join([f'<span class="skill-tag">{eq.strip()}</span>'
-                                               for eq in lab['equipment'].split(',')[:4]])}
-                                </div>
-                            </div>
-                            <div style="margin-bottom: 1rem;">
-                                <strong>Amenities:</strong>
-                                <div style="margin-top: 0.5rem;">
-                                    {' '.join([f'<span class="skill-tag">{amenity.strip()}</span>'
-                                               for amenity in lab['amenities'].split(',')[:3]])}
-                                </div>
-                            </div>
-                        </div>
-                        <div style="text-align: right; margin-left: 2rem;">
-                            <div style="background: #f8fafc; padding: 1.5rem; border-radius: 12px; border: 1px solid #e2e8f0;">
-                                <div style="margin-bottom: 1rem;">
-                                    <div style="color: #16a34a; font-weight: bold; font-size: 1.3rem;">
-                                        💰 {lab['kic_price_per_day']} KIC/day
-                                    </div>
-                                    <div style="color: #64748b; font-size: 0.9rem;">
-                                        or AED {lab['price_per_day']}/day
-                                    </div>
-                                </div>
-                                <div style="color: #64748b; font-size: 0.9rem; margin-bottom: 1rem;">
-                                    Available from: {lab['available_from']}
-                                </div>
-                            </div>
-                        </div>
-                    </div>
-                </div>
-            </div>
-        </div>
-        ''', unsafe_allow_html=True)
+        st.markdown(card_fragment(db, "lab", lab, "Card", render_lab_card), unsafe_allow_html=True)
 
         col1, col2, col3, col4 = st.columns(4)
         with col1:
@@ -3342,12 +5977,11 @@ def show_lab_access_page(db: Database):
         st.markdown("### 🚪 Lab Access Verification")
 
         with st.form("verify_access"):
-            cursor = db.conn.cursor()
-            cursor.execute("SELECT id, name FROM labs ORDER BY name")
-            labs = cursor.fetchall()
+            labs = db.fetch_options("labs.names")
 
             if labs:
-                selected_lab = st.selectbox("Select Lab", labs, format_func=lambda x: x[1])
+                selected_lab = st.selectbox("Select Lab", [(lab['id'], lab['name']) for lab in labs],
+                                            format_func=lambda x: x[1])
                 username = st.text_input("Username")
                 password = st.text_input("Password", type="password")
 
@@ -3374,17 +6008,11 @@ def show_lab_access_page(db: Database):
         st.markdown("### 📋 Request Lab Access")
 
         with st.form("request_access"):
-            cursor = db.conn.cursor()
-            cursor.execute("""
-                           SELECT l.id, l.name, u.name as university_name
-                           FROM labs l
-                                    JOIN universities u ON l.university_id = u.id
-                           ORDER BY u.name, l.name
-                           """)
-            labs = cursor.fetchall()
+            labs = db.fetch_options("labs.with_university")
 
             if labs:
-                selected_lab = st.selectbox("Select Lab", labs,
+                selected_lab = st.selectbox("Select Lab",
+                                            [(lab['id'], lab['name'], lab['university_name']) for lab in labs],
                                             format_func=lambda x: f"{x[1]} ({x[2]})")
                 access_level = st.selectbox("Access Level", ["basic", "advanced", "premium"])
 
@@ -3430,9 +6058,7 @@ def show_universities_page(db: Database):
     st.markdown('<h1 class="gradient-text">🎓 Universities</h1>', unsafe_allow_html=True)
     st.markdown("Leading academic institutions in the UAE innovation ecosystem")
 
-    cursor = db.conn.cursor()
-    cursor.execute("SELECT * FROM universities ORDER BY ranking_national")
-    universities = cursor.fetchall()
+    universities = db.fetch_cached("universities.all")
 
     # Metrics
     col1, col2, col3, col4 = st.columns(4)
@@ -3464,8 +6090,7 @@ def show_universities_page(db: Database):
         ''', unsafe_allow_html=True)
 
     with col4:
-        cursor.execute("SELECT COUNT(*) FROM labs")
-        total_labs = cursor.fetchone()[0]
+        total_labs = db.counters()["labs"]
         st.markdown(f'''
         <div class="metric-card">
             <div class="metric-value">{total_labs}</div>
@@ -3476,8 +6101,7 @@ def show_universities_page(db: Database):
     st.markdown("---")
 
     for uni in universities:
-        cursor.execute("SELECT COUNT(*) FROM labs WHERE university_id = ?", (uni['id'],))
-        lab_count = cursor.fetchone()[0]
+        lab_count = db.fetch_value("labs.count_for_university", (uni['id'],))
 
         st.markdown(f'''
         <div class="modern-card">
@@ -3529,6 +6153,52 @@ def show_universities_page(db: Database):
                 st.info(f"Contact: {uni['contact_email']} or {uni['contact_phone']}")
 
 
+def show_analytics_freshness(db: Database):
+    """Caption saying how old the analytics data on this tab is"""
+    if db.analytics.is_fresh():
+        st.caption(f"📸 Analytics snapshot taken {db.analytics.age():.0f}s ago "
+                   f"(refreshed every {db.analytics.interval:.0f}s)")
+    else:
+        st.caption("🔴 Live data: the analytics snapshot is being refreshed")
+
+
+def kic_activity_figure(monthly_data) -> Dict:
+    """Spec of the KIC Hub monthly earned/spent chart (a demo projection when there is no activity)"""
+    if monthly_data:
+        months = [data['month'] for data in monthly_data][::-1]
+        earned = [data['earned'] for data in monthly_data][::-1]
+        spent = [data['spent'] for data in monthly_data][::-1]
+
+        fig = go.Figure()
+        fig.add_trace(go.Bar(name='Earned', x=months, y=earned, marker_color='#16a34a'))
+        fig.add_trace(go.Bar(name='Spent', x=months, y=spent, marker_color='#dc2626'))
+
+        fig.update_layout(
+            title="Monthly KIC Activity",
+            xaxis_title="Month",
+            yaxis_title="KIC Amount",
+            barmode='group',
+            height=400,
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)'
+        )
+    else:
+        # Mock data for demo
+        dates = pd.date_range(start='2024-01-01', periods=30, freq='D')
+        earnings = [50 + i * 5 + (i % 7) * 20 for i in range(30)]
+
+        fig = px.line(x=dates, y=earnings,
+                      title="Daily KIC Earnings Projection",
+                      labels={'x': 'Date', 'y': 'KIC Earned'})
+        fig.update_traces(line_color='#f59e0b', line_width=3)
+        fig.update_layout(
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)',
+            height=400
+        )
+    return fig.to_dict()
+
+
 def show_kic_hub_page(db: Database):
     user = st.session_state.user
 
@@ -3550,9 +6220,7 @@ def show_kic_hub_page(db: Database):
         ''', unsafe_allow_html=True)
 
     with col2:
-        cursor = db.conn.cursor()
-        cursor.execute("SELECT SUM(amount) FROM kic_transactions WHERE user_id = ? AND amount > 0", (user['id'],))
-        total_earned = cursor.fetchone()[0] or 0
+        total_earned = db.fetch_for_user("kic.total_earned", user['id'], (user['id'],))[0][0] or 0
 
         st.markdown(f'''
         <div class="modern-card" style="text-align: center; padding: 2rem;">
@@ -3564,8 +6232,7 @@ def show_kic_hub_page(db: Database):
         ''', unsafe_allow_html=True)
 
     with col3:
-        cursor.execute("SELECT SUM(amount) FROM kic_transactions WHERE user_id = ? AND amount < 0", (user['id'],))
-        total_spent = abs(cursor.fetchone()[0] or 0)
+        total_spent = abs(db.fetch_for_user("kic.total_spent", user['id'], (user['id'],))[0][0] or 0)
 
         st.markdown(f'''
         <div class="modern-card" style="text-align: center; padding: 2rem;">
@@ -3614,56 +6281,10 @@ def show_kic_hub_page(db: Database):
 
     with tab2:
         st.markdown("### KIC Analytics")
+        show_analytics_freshness(db)
 
-        # Transaction summary
-        cursor.execute("""
-                       SELECT strftime('%Y-%m', created_at) as month,
-                SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END) as earned,
-                SUM(CASE WHEN amount < 0 THEN ABS(amount) ELSE 0 END) as spent
-                       FROM kic_transactions
-                       WHERE user_id = ?
-                       GROUP BY month
-                       ORDER BY month DESC
-                           LIMIT 6
-                       """, (user['id'],))
-
-        monthly_data = cursor.fetchall()
-
-        if monthly_data:
-            months = [data['month'] for data in monthly_data][::-1]
-            earned = [data['earned'] for data in monthly_data][::-1]
-            spent = [data['spent'] for data in monthly_data][::-1]
-
-            fig = go.Figure()
-            fig.add_trace(go.Bar(name='Earned', x=months, y=earned, marker_color='#16a34a'))
-            fig.add_trace(go.Bar(name='Spent', x=months, y=spent, marker_color='#dc2626'))
-
-            fig.update_layout(
-                title="Monthly KIC Activity",
-                xaxis_title="Month",
-                yaxis_title="KIC Amount",
-                barmode='group',
-                height=400,
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)'
-            )
-
-            st.plotly_chart(fig, use_container_width=True)
-        else:
-            # Mock data for demo
-            dates = pd.date_range(start='2024-01-01', periods=30, freq='D')
-            earnings = [50 + i * 5 + (i % 7) * 20 for i in range(30)]
-
-            fig = px.line(x=dates, y=earnings,
-                          title="Daily KIC Earnings Projection",
-                          labels={'x': 'Date', 'y': 'KIC Earned'})
-            fig.update_traces(line_color='#f59e0b', line_width=3)
-            fig.update_layout(
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                height=400
-            )
-            st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(db.figure("kic.monthly", user['id'], "kic.monthly_flow", kic_activity_figure),
+                        use_container_width=True)
 
     with tab3:
         st.markdown("### Transfer KIC")
@@ -3673,9 +6294,8 @@ def show_kic_hub_page(db: Database):
         with col1:
             st.markdown("#### Send KIC")
             with st.form("send_kic"):
-                cursor = db.conn.cursor()
-                cursor.execute("SELECT id, name FROM users WHERE id != ?", (user['id'],))
-                other_users = cursor.fetchall()
+                # One shared directory for every session; each drops itself from the list
+                other_users = [u for u in db.fetch_options("users.directory") if u['id'] != user['id']]
 
                 recipient = st.selectbox("Send to",
                                          [(u['id'], u['name']) for u in other_users],
@@ -3688,7 +6308,6 @@ def show_kic_hub_page(db: Database):
                     success = KICManager.transfer_kic(user['id'], recipient[0], amount, description, db)
                     if success:
                         st.success(f"Successfully sent {amount} KIC to {recipient[1]}!")
-                        st.session_state.user['kic_balance'] -= amount
                         st.rerun()
                     else:
                         st.error("Insufficient KIC balance!")
@@ -3820,14 +6439,7 @@ def show_messages_page(db: Database):
 
         # Start new conversation
         st.markdown("### Start New Conversation")
-        cursor = db.conn.cursor()
-        cursor.execute("""
-                       SELECT u.id, u.name, u.user_type
-                       FROM users u
-                       WHERE u.id != ?
-                       ORDER BY u.name
-                       """, (user['id'],))
-        all_users = cursor.fetchall()
+        all_users = [u for u in db.fetch_options("users.directory") if u['id'] != user['id']]
 
         selected_user = st.selectbox("Select user",
                                      [(u['id'], f"{u['name']} ({u['user_type']})") for u in all_users],
@@ -3842,9 +6454,7 @@ def show_messages_page(db: Database):
             other_user_id = st.session_state.active_conversation
 
             # Get other user info
-            cursor = db.conn.cursor()
-            cursor.execute("SELECT name, user_type FROM users WHERE id = ?", (other_user_id,))
-            other_user = cursor.fetchone()
+            other_user = db.fetch_one("users.name_and_type", (other_user_id,))
 
             st.markdown(f"### 💬 Chat with {other_user['name']}")
 
@@ -3866,6 +6476,10 @@ def show_messages_page(db: Database):
             # Display messages in the container
             with message_container:
                 messages = SocialManager.get_messages(user['id'], other_user_id, db)
+                # Only write while the badge says something is unread, not on every rerun
+                if db.badges(user['id'])["unread_messages"] and any(
+                        message['receiver_id'] == user['id'] and not message['is_read'] for message in messages):
+                    SocialManager.mark_conversation_read(user['id'], other_user_id, db)
 
                 st.markdown('<div class="chat-container">', unsafe_allow_html=True)
 
@@ -3891,6 +6505,42 @@ def show_messages_page(db: Database):
             ''', unsafe_allow_html=True)
 
 
+def project_figures(analytics_projects) -> Optional[tuple]:
+    """Specs of the My Projects timeline and earnings-by-project charts (earnings None if nothing paid)"""
+    if not analytics_projects:
+        return None
+
+    # Project timeline
+    project_data = []
+    for project in analytics_projects:
+        project_data.append({
+            'Project': project['title'][:30] + '...' if len(project['title']) > 30 else project['title'],
+            'Start': project['joined_date'],
+            'End': project['completion_date'] or datetime.now().strftime('%Y-%m-%d'),
+            'Status': project['participation_status'].title(),
+            'Payment': project['payment_received'] or 0
+        })
+
+    df = pd.DataFrame(project_data)
+
+    # Projects over time
+    fig = px.timeline(df, x_start="Start", x_end="End", y="Project", color="Status",
+                      title="Project Timeline",
+                      color_discrete_map={'Active': '#0077b5', 'Completed': '#16a34a'})
+    fig.update_layout(height=400, plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)')
+
+    # Earnings by project
+    completed_df = df[df['Payment'] > 0]
+    earnings = None
+    if not completed_df.empty:
+        fig2 = px.bar(completed_df, x="Project", y="Payment",
+                      title="Earnings by Project (KIC)",
+                      color_discrete_sequence=['#16a34a'])
+        fig2.update_layout(height=400, plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)')
+        earnings = fig2.to_dict()
+    return fig.to_dict(), earnings
+
+
 def show_my_projects_page(db: Database):
     user = st.session_state.user
     st.markdown('<h1 class="gradient-text">📊 My Projects</h1>', unsafe_allow_html=True)
@@ -3989,36 +6639,16 @@ def show_my_projects_page(db: Database):
 
     with tab3:
         st.markdown("### 📊 Project Analytics")
-
-        if user_projects:
-            # Project timeline
-            project_data = []
-            for project in user_projects:
-                project_data.append({
-                    'Project': project['title'][:30] + '...' if len(project['title']) > 30 else project['title'],
-                    'Start': project['joined_date'],
-                    'End': project['completion_date'] or datetime.now().strftime('%Y-%m-%d'),
-                    'Status': project['participation_status'].title(),
-                    'Payment': project['payment_received'] or 0
-                })
-
-            df = pd.DataFrame(project_data)
-
-            # Projects over time
-            fig = px.timeline(df, x_start="Start", x_end="End", y="Project", color="Status",
-                              title="Project Timeline",
-                              color_discrete_map={'Active': '#0077b5', 'Completed': '#16a34a'})
-            fig.update_layout(height=400, plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)')
-            st.plotly_chart(fig, use_container_width=True)
-
-            # Earnings by project
-            completed_df = df[df['Payment'] > 0]
-            if not completed_df.empty:
-                fig2 = px.bar(completed_df, x="Project", y="Payment",
-                              title="Earnings by Project (KIC)",
-                              color_discrete_sequence=['#16a34a'])
-                fig2.update_layout(height=400, plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)')
-                st.plotly_chart(fig2, use_container_width=True)
+        show_analytics_freshness(db)
+        # Active projects run until today, so the specs are rebuilt daily as well
+        figures = db.figure("projects.timeline", user['id'], "projects.for_user", project_figures,
+                            version=(datetime.now().strftime('%Y-%m-%d'),))
+
+        if figures:
+            timeline, earnings = figures
+            st.plotly_chart(timeline, use_container_width=True)
+            if earnings:
+                st.plotly_chart(earnings, use_container_width=True)
         else:
             st.info("Complete some projects to see analytics!")
 
@@ -4067,14 +6697,8 @@ def show_profile_page(db: Database):
             ''', unsafe_allow_html=True)
 
             # Quick stats
-            cursor = db.conn.cursor()
-            cursor.execute("""
-                           SELECT COUNT(*)
-                           FROM connections
-                           WHERE (requester_id = ? OR addressee_id = ?)
-                             AND status = 'accepted'
-                           """, (user['id'], user['id']))
-            network_size = cursor.fetchone()[0]
+            network_size = db.fetch_for_user("connections.accepted_count", user['id'],
+                                             (user['id'], user['id']))[0][0]
 
             st.markdown(f'''
             <div class="modern-card">
@@ -4105,13 +6729,13 @@ def show_profile_page(db: Database):
                 with col_a:
                     name = st.text_input("Full Name", value=user['name'])
                     organization = st.text_input("Organization", value=user['organization'])
+                    location_options = ["Abu Dhabi", "Dubai", "Sharjah", "Ajman",
+                                         "Ras Al Khaimah", "Fujairah", "Umm Al Quwain"]
                     location = st.selectbox("Location",
-                                            ["Abu Dhabi", "Dubai", "Sharjah", "Ajman",
-                                             "Ras Al Khaimah", "Fujairah", "Umm Al Quwain"],
-                                            index=0 if not user.get('location') else
-                                            ["Abu Dhabi", "Dubai", "Sharjah", "Ajman",
-                                             "Ras Al Khaimah", "Fujairah", "Umm Al Quwain"].index(
-                                                user.get('location', 'Abu Dhabi')))
+                                            location_options,
+                                            index=location_options.index(user['location'])
+                                            if user.get('location') in location_options
+                                            else 0)
 
                 with col_b:
                     phone = st.text_input("Phone Number", value=user.get('phone', ''), placeholder="+971 50 123 4567")
@@ -4127,19 +6751,19 @@ def show_profile_page(db: Database):
                     st.markdown("#### Talent-Specific Information")
 
                     # Get talent info if exists
-                    cursor.execute("SELECT * FROM talents WHERE user_id = ?", (user['id'],))
-                    talent_info = cursor.fetchone()
+                    talent_info = db.fetch_one("talents.by_user", (user['id'],))
 
                     col_c, col_d = st.columns(2)
                     with col_c:
                         title = st.text_input("Professional Title",
                                               value=talent_info['title'] if talent_info else "",
                                               placeholder="e.g., Senior Data Scientist")
+                        experience_options = ["0-1 years", "2-3 years", "4-5 years", "6-10 years", "10+ years"]
                         experience = st.selectbox("Years of Experience",
-                                                  ["0-1 years", "2-3 years", "4-5 years", "6-10 years", "10+ years"],
-                                                  index=0 if not talent_info else
-                                                  ["0-1 years", "2-3 years", "4-5 years", "6-10 years",
-                                                   "10+ years"].index(talent_info['experience']))
+                                                  experience_options,
+                                                  index=experience_options.index(talent_info['experience'])
+                                                  if talent_info and talent_info['experience'] in experience_options
+                                                  else 0)
 
                     with col_d:
                         availability = st.selectbox("Availability",
@@ -4159,46 +6783,18 @@ def show_profile_page(db: Database):
                                                    placeholder="AWS Certified, PMP, etc.")
 
                 if st.form_submit_button("Save Profile Changes", use_container_width=True):
-                    cursor = db.conn.cursor()
-                    cursor.execute("""
-                                   UPDATE users
-                                   SET name         = ?,
-                                       organization = ?,
-                                       bio          = ?,
-                                       location     = ?,
-                                       phone        = ?,
-                                       linkedin_url = ?,
-                                       website_url  = ?
-                                   WHERE id = ?
-                                   """,
+                    with db.unit_of_work() as cursor:
+                        db.execute(cursor, "users.update_profile",
                                    (name, organization, bio, location, phone, linkedin_url, website_url, user['id']))
 
-                    if user['user_type'] == 'talent' and talent_info:
-                        cursor.execute("""
-                                       UPDATE talents
-                                       SET title           = ?,
-                                           experience      = ?,
-                                           availability    = ?,
-                                           hourly_rate     = ?,
-                                           kic_hourly_rate = ?,
-                                           skills          = ?,
-                                           certifications  = ?
-                                       WHERE user_id = ?
-                                       """, (title, experience, availability, hourly_rate, hourly_rate // 20,
-                                             skills, certifications, user['id']))
-
-                    db.conn.commit()
+                        if user['user_type'] == 'talent' and talent_info:
+                            db.execute(cursor, "talents.update_profile",
+                                       (title, experience, availability, hourly_rate, hourly_rate // 20,
+                                        skills, certifications, user['id']))
+
+                        db.write_through_profile(cursor, user['id'])
 
                     st.success("✅ Profile updated successfully!")
-                    st.session_state.user.update({
-                        'name': name,
-                        'organization': organization,
-                        'bio': bio,
-                        'location': location,
-                        'phone': phone,
-                        'linkedin_url': linkedin_url,
-                        'website_url': website_url
-                    })
                     st.rerun()
 
     with tab2:
@@ -4207,16 +6803,10 @@ def show_profile_page(db: Database):
         # Network statistics
         col1, col2, col3 = st.columns(3)
 
-        cursor = db.conn.cursor()
 
         with col1:
-            cursor.execute("""
-                           SELECT COUNT(*)
-                           FROM connections
-                           WHERE (requester_id = ? OR addressee_id = ?)
-                             AND status = 'accepted'
-                           """, (user['id'], user['id']))
-            connections_count = cursor.fetchone()[0]
+            connections_count = db.fetch_for_user("connections.accepted_count", user['id'],
+                                                  (user['id'], user['id']))[0][0]
 
             st.markdown(f'''
             <div class="metric-card">
@@ -4226,13 +6816,7 @@ def show_profile_page(db: Database):
             ''', unsafe_allow_html=True)
 
         with col2:
-            cursor.execute("""
-                           SELECT COUNT(*)
-                           FROM connections
-                           WHERE addressee_id = ?
-                             AND status = 'pending'
-                           """, (user['id'],))
-            pending_requests = cursor.fetchone()[0]
+            pending_requests = db.badges(user['id'])["pending_connections"]
 
             st.markdown(f'''
             <div class="metric-card">
@@ -4252,18 +6836,8 @@ def show_profile_page(db: Database):
             ''', unsafe_allow_html=True)
 
         # Show connections
-        cursor.execute("""
-                       SELECT u.id, u.name, u.user_type, u.organization, u.is_verified
-                       FROM connections c
-                                JOIN users u
-                                     ON (CASE WHEN c.requester_id = ? THEN c.addressee_id ELSE c.requester_id END =
-                                         u.id)
-                       WHERE (c.requester_id = ? OR c.addressee_id = ?)
-                         AND c.status = 'accepted'
-                       ORDER BY c.accepted_at DESC
-                       """, (user['id'], user['id'], user['id']))
-
-        connections = cursor.fetchall()
+        connections = db.fetch_for_user("connections.accepted_users", user['id'],
+                                        (user['id'], user['id'], user['id']))
 
         if connections:
             st.markdown("#### Your Professional Network")
@@ -4293,15 +6867,7 @@ def show_profile_page(db: Database):
         if pending_requests > 0:
             st.markdown("#### Pending Connection Requests")
 
-            cursor.execute("""
-                           SELECT c.id, u.name, u.user_type, u.organization, c.message
-                           FROM connections c
-                                    JOIN users u ON c.requester_id = u.id
-                           WHERE c.addressee_id = ?
-                             AND c.status = 'pending'
-                           """, (user['id'],))
-
-            requests = cursor.fetchall()
+            requests = db.fetch_for_user("connections.pending_requests", user['id'], (user['id'],))
 
             for request in requests:
                 st.markdown(f'''
@@ -4334,8 +6900,8 @@ def show_profile_page(db: Database):
                         st.rerun()
                 with col2:
                     if st.button("Decline", key=f"decline_{request['id']}"):
-                        cursor.execute("UPDATE connections SET status = 'declined' WHERE id = ?", (request['id'],))
-                        db.conn.commit()
+                        with db.unit_of_work() as cursor:
+                            db.execute(cursor, "connections.decline", (request['id'],))
                         st.info("Connection declined.")
                         st.rerun()
 
@@ -4345,8 +6911,7 @@ def show_profile_page(db: Database):
         # Activity metrics
         col1, col2, col3 = st.columns(3)
 
-        cursor.execute("SELECT COUNT(*) FROM activities WHERE user_id = ?", (user['id'],))
-        total_activities = cursor.fetchone()[0]
+        total_activities = db.fetch_value("activities.count_for_user", (user['id'],))
 
         with col1:
             st.markdown(f'''
@@ -4373,14 +6938,7 @@ def show_profile_page(db: Database):
             ''', unsafe_allow_html=True)
 
         # Recent activity
-        cursor.execute("""
-                       SELECT *
-                       FROM activities
-                       WHERE user_id = ?
-                       ORDER BY created_at DESC LIMIT 10
-                       """, (user['id'],))
-
-        activities = cursor.fetchall()
+        activities = db.fetch_all("activities.recent_for_user", (user['id'],))
 
         if activities:
             st.markdown("#### Recent Activity")
@@ -4512,21 +7070,14 @@ def show_profile_page(db: Database):
                         st.error("Password must be at least 8 characters")
                     else:
                         # Verify current password
-                        cursor = db.conn.cursor()
-                        cursor.execute("""
-                                       SELECT id
-                                       FROM users
-                                       WHERE id = ?
-                                         AND password_hash = ?
-                                       """, (user['id'], AuthManager.hash_password(current_password)))
-
-                        if cursor.fetchone():
-                            cursor.execute("""
-                                           UPDATE users
-                                           SET password_hash = ?
-                                           WHERE id = ?
-                                           """, (AuthManager.hash_password(new_password), user['id']))
-                            db.conn.commit()
+                        current = db.fetch_one("users.verify_password",
+                                               (user['id'], AuthManager.hash_password(current_password)))
+
+                        if current:
+                            with db.unit_of_work() as cursor:
+                                db.execute(cursor, "users.update_password",
+                                           (AuthManager.hash_password(new_password), user['id']))
+                                db.write_through_profile(cursor, user['id'])
                             st.success("✅ Password updated successfully!")
                         else:
                             st.error("Current password is incorrect")
@@ -4579,28 +7130,38 @@ def main():
 
     # Initialize database with error handling
     try:
-        db = Database()
-        db.seed_comprehensive_data()
+        db = get_database()
     except sqlite3.OperationalError as e:
         st.error(f"""
-        **Database Schema Error**: {e}
+        **Database Migration Error**: {e}
 
-        This usually happens when you have an old database file with a different schema.
-
-        **Solutions:**
-        1. Delete the file `innovate_hub_ultimate.db` from your project folder and restart the app
-        2. Or use the "Reset Database" button on the login page
+        Completed migration steps are recorded in the `schema_version` table and are not re-run;
+        the failed step is retried on the next start. No data has been dropped.
         """)
         st.stop()
     except Exception as e:
         st.error(f"Unexpected error initializing database: {e}")
         st.stop()
 
+    try:
+        show_app(db)
+    finally:
+        # Script threads outlive a rerun; an idle session must not keep its read connection checked out
+        db.release_reader()
+
+
+def show_app(db: Database):
+    # Writes other worker processes committed since this session's last rerun
+    db.sync()
+
     # Check authentication
     if 'user' not in st.session_state:
         show_ultimate_login_page(db)
         return
 
+    # Current profile for the header and every page, shared with the user's other sessions
+    st.session_state.user = db.profile(st.session_state.user['id']) or st.session_state.user
+
     # Navigation header
     st.markdown(f'''
     <div class="nav-container">
@@ -4640,21 +7201,12 @@ def main():
 
     # Create navigation buttons
     cols = st.columns(len(pages))
+    badges = db.badges(st.session_state.user['id'])
 
     for idx, (page, (icon, label)) in enumerate(pages.items()):
         with cols[idx]:
             # Check for notifications
-            has_notification = False
-            if page == "Messages":
-                cursor = db.conn.cursor()
-                cursor.execute("""
-                               SELECT COUNT(*)
-                               FROM messages
-                               WHERE receiver_id = ?
-                                 AND is_read = FALSE
-                               """, (st.session_state.user['id'],))
-                unread_messages = cursor.fetchone()[0]
-                has_notification = unread_messages > 0
+            has_notification = page == "Messages" and badges["unread_messages"] > 0
 
             button_type = "primary" if st.session_state.current_page == page else "secondary"
 
@@ -0,0 +1,544 @@
+"""Performance benchmarks for the KIC Innovation Hub data layer.
+
+Run with `python benchmarks.py <benchmark> [options]`; `python benchmarks.py -h` lists them.
+Every benchmark works on a throwaway database in a temporary directory, never on
+innovate_hub_ultimate.db.
+"""
+import argparse
+import gzip
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+
+import app
+
+
+@contextmanager
+def scratch_database(**kwargs):
+    """Seeded Database in a temporary directory, removed afterwards"""
+    workdir = tempfile.mkdtemp(prefix="kic-bench-")
+    db = app.Database(os.path.join(workdir, "bench.db"), **kwargs)
+    try:
+        db.seed_comprehensive_data()
+        yield db
+    finally:
+        db.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def print_table(headers, rows):
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    print("  ".join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in rows:
+        print("  ".join(str(c).ljust(w) for c, w in zip(row, widths)))
+
+
+# ==================== STORAGE PROFILES ====================
+def add_history(db: app.Database, messages: int, transactions: int):
+    """Bulk-load messages and KIC transactions so reads touch more than a handful of pages"""
+    user_ids = [row[0] for row in db.fetch_all("SELECT id FROM users")]
+    with db.writer() as cursor:
+        cursor.executemany("INSERT INTO messages (sender_id, receiver_id, message, is_read) VALUES (?, ?, ?, ?)",
+                           [(random.choice(user_ids), random.choice(user_ids), f"message {i}", i % 3 == 0)
+                            for i in range(messages)])
+        cursor.executemany("""
+                           INSERT INTO kic_transactions (user_id, transaction_type, amount, description)
+                           VALUES (?, ?, ?, ?)
+                           """, [(random.choice(user_ids), "bonus", random.randint(-500, 500), f"txn {i}")
+                                 for i in range(transactions)])
+    return user_ids
+
+
+def run_mixed_workload(db: app.Database, user_ids, readers: int, writers: int, duration: float):
+    """Readers poll badge counts and wallets while writers send messages and transfer KIC"""
+    stop = threading.Event()
+    read_latency, write_latency = [], []
+    errors = []
+    lock = threading.Lock()
+
+    def reader():
+        local = []
+        while not stop.is_set():
+            user_id = random.choice(user_ids)
+            start = time.perf_counter()
+            try:
+                db.badges(user_id)
+                app.KICManager.get_kic_transactions(user_id, db, 10)
+            except sqlite3.Error as e:
+                errors.append(str(e))
+                continue
+            local.append(time.perf_counter() - start)
+        with lock:
+            read_latency.extend(local)
+
+    def writer():
+        local = []
+        while not stop.is_set():
+            sender, receiver = random.sample(user_ids, 2)
+            start = time.perf_counter()
+            try:
+                if random.random() < 0.5:
+                    app.SocialManager.send_message(sender, receiver, "benchmark", db)
+                else:
+                    app.KICManager.transfer_kic(sender, receiver, 1, "benchmark", db)
+            except sqlite3.Error as e:
+                errors.append(str(e))
+                continue
+            local.append(time.perf_counter() - start)
+        with lock:
+            write_latency.extend(local)
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return read_latency, write_latency, errors
+
+
+def bench_storage(args):
+    profiles = args.profiles or list(app.STORAGE_PROFILES)
+    rows = []
+    for profile in profiles:
+        with scratch_database(storage_profile=profile, pool_size=args.readers + 2) as db:
+            user_ids = add_history(db, args.messages, args.transactions)
+            reads, writes, errors = run_mixed_workload(db, user_ids, args.readers, args.writers, args.duration)
+            wal_path = db.db_path + "-wal"
+            wal_kb = os.path.getsize(wal_path) // 1024 if os.path.exists(wal_path) else 0
+            rows.append((
+                profile,
+                f"{len(reads) / args.duration:,.0f}",
+                f"{statistics.median(reads) * 1000:.2f}" if reads else "-",
+                f"{percentile(reads, 95) * 1000:.2f}",
+                f"{len(writes) / args.duration:,.0f}",
+                f"{statistics.median(writes) * 1000:.2f}" if writes else "-",
+                f"{percentile(writes, 95) * 1000:.2f}",
+                len(errors),
+                wal_kb
+            ))
+    print(f"Mixed workload: {args.readers} readers, {args.writers} writers, {args.duration:.0f}s per profile")
+    print_table(["profile", "reads/s", "read p50 ms", "read p95 ms", "writes/s", "write p50 ms",
+                 "write p95 ms", "errors", "wal KB"], rows)
+
+
+# ==================== GROUP COMMIT ====================
+def bench_commits(args):
+    rows = []
+    for label, max_batch in (("per-unit commit", 1), ("group commit", args.max_batch)):
+        with scratch_database(storage_profile=args.profile, group_commit_max_batch=max_batch) as db:
+            user_ids = [row[0] for row in db.fetch_all("SELECT id FROM users")]
+            _, writes, errors = run_mixed_workload(db, user_ids, 0, args.writers, args.duration)
+            stats = db.transaction_stats()
+            rows.append((
+                label,
+                f"{len(writes) / args.duration:,.0f}",
+                f"{stats['commits'] / args.duration:,.0f}",
+                stats["units_per_commit"],
+                stats["max_batch"],
+                f"{statistics.median(writes) * 1000:.2f}" if writes else "-",
+                f"{percentile(writes, 95) * 1000:.2f}",
+                len(errors)
+            ))
+    print(f"{args.writers} writer sessions, profile {args.profile}, {args.duration:.0f}s per mode")
+    print_table(["mode", "units/s", "commits/s", "units/commit", "max batch", "p50 ms", "p95 ms", "errors"], rows)
+
+
+# ==================== PAGE LOADING ====================
+def add_directory(db: app.Database, users: int, projects: int):
+    """Bulk-load users and projects so the dashboard counts walk realistically sized indexes"""
+    user_types = ["talent", "company", "university", "government"]
+    with db.writer() as cursor:
+        cursor.executemany("INSERT INTO users (email, password_hash, name, user_type) VALUES (?, ?, ?, ?)",
+                           [(f"bench{i}@example.com", "x", f"Bench User {i}", random.choice(user_types))
+                            for i in range(users)])
+        cursor.executemany("""
+                           INSERT INTO projects (title, organization, location, status, urgency, views, kic_budget_max)
+                           VALUES (?, ?, 'Dubai', ?, ?, ?, ?)
+                           """, [(f"Bench project {i}", f"Org {i % 500}", random.choice(["Active", "Closed"]),
+                                  random.choice(["High", "Medium", "Low"]), random.randint(0, 1000),
+                                  random.randint(100, 10000)) for i in range(projects)])
+
+
+def bench_pageload(args):
+    with scratch_database(loader_workers=args.workers, pool_size=args.workers + 2) as db:
+        add_directory(db, args.users, args.projects)
+        user_ids = add_history(db, args.messages, args.transactions)
+        queries = app.dashboard_queries(user_ids[0])
+        sequential, concurrent = [], []
+        for _ in range(args.rounds):
+            start = time.perf_counter()
+            for page_query in queries.values():
+                db._load_one(page_query)
+            sequential.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            db.load_page(queries)
+            concurrent.append(time.perf_counter() - start)
+    rows = [(label, f"{statistics.median(samples) * 1000:.2f}", f"{percentile(samples, 95) * 1000:.2f}")
+            for label, samples in (("sequential", sequential), ("load_page", concurrent))]
+    print(f"Dashboard bundle: {len(queries)} queries, {args.workers} loader threads, {args.rounds} rounds")
+    print_table(["mode", "p50 ms", "p95 ms"], rows)
+
+
+# ==================== CARD FRAGMENTS ====================
+def add_catalog(db: app.Database, rows: int):
+    """Clone the seeded talents, projects and labs until each listing has `rows` entries"""
+    with db.writer() as cursor:
+        cursor.execute("""
+                       WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < ?)
+                       INSERT INTO users (email, password_hash, name, user_type, location, reputation_score)
+                       SELECT 'card' || n || '@example.com', 'x', 'Card Talent ' || n, 'talent', 'Dubai', n % 100
+                       FROM seq
+                       """, (rows,))
+        cursor.execute("""
+                       INSERT INTO talents (user_id, title, location, experience, education, skills, availability,
+                                            bio, hourly_rate, kic_hourly_rate, rating, specializations, languages)
+                       SELECT u.id, t.title, t.location, t.experience, t.education, t.skills, t.availability,
+                              t.bio, t.hourly_rate, t.kic_hourly_rate, t.rating, t.specializations, t.languages
+                       FROM users u
+                                JOIN talents t ON t.id = (SELECT MIN(id) FROM talents) + u.id % 3
+                       WHERE u.email LIKE 'card%'
+                       """)
+        for table, columns, label in (
+                ("projects", "organization, company_id, location, deadline, posted, description, requirements, tags, "
+                             "budget_min, budget_max, kic_budget_min, kic_budget_max, status, views, applications, "
+                             "urgency, remote_possible", "title"),
+                ("labs", "university_id, location, specialty, available_from, equipment, description, "
+                         "price_per_day, kic_price_per_day, rating, capacity, amenities, total_bookings", "name")):
+            cursor.execute(f"""
+                           WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < ?)
+                           INSERT INTO {table} ({label}, {columns})
+                           SELECT t.{label} || ' #' || n, {columns}
+                           FROM seq
+                                    JOIN {table} t ON t.id = 1 + n % (SELECT COUNT(*) FROM {table})
+                           """, (rows - db.fetch_value(f"SELECT COUNT(*) FROM {table}"),))
+
+
+def time_cards(rows, card):
+    start = time.perf_counter()
+    for row in rows:
+        card(row)
+    return (time.perf_counter() - start) / len(rows) * 1e6
+
+
+def bench_cards(args):
+    listings = [
+        ("talents", "talent", "talents", "rating", app.render_talent_card, None, "talents.search:Rating", {
+            "locations": None, "availability": None, "min_rate": 0, "max_rate": 1000000, "min_projects": 0,
+            "skills": None, "specializations": None, "languages": None}),
+        ("projects", "project", "projects", "views", app.render_project_card, app.project_version, "projects.search", {
+            "urgency": None, "remote_only": False, "tags": None}),
+        ("labs", "lab", "labs", "rating", app.render_lab_card, None, "labs.search:Rating", {
+            "specialties": None, "locations": None, "min_price": 0, "max_price": 1000000,
+            "min_kic_price": 0, "max_kic_price": 1000000, "equipment": None, "amenities": None})
+    ]
+    table = []
+    with scratch_database() as db:
+        add_catalog(db, args.rows)
+        cache = db.fragments
+        for label, kind, base_table, column, render, version, query, params in listings:
+            cache.clear()
+
+            def cached(row):
+                return app.card_fragment(db, kind, row, "Card", render, version(row) if version else None)
+
+            rows = db.fetch_all(query, params)
+            uncached_us = time_cards(rows, render)
+            cold_us = time_cards(rows, cached)
+            warm_us = time_cards(rows, cached)
+
+            # Edit one row in a hundred, then rerun the listing: only the edited cards miss
+            with db.writer() as cursor:
+                cursor.execute(f"UPDATE {base_table} SET {column} = {column} + 1 WHERE id % 100 = 0")
+            rows = db.fetch_all(query, params)
+            misses = cache.stats()["misses"]
+            edited_us = time_cards(rows, cached)
+            table.append((label, len(rows), f"{uncached_us:.1f}", f"{cold_us:.1f}", f"{warm_us:.2f}",
+                          f"{edited_us:.2f}", cache.stats()["misses"] - misses,
+                          f"{cache.stats()['bytes'] / 1048576:.1f}"))
+    print(f"Per-card cost in microseconds, {args.rows:,} rows per listing")
+    print_table(["listing", "cards", "render", "cache cold", "cache warm", "after 1% edits", "re-rendered",
+                 "cache MB"], table)
+
+
+# ==================== TALENT SEARCH ====================
+# The search clause show_talents_page used before the FTS5 index: a %text% LIKE over four columns
+LIKE_TALENT_SEARCH = app.TALENT_SEARCH + """      AND (u.name LIKE :search OR t.title LIKE :search
+           OR t.skills LIKE :search OR t.bio LIKE :search)
+    ORDER BY u.is_verified DESC, u.reputation_score DESC
+"""
+TALENT_SEARCH_TERMS = ["data scien", "robotics engineer", "talent 4242", "no such talent"]
+
+
+def time_query(db: app.Database, query: str, params, repeat: int):
+    """Median seconds of `repeat` runs, and the row count"""
+    samples, rows = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = db.fetch_all(query, params)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), len(rows)
+
+
+def bench_talent_search(args):
+    filters = {"locations": None, "availability": None, "min_rate": 0, "max_rate": 1000000, "min_projects": 0,
+               "skills": None, "specializations": None, "languages": None}
+    table = []
+    with scratch_database() as db:
+        add_catalog(db, args.rows)
+        start = time.perf_counter()
+        indexed = db.rebuild_search_index("talent_search")
+        rebuild = time.perf_counter() - start
+        for term in TALENT_SEARCH_TERMS:
+            like, like_rows = time_query(db, LIKE_TALENT_SEARCH, {**filters, "search": app.like_pattern(term)},
+                                         args.repeat)
+            match, match_rows = time_query(db, "talents.match:Best Match", {**filters, "match": app.fts_query(term)},
+                                           args.repeat)
+            table.append((repr(term), like_rows, f"{like * 1000:.2f}", match_rows, f"{match * 1000:.2f}",
+                          f"{like / match:.1f}x"))
+    print(f"Talent search p50 over {args.repeat} runs, {indexed:,} talents "
+          f"(index rebuilt in {rebuild * 1000:.0f} ms)")
+    print_table(["search", "LIKE rows", "LIKE ms", "FTS5 rows", "FTS5 + bm25 ms", "speedup"], table)
+
+
+# ==================== FACET COUNTS ====================
+FACET_LISTINGS = [
+    ("talents", app.TALENT_SEARCH_SOURCE, {
+        "match": None, "locations": None, "availability": None, "min_rate": 0, "max_rate": 500, "min_projects": 0,
+        "skills": None, "specializations": None, "languages": None}, {"locations": '["Dubai"]', "min_projects": 5}),
+    ("labs", app.LAB_SEARCH_SOURCE, {
+        "match": None, "specialties": None, "locations": None, "min_price": 0, "max_price": 3000,
+        "min_kic_price": 0, "max_kic_price": 1500, "equipment": None, "amenities": None},
+     {"locations": '["Abu Dhabi"]', "max_price": 1500})
+]
+
+
+def facet_by_facet(listing: str, source: str) -> List[str]:
+    """The obvious alternative to Database.facets: one GROUP BY per facet with the other facets' filters"""
+    queries = []
+    for facet, (column, _, _) in app.FACETS[listing].items():
+        others = "".join(f"\n      AND {condition}" for other, (_, condition, _) in app.FACETS[listing].items()
+                         if other != facet)
+        queries.append(f"SELECT {column}, COUNT(*){source}{others}\n    GROUP BY 1")
+    return queries
+
+
+def bench_facets(args):
+    table = []
+    with scratch_database() as db:
+        add_catalog(db, args.rows)
+        for listing, source, params, selection in FACET_LISTINGS:
+            per_facet = facet_by_facet(listing, source)
+            for label, filters in (("no filters", params), ("filtered", {**params, **selection})):
+                separate = statistics.median(sum(time_query(db, query, filters, 1)[0] for query in per_facet)
+                                             for _ in range(args.repeat))
+                cold = []
+                for _ in range(args.repeat):
+                    db.query_cache.clear()
+                    start = time.perf_counter()
+                    counts = db.facets(listing, filters)
+                    cold.append(time.perf_counter() - start)
+                cached = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    db.facets(listing, filters)
+                    cached.append(time.perf_counter() - start)
+                table.append((listing, label, f"{separate * 1000:.1f}", f"{statistics.median(cold) * 1000:.1f}",
+                              f"{statistics.median(cached) * 1000:.3f}", "yes" if counts is not None else "no"))
+    print(f"Facet counts p50 over {args.repeat} runs, {args.rows:,} rows per listing, "
+          f"budget {app.FACET_BUDGET_MS:.0f} ms")
+    print_table(["listing", "filters", "query per facet ms", "single pass ms", "cached ms", "within budget"], table)
+
+
+# ==================== SHARED CACHE ====================
+CATALOG_QUERIES = ["projects.trending", "projects.high_value", "companies.all", "universities.all", "counters.all"]
+
+
+def cold_worker(db_path: str, shared_cache_bytes: int, results):
+    """One freshly started worker process loading the shared catalog reads"""
+    db = app.Database(db_path, shared_cache_bytes=shared_cache_bytes)
+    try:
+        start = time.perf_counter()
+        for query in CATALOG_QUERIES:
+            db.fetch_cached(query)
+        elapsed = time.perf_counter() - start
+        stats = db.query_stats()
+        results.put((elapsed, sum(stats.get(query, {}).get("calls", 0) for query in CATALOG_QUERIES)))
+    finally:
+        db.close()
+
+
+def bench_workers(args):
+    table = []
+    with scratch_database(shared_cache_bytes=0) as db:
+        add_directory(db, args.users, args.projects)
+        for label, shared_cache_bytes in (("per-process caches", 0), ("shared cache tier", 256 * 1024 * 1024)):
+            for suffix in ("-cache", "-cache-wal", "-cache-shm"):
+                if os.path.exists(db.db_path + suffix):
+                    os.remove(db.db_path + suffix)
+            results = multiprocessing.Queue()
+            cold, queries = [], 0
+            # Workers start one after another, like a rolling restart behind the load balancer
+            for _ in range(args.workers):
+                worker = multiprocessing.Process(target=cold_worker, args=(db.db_path, shared_cache_bytes, results))
+                worker.start()
+                elapsed, calls = results.get()
+                worker.join()
+                cold.append(elapsed)
+                queries += calls
+            table.append((label, f"{cold[0] * 1000:.1f}", f"{statistics.median(cold[1:] or cold) * 1000:.1f}",
+                          queries))
+    print(f"{args.workers} workers loading {len(CATALOG_QUERIES)} catalog reads from a cold start, "
+          f"{args.users:,} users / {args.projects:,} projects")
+    print_table(["mode", "first worker ms", "later workers p50 ms", "SQLite executions"], table)
+
+
+# ==================== WARMUP ====================
+def first_visit(db: app.Database) -> Dict[str, float]:
+    """Milliseconds the first visitors spend on the page-facing reads warmup_steps covers, by kind of step"""
+    spent = {}
+    for label, step in app.warmup_steps(db):
+        kind = label.split()[0]
+        if kind != "index":
+            start = time.perf_counter()
+            step()
+            spent[kind] = spent.get(kind, 0.0) + (time.perf_counter() - start) * 1000
+    return spent
+
+
+def bench_warmup(args):
+    table = []
+    with scratch_database(shared_cache_bytes=0) as seeded:
+        add_catalog(seeded, args.rows)
+        for label, warm in (("no warmup", False), ("CacheWarmer", True)):
+            # A freshly started process: empty in-process caches on a database that already exists
+            db = app.Database(seeded.db_path, shared_cache_bytes=0)
+            try:
+                warmup_ms, skipped = 0.0, 0
+                if warm:
+                    warmer = app.CacheWarmer(app.warmup_steps(db), budget=args.budget).start()
+                    warmer.done.wait()
+                    warmup_ms, skipped = warmer.stats()["elapsed_ms"], warmer.stats()["skipped"]
+                visit = first_visit(db)
+                table.append((label, f"{warmup_ms:.0f}", skipped, f"{visit['KPI'] + visit['options']:.2f}",
+                              f"{visit['catalog']:.2f}", f"{visit['listing']:.0f}"))
+            finally:
+                db.close()
+    print(f"First visit after a restart in ms, {args.rows:,} rows per listing, {args.budget:g}s warmup budget")
+    print_table(["mode", "warmup (background)", "steps skipped", "KPIs + filter options", "catalog",
+                 "listings + cards"], table)
+
+
+# ==================== STYLESHEET ====================
+def markdown_delta_bytes(body: str) -> int:
+    """Wire size of the ForwardMsg an st.markdown(body, unsafe_allow_html=True) call sends"""
+    from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+    msg = ForwardMsg()
+    msg.delta.new_element.markdown.body = body
+    msg.delta.new_element.markdown.allow_html = True
+    return msg.ByteSize()
+
+
+def bench_stylesheet(args):
+    css = app.minify_css(app.UI_STYLESHEET)
+    asset = len(css.encode())
+    variants = [
+        # What load_ultimate_css sent before the stylesheet became a static asset
+        ("inline <style> (before)", markdown_delta_bytes(f"\n    <style>{app.UI_STYLESHEET}</style>\n    "), 0),
+        ("inline minified (static serving off)", markdown_delta_bytes(f"<style>{css}</style>"), 0),
+        ("linked asset (after)", markdown_delta_bytes('<link rel="stylesheet" href="app/static/ui.0123456789ab.css">'),
+         asset),
+    ]
+    print(f"Stylesheet: {len(app.UI_STYLESHEET.encode()):,} B source, {asset:,} B minified, "
+          f"{len(gzip.compress(css.encode())):,} B minified+gzip")
+    print_table(["variant", "bytes per rerun", "asset bytes (once)", f"bytes for {args.reruns} reruns"],
+                [(label, f"{per_rerun:,}", f"{once:,}", f"{once + per_rerun * args.reruns:,}")
+                 for label, per_rerun, once in variants])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    storage = commands.add_parser("storage", help="compare STORAGE_PROFILES on a mixed read/write workload")
+    storage.add_argument("--profiles", nargs="*", choices=list(app.STORAGE_PROFILES))
+    storage.add_argument("--readers", type=int, default=6)
+    storage.add_argument("--writers", type=int, default=2)
+    storage.add_argument("--duration", type=float, default=5.0)
+    storage.add_argument("--messages", type=int, default=50000)
+    storage.add_argument("--transactions", type=int, default=50000)
+    storage.set_defaults(func=bench_storage)
+
+    commits = commands.add_parser("commits", help="unit-of-work throughput with and without group commit")
+    commits.add_argument("--profile", choices=list(app.STORAGE_PROFILES), default="durable")
+    commits.add_argument("--writers", type=int, default=8)
+    commits.add_argument("--duration", type=float, default=5.0)
+    commits.add_argument("--max-batch", type=int, default=64)
+    commits.set_defaults(func=bench_commits)
+
+    pageload = commands.add_parser("pageload", help="dashboard data bundle: sequential vs Database.load_page")
+    pageload.add_argument("--workers", type=int, default=4)
+    pageload.add_argument("--rounds", type=int, default=200)
+    pageload.add_argument("--users", type=int, default=200000)
+    pageload.add_argument("--projects", type=int, default=100000)
+    pageload.add_argument("--messages", type=int, default=50000)
+    pageload.add_argument("--transactions", type=int, default=200000)
+    pageload.set_defaults(func=bench_pageload)
+
+    cards = commands.add_parser("cards", help="listing card render cost with and without the fragment cache")
+    cards.add_argument("--rows", type=int, default=10000)
+    cards.set_defaults(func=bench_cards)
+
+    search = commands.add_parser("search", help="talent search: %%text%% LIKE scan vs the FTS5 index with bm25")
+    search.add_argument("--rows", type=int, default=100000)
+    search.add_argument("--repeat", type=int, default=20)
+    search.set_defaults(func=bench_talent_search)
+
+    facets = commands.add_parser("facets", help="advanced-filter facet counts: a query per facet vs "
+                                                "Database.facets, cold and cached")
+    facets.add_argument("--rows", type=int, default=100000)
+    facets.add_argument("--repeat", type=int, default=5)
+    facets.set_defaults(func=bench_facets)
+
+    workers = commands.add_parser("workers", help="cold catalog loads across worker processes, with and without "
+                                                  "the shared cache tier")
+    workers.add_argument("--workers", type=int, default=4)
+    workers.add_argument("--users", type=int, default=200000)
+    workers.add_argument("--projects", type=int, default=100000)
+    workers.set_defaults(func=bench_workers)
+
+    warmup = commands.add_parser("warmup", help="first visit after a restart, with and without the CacheWarmer")
+    warmup.add_argument("--rows", type=int, default=10000)
+    warmup.add_argument("--budget", type=float, default=app.WARMUP_BUDGET)
+    warmup.set_defaults(func=bench_warmup)
+
+    stylesheet = commands.add_parser("stylesheet", help="websocket bytes per rerun spent on the UI stylesheet")
+    stylesheet.add_argument("--reruns", type=int, default=100)
+    stylesheet.set_defaults(func=bench_stylesheet)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
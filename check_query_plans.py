@@ -0,0 +1,217 @@
+"""Fail when a query the app issues falls back to an unexpected full table scan.
+
+Drives every page through Streamlit's AppTest against a scratch database with
+KIC_QUERY_LOG enabled, calls each manager write path directly, then runs
+EXPLAIN QUERY PLAN on every distinct statement that was logged. Exits 1 if any
+plan scans a table that is not listed in EXPECTED_SCANS, or if a pasted comma list with
+tabs and line breaks does not split into the same items through the item triggers and a rebuild.
+
+    python check_query_plans.py [--verbose]
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+
+# Scans that are the point of the query: (table, statement pattern, reason)
+EXPECTED_SCANS = [
+    ("universities", r"^SELECT \* FROM universities ORDER BY ranking_national$", "university directory lists every row"),
+    ("universities", r"^SELECT COALESCE\(SUM\(1\), 0\) FROM universities$", "KPI counter rebuild counts every row"),
+    ("companies", r"^SELECT \* FROM companies ORDER BY rating DESC", "company directory lists every row"),
+    ("companies", r"^SELECT COALESCE\(SUM\(1\), 0\) FROM companies$", "KPI counter rebuild counts every row"),
+    ("labs", r"^SELECT DISTINCT (location|specialty) FROM labs$", "filter options list every lab's value"),
+    ("labs", r"^SELECT id, name FROM labs ORDER BY name$", "lab pickers list every lab"),
+    ("labs", r"FROM labs l\s+JOIN universities u ON l.university_id = u.id\s+ORDER BY u.name, l.name",
+     "lab access picker lists every lab with its university"),
+    ("talents", r"FROM talents t\s+JOIN users u", "talent directory lists every profile"),
+    ("users", r"FROM users ORDER BY name", "recipient pickers list the whole user directory"),
+    ("sqlite_master", r"FROM sqlite_master WHERE type = 'table'", "schema introspection"),
+    # Logged statements carry their parameters inline: json_each(NULL), json_each('["Dubai"]'), MATCH '"ai"*'
+    ("json_each", r"json_each\((NULL|'\[[^']*\]')\)", "filter list bound as one JSON parameter"),
+    ("json_each", r"^INSERT OR IGNORE INTO \w+_items .* FROM \w+, json_each\('\['",
+     "item index rebuild splits each row's comma list"),
+    ("talent_search", r"WHERE talent_search MATCH '", "FTS5 MATCH reads its own term index"),
+    ("project_search", r"WHERE project_search MATCH '", "FTS5 MATCH reads its own term index"),
+    ("lab_search", r"WHERE lab_search MATCH '", "FTS5 MATCH reads its own term index"),
+    ("talent_search", r"^DELETE FROM talent_search$", "search index rebuild empties it whole"),
+    ("project_search", r"^DELETE FROM project_search$", "search index rebuild empties it whole"),
+    ("lab_search", r"^DELETE FROM lab_search$", "search index rebuild empties it whole"),
+    ("talents", r"INSERT INTO talent_search", "search index rebuild reads every talent"),
+    ("projects", r"INSERT INTO project_search", "search index rebuild reads every project"),
+    ("labs", r"INSERT INTO lab_search", "search index rebuild reads every lab"),
+    ("talents", r"INSERT OR IGNORE INTO talent_items", "item index rebuild splits every talent"),
+    ("projects", r"INSERT OR IGNORE INTO project_items", "item index rebuild splits every project"),
+    ("labs", r"INSERT OR IGNORE INTO lab_items", "item index rebuild splits every lab"),
+    ("main", r"_config'$", "FTS5 loading its config table when a connection first opens the index"),
+    ("platform_counters", r"^SELECT name, value FROM platform_counters$", "one row per KPI counter, read as a whole"),
+    ("counter_groups", r"^DELETE FROM counter_groups$", "KPI counter rebuild empties every distinct-value group"),
+    ("projects", r"^SELECT COALESCE\(SUM\(.*\), 0\) FROM projects$", "KPI counter rebuild sums every project"),
+    ("labs", r"^SELECT COALESCE\(SUM\(.*\), 0\) FROM labs$", "KPI counter rebuild sums every lab"),
+    ("labs", r"INSERT INTO counter_groups[\s\S]* FROM labs\s+WHERE specialty IS NOT NULL\s+GROUP BY specialty",
+     "KPI counter rebuild regroups every lab specialty"),
+    ("messages", r"GROUP BY receiver_id", "badge reconciler recounts every user's unread messages"),
+    ("notifications", r"GROUP BY user_id", "badge reconciler recounts every user's unread notifications"),
+    ("connections", r"GROUP BY addressee_id", "badge reconciler recounts every pending request"),
+    ("user_counters", r"WHERE value != 0", "badge reconciler compares every stored counter"),
+]
+
+PAGES = ["Home", "Talents", "Companies", "Projects", "My Projects", "Labs", "Lab Access",
+         "Universities", "KIC Hub", "Messages", "Profile"]
+DEMO_USERS = ["ahmed.mansouri@example.com", "sara.hassan@example.com", "mohammed.rashid@uaeu.ac.ae"]
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+
+def drive_pages():
+    """Render every page for several demo users, including the search paths; returns the number
+    of runs that raised"""
+    from streamlit.testing.v1 import AppTest
+
+    failures = 0
+
+    def run(at, email, step):
+        nonlocal failures
+        at.run()
+        # show_app turns a page's exception into an "Error loading page" message
+        errors = [e.message for e in at.exception] + [e.value for e in at.error
+                                                      if e.value.startswith("Error loading page")]
+        if errors:
+            print(f"FAIL {step} for {email}: {errors[0]}")
+            failures += 1
+
+    for email in DEMO_USERS:
+        at = AppTest.from_file(APP_PATH, default_timeout=60)
+        run(at, email, "login page")
+        at.button(key=f"demo_{email}").click()
+        run(at, email, "demo login")
+        for page in PAGES:
+            at.session_state["current_page"] = page
+            run(at, email, f"page {page}")
+            if page in ("Talents", "Projects", "Labs") and at.text_input:
+                at.text_input[0].input("AI")
+                run(at, email, f"page {page} search")
+                at.text_input[0].input("")
+                run(at, email, f"page {page} cleared search")
+    return failures
+
+
+def drive_managers(app, db_path):
+    """Exercise the manager write paths that pages only reach through form submits"""
+    db = app.Database(db_path)
+    app.AuthManager.register("plan.check@example.com", "password123", "Plan Check", "talent",
+                             "QA", "Dubai", "+971500000000", db)
+    app.AuthManager.login("plan.check@example.com", "password123", db)
+    app.SocialManager.send_connection_request(1, 2, "hello", db)
+    app.SocialManager.accept_connection(1, db)
+    app.SocialManager.send_message(1, 2, "hello", db)
+    app.SocialManager.mark_conversation_read(2, 1, db)
+    app.SocialManager.mark_notifications_read(1, db)
+    app.SocialManager.get_conversations(1, db)
+    app.SocialManager.get_messages(1, 2, db)
+    app.KICManager.transfer_kic(1, 2, 1, "plan check", db)
+    app.KICManager.get_kic_balance(1, db)
+    username, password = app.LabAccessManager.grant_lab_access(1, 1, "basic", "2024-01-01", "2099-01-01", db)
+    app.LabAccessManager.verify_lab_access(1, username, password, db)
+    app.LabAccessManager.get_user_lab_access(1, db)
+    app.ProjectManager.apply_to_project(5, 1, "plan check", 100, 5, db)
+    app.ProjectManager.get_project_applications(1, db)
+    db.close()
+
+
+def check_item_splitting(app, db_path):
+    """Comma lists pasted with tabs, line breaks, quotes and backslashes must split the same through
+    the item triggers and through a rebuild; returns the number of mismatches"""
+    pasted = 'Python,\tRust\n,\r\nC:\\tools, "Go"'
+    expected = sorted(["Python", "Rust", "C:\\tools", '"Go"'])
+    db = app.Database(db_path)
+    failures = 0
+    try:
+        with db.writer() as cursor:
+            cursor.execute("UPDATE talents SET skills = ? WHERE id = 1", (pasted,))
+        for label in ("trigger", "rebuild"):
+            if label == "rebuild":
+                db.rebuild_item_index("talent_items")
+            items = sorted(row[0] for row in db.fetch_all(
+                "SELECT item FROM talent_items WHERE kind = 'skill' AND talent_id = 1"))
+            if items != expected:
+                print(f"FAIL item split by {label}: {items!r}, expected {expected!r}")
+                failures += 1
+    finally:
+        db.close()
+    return failures
+
+
+def logged_statements(log_path):
+    """Distinct DML statements from the query log, literals folded so one shape appears once"""
+    seen = {}
+    with open(log_path, encoding="utf-8") as log:
+        for line in log:
+            sql = json.loads(line).strip()
+            if not re.match(r"(SELECT|WITH|UPDATE|DELETE|INSERT)\b", sql, re.I):
+                continue
+            shape = re.sub(r"'(?:[^']|'')*'|\b\d+(\.\d+)?\b", "?", re.sub(r"\s+", " ", sql))
+            seen.setdefault(shape, sql)
+    return list(seen.values())
+
+
+def table_aliases(sql):
+    aliases = {}
+    for table, alias in re.findall(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(?!ON\b|WHERE\b|JOIN\b|LEFT\b|"
+                                   r"INNER\b|GROUP\b|ORDER\b|LIMIT\b)(\w+))?", sql, re.I):
+        aliases[table] = table
+        if alias:
+            aliases[alias] = table
+    return aliases
+
+
+def unexpected_scans(sql, plan):
+    aliases = table_aliases(sql)
+    problems = []
+    for detail in plan:
+        match = re.match(r"SCAN (\w+)(.*)", detail)
+        if not match or " USING " in match.group(2):
+            continue
+        table = aliases.get(match.group(1), match.group(1))
+        if any(table == allowed and re.search(pattern, sql) for allowed, pattern, _ in EXPECTED_SCANS):
+            continue
+        problems.append(detail)
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--verbose", action="store_true", help="print every plan, not only failures")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="kic-plans-")
+    db_path = os.path.join(workdir, "plans.db")
+    log_path = os.path.join(workdir, "queries.jsonl")
+    os.environ["KIC_DB_PATH"] = db_path
+    os.environ["KIC_QUERY_LOG"] = log_path
+    try:
+        failures = drive_pages()
+        import app
+        drive_managers(app, db_path)
+
+        failures += check_item_splitting(app, db_path)
+        db = app.Database(db_path)
+        statements = logged_statements(log_path)
+        for sql in statements:
+            plan = db.explain(sql)
+            problems = unexpected_scans(sql, plan)
+            if problems or args.verbose:
+                print(("FAIL " if problems else "ok   ") + re.sub(r"\s+", " ", sql)[:160])
+                for detail in plan:
+                    print(f"       {detail}")
+            failures += bool(problems)
+        db.close()
+        print(f"{len(statements)} distinct statements checked, {failures} with unexpected full scans")
+        return 1 if failures else 0
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())